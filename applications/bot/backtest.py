@@ -0,0 +1,103 @@
+import os
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+from src.backtest import (
+    BacktestParams,
+    parameter_grid,
+    prepare,
+    sweep,
+)
+from src.database import get_db_url
+from src.registry import load_active_weights
+from src.snapshot import load_history
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def _float_list(value: str) -> list[float]:
+    return [float(v) for v in value.split(",")]
+
+
+if __name__ == "__main__":
+    defaults = BacktestParams()
+    arg_parser = ArgumentParser(
+        description=(
+            "Replay the match table through the live betting rules and grid-search "
+            "the sizing constants. Comma separate values to sweep them."
+        )
+    )
+    arg_parser.add_argument("--max-bet-cap", type=_int_list, default=[defaults.max_bet_cap])
+    arg_parser.add_argument("--x-tier-cap", type=_int_list, default=[defaults.x_tier_cap])
+    arg_parser.add_argument(
+        "--effective-balance-cap", type=_int_list, default=[defaults.effective_balance_cap]
+    )
+    arg_parser.add_argument(
+        "--kelly-fraction", type=_float_list, default=[defaults.kelly_fraction]
+    )
+    arg_parser.add_argument(
+        "--confidence-cap", type=_float_list, default=[defaults.confidence_cap]
+    )
+    arg_parser.add_argument(
+        "--starting-balance", type=_int_list, default=[defaults.starting_balance]
+    )
+    arg_parser.add_argument(
+        "--default-weights",
+        action="store_true",
+        help="Use BettingEngine's built-in weights instead of the active model.",
+    )
+    arg_parser.add_argument(
+        "--include-tournaments",
+        action="store_true",
+        help="Also replay tournament matches into the bankroll.",
+    )
+    arg_parser.add_argument("--workers", type=int, help="Process pool size (default: all cores).")
+    arg_parser.add_argument("--top", type=int, default=10, help="Number of results to print.")
+    arg_parser.add_argument(
+        "--snapshot",
+        type=Path,
+        help="Sync the match history into this columnar snapshot and memory-map it.",
+    )
+    arguments = arg_parser.parse_args()
+
+    if os.environ.get("PRODUCTION") is None:
+        load_dotenv(Path(__file__).parent.parent.parent / ".env")
+
+    started = time.perf_counter()
+    engine = create_engine(get_db_url())
+    with engine.connect() as conn:
+        history = load_history(conn, arguments.snapshot)
+        weights = None if arguments.default_weights else load_active_weights(conn)
+    print(f"Loaded {len(history):,} matches in {time.perf_counter() - started:.1f}s.")
+
+    started = time.perf_counter()
+    prepared = prepare(history, weights, include_tournaments=arguments.include_tournaments)
+    print(f"Replayed features in {time.perf_counter() - started:.1f}s. Weights: {weights or 'default'}")
+
+    grid = parameter_grid(
+        max_bet_cap=arguments.max_bet_cap,
+        x_tier_cap=arguments.x_tier_cap,
+        effective_balance_cap=arguments.effective_balance_cap,
+        kelly_fraction=arguments.kelly_fraction,
+        confidence_cap=arguments.confidence_cap,
+        starting_balance=arguments.starting_balance,
+    )
+    started = time.perf_counter()
+    results = sweep(prepared, grid, arguments.workers)
+    print(f"Simulated {len(grid)} parameter sets in {time.perf_counter() - started:.1f}s.\n")
+
+    for result in results[: arguments.top]:
+        row = result.as_row()
+        print(
+            f"ROI {row['roi']:>7.2f}%  win rate {row['win_rate']:>5.1f}%  "
+            f"drawdown {row['max_drawdown']:>5.1f}%  final ${row['final_balance']:,}  "
+            f"bets {row['bets']:,} | max_bet_cap={row['max_bet_cap']} "
+            f"x_tier_cap={row['x_tier_cap']} effective_balance_cap={row['effective_balance_cap']} "
+            f"kelly_fraction={row['kelly_fraction']} confidence_cap={row['confidence_cap']}"
+        )
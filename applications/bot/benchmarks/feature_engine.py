@@ -0,0 +1,96 @@
+"""
+FeatureEngine against the per-match history scans it replaced.
+
+The legacy replay below is the old iterrows simulation from training.py, kept
+only as the reference. It grows roughly quadratically, so it is only run (and
+compared for identical output) up to --legacy-limit matches.
+
+Run from applications/bot: poetry run python -m benchmarks.feature_engine
+"""
+
+import time
+from argparse import ArgumentParser
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from src.features import COMP_TRAINING, STARTING_ELO, FeatureEngine, _elo_change
+from src.history import MatchHistory
+from src.synthetic import SyntheticLeague
+
+
+def legacy_features(history: MatchHistory, min_matches: int) -> np.ndarray:
+    df = pd.DataFrame({"r": history.red, "b": history.blue, "red_won": history.red_won})
+    elo = defaultdict(lambda: float(STARTING_ELO))
+    streak = defaultdict(int)
+    matches = defaultdict(list)
+
+    def h2h(r, b):
+        results = [m["result"] for m in matches[r] if m["opponent"] == b]
+        if len(results) < min_matches or not results:
+            return 0.5
+        return results.count("win") / len(results)
+
+    def comp(r, b):
+        red_opps = {m["opponent"]: m["result"] for m in matches[r]}
+        wins = total = 0
+        for m in matches[b]:
+            red_res = red_opps.get(m["opponent"])
+            if red_res == "win" and m["result"] == "loss":
+                wins += 1
+                total += 1
+            elif red_res == "loss" and m["result"] == "win":
+                total += 1
+        if total < min_matches or total == 0:
+            return 0.5
+        return wins / total
+
+    rows = []
+    for _, match in df.iterrows():
+        r, b, red_won = match["r"], match["b"], match["red_won"]
+        rows.append([elo[r] - elo[b], streak[r] - streak[b], h2h(r, b) - 0.5, comp(r, b) - 0.5])
+
+        winner, loser = (r, b) if red_won else (b, r)
+        change = _elo_change(elo[winner], elo[loser])
+        elo[winner] += change
+        elo[loser] -= change
+        matches[winner].append({"opponent": loser, "result": "win"})
+        matches[loser].append({"opponent": winner, "result": "loss"})
+        streak[winner] = streak[winner] + 1 if streak[winner] > 0 else 1
+        streak[loser] = streak[loser] - 1 if streak[loser] < 0 else -1
+    return np.array(rows, dtype=np.float64).reshape(-1, 4)
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--sizes", default="100000,1000000", help="Comma separated match counts.")
+    parser.add_argument("--fighters", type=int, default=10_000)
+    parser.add_argument("--min-matches", type=int, default=3)
+    parser.add_argument("--legacy-limit", type=int, default=20_000)
+    args = parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        history = SyntheticLeague(args.fighters).history(size)
+        engine = FeatureEngine(min_matches=args.min_matches, comp_mode=COMP_TRAINING)
+        started = time.perf_counter()
+        features = engine.run(history)
+        seconds = time.perf_counter() - started
+        print(
+            f"{size:>10,} matches / {history.num_fighters:,} fighters: FeatureEngine "
+            f"{seconds:.2f}s ({seconds / size * 1e6:.1f}us per match)"
+        )
+
+        if size <= args.legacy_limit:
+            started = time.perf_counter()
+            legacy = legacy_features(history, args.min_matches)
+            legacy_seconds = time.perf_counter() - started
+            identical = np.array_equal(features, legacy)
+            print(
+                f"{'':>10} legacy iterrows {legacy_seconds:.2f}s "
+                f"({legacy_seconds / seconds:.0f}x slower), identical: {identical}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Memory footprint of FighterStateStore and get_bet latency when served from it.
+
+Run from applications/bot: poetry run python -m benchmarks.fighter_store
+"""
+
+import random
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from datetime import datetime, timedelta, timezone
+
+from src.betting_strategy import BettingEngine
+from src.fighter_store import FighterStateStore
+
+TIERS = ["X", "S", "A", "B"]
+
+
+def build_store(num_fighters: int, matches_per_fighter: int, seed: int = 0) -> FighterStateStore:
+    rng = random.Random(seed)
+    store = FighterStateStore()
+    now = datetime.now(timezone.utc)
+    base_id = 1_700_000_000_000_000  # Same magnitude as Database.generate_safe_id()
+
+    tier_members: dict[str, list[int]] = {tier: [] for tier in TIERS}
+    for i in range(num_fighters):
+        tier = TIERS[i % len(TIERS)]
+        fighter_id = base_id + i
+        tier_members[tier].append(fighter_id)
+        store.upsert_fighter(
+            {
+                "id": fighter_id,
+                "name": f"Fighter {i}",
+                "tier": tier,
+                "elo": rng.randint(1200, 1800),
+                "tier_elo": rng.randint(1200, 1800),
+                "current_streak": rng.randint(-5, 5),
+                "last_match_date": now - timedelta(hours=rng.randint(0, 48)),
+            }
+        )
+
+    num_matches = num_fighters * matches_per_fighter // 2
+    date = now - timedelta(minutes=num_matches * 3)
+    for _ in range(num_matches):
+        members = tier_members[rng.choice(TIERS)]
+        red, blue = rng.sample(members, 2)
+        store.record_result(red, blue, red if rng.random() < 0.5 else blue, date)
+        date += timedelta(minutes=3)
+    return store
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--fighters", type=int, default=10_000)
+    parser.add_argument("--matches-per-fighter", type=int, default=60)
+    parser.add_argument("--samples", type=int, default=20_000)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    store = build_store(args.fighters, args.matches_per_fighter)
+    build_seconds = time.perf_counter() - started
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_10k = used / args.fighters * 10_000 / 1024 / 1024
+    print(f"Fighters: {args.fighters:,}  Pairs: {len(store.pairs):,}  Build: {build_seconds:.2f}s")
+    print(f"Memory: {used / 1024 / 1024:.1f} MiB total, {per_10k:.1f} MiB per 10k fighters")
+
+    engine = BettingEngine(None, store=store)
+    names = [fighter.name for fighter in store.fighters.values()]
+    rng = random.Random(1)
+    timings = []
+    for _ in range(args.samples):
+        red, blue = rng.sample(names, 2)
+        started = time.perf_counter_ns()
+        engine.get_bet(red, blue, 1_000_000)
+        timings.append(time.perf_counter_ns() - started)
+
+    timings.sort()
+    p50 = timings[len(timings) // 2] / 1000
+    p99 = timings[int(len(timings) * 0.99)] / 1000
+    print(f"get_bet over {args.samples:,} calls: p50 {p50:.1f}us  p99 {p99:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
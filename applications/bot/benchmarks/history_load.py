@@ -0,0 +1,51 @@
+"""
+Peak memory of streaming the match table into MatchHistory, next to pd.read_sql
+of the same query.
+
+Reads whatever database POSTGRES_* points at (or --db-url).
+Run from applications/bot: poetry run python -m benchmarks.history_load
+"""
+
+import gc
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from src.database import get_db_url
+from src.history import HISTORY_QUERY, load_match_history
+
+
+def measure(label: str, load) -> None:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = load()
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_million = peak / max(rows, 1) * 1_000_000 / 1024 / 1024
+    print(
+        f"{label:<18} {rows:>10,} rows  {seconds:6.2f}s  peak {peak / 1024 / 1024:8.1f} MiB  "
+        f"({per_million:.1f} MiB per million rows)"
+    )
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--db-url", default=None)
+    parser.add_argument("--skip-pandas", action="store_true")
+    args = parser.parse_args()
+
+    engine = create_engine(args.db_url or get_db_url())
+    with engine.connect() as conn:
+        measure("load_match_history", lambda: len(load_match_history(conn)))
+        if not args.skip_pandas:
+            measure("pd.read_sql", lambda: len(pd.read_sql(text(HISTORY_QUERY.format(after="")), conn)))
+
+
+if __name__ == "__main__":
+    main()
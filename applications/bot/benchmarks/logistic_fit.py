@@ -0,0 +1,83 @@
+"""
+fit_logistic against scikit-learn's LogisticRegression on model features.
+
+The features are replayed from a synthetic league and resampled up to each size.
+Both minimise the same L2-penalised log-loss. The default lbfgs solver, which
+training used before, is timed; the weights are compared with scikit-learn's own
+Newton solver run to convergence, since lbfgs stops early on the coefficients of
+sparse features such as h2h. The penalised loss gap shows that lbfgs' stopping
+point is never better than fit_logistic's.
+scikit-learn is only a dev dependency: poetry install --with dev.
+
+Run from applications/bot: poetry run python -m benchmarks.logistic_fit
+"""
+
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+from src.backtest import LIVE_FEATURE_CONFIG
+from src.features import FeatureEngine
+from src.logistic import L2, fit_logistic
+from src.synthetic import SyntheticLeague
+from src.training import WARMUP_MATCHES
+
+
+def penalised_loss(X, y, intercept, coefs) -> float:
+    z = intercept + X @ coefs
+    return float(np.mean(np.logaddexp(0, z) - y * z) + 0.5 * L2 * np.sum(coefs**2) / len(y))
+
+
+def import_seconds(module: str) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma separated row counts.")
+    parser.add_argument("--replay", type=int, default=200_000, help="Matches to replay for features.")
+    parser.add_argument("--fighters", type=int, default=5_000)
+    args = parser.parse_args()
+
+    history = SyntheticLeague(args.fighters).history(args.replay)
+    features = FeatureEngine(**LIVE_FEATURE_CONFIG).run(history)[WARMUP_MATCHES:]
+    outcomes = history.red_won[WARMUP_MATCHES:]
+    rng = np.random.default_rng(0)
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        rows = rng.integers(0, len(outcomes), size)
+        X, y = features[rows], outcomes[rows]
+
+        started = time.perf_counter()
+        intercept, coefs = fit_logistic(X, y)
+        numpy_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        lbfgs = LogisticRegression(C=1 / L2).fit(X, y)
+        sklearn_seconds = time.perf_counter() - started
+        reference = LogisticRegression(C=1 / L2, solver="newton-cholesky", tol=1e-12, max_iter=1000).fit(X, y)
+
+        ours = np.concatenate(([intercept], coefs))
+        theirs = np.concatenate((reference.intercept_, reference.coef_[0]))
+        difference = np.max(np.abs(ours - theirs) / np.maximum(np.abs(theirs), 1e-6))
+        loss_gap = penalised_loss(X, y, lbfgs.intercept_[0], lbfgs.coef_[0]) - penalised_loss(X, y, intercept, coefs)
+        print(
+            f"{size:>10,} rows: fit_logistic {numpy_seconds:6.3f}s  lbfgs {sklearn_seconds:6.3f}s "
+            f"({sklearn_seconds / numpy_seconds:4.1f}x)  max relative difference to converged sklearn "
+            f"{difference:.1e}  lbfgs loss - ours {loss_gap:+.1e}"
+        )
+
+    print(
+        f"\nImport time: src.logistic {import_seconds('src.logistic'):.2f}s, "
+        f"sklearn.linear_model {import_seconds('sklearn.linear_model'):.2f}s (fresh interpreters)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Import time and resident memory of each bot process at startup.
+
+Every role is measured in a fresh interpreter importing what that process
+imports: main.py's src.run for the watchdog, and on top of it the modules
+BotProcess.run imports. The log listener and ReportProcess are forked from the
+watchdog, so they start with its modules. Also lists which heavy libraries each
+role ends up with and whether importing built a database engine.
+
+Run from applications/bot: poetry run python -m benchmarks.startup
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+from argparse import ArgumentParser
+
+# What BotProcess.run imports on top of src.run
+BOT_MODULES = ["src.betting_strategy", "src.online", "src.trainer"]
+
+ROLES = {
+    "bare interpreter": [],
+    "watchdog, log listener, reporter": ["src.run"],
+    "bot": ["src.run", *BOT_MODULES],
+}
+HEAVY_MODULES = ["numpy", "sqlalchemy", "psycopg2", "requests", "sklearn", "pandas", "scipy"]
+
+PROBE = """
+import importlib, json, resource, sys, time
+started = time.perf_counter()
+for module in sys.argv[1:]:
+    importlib.import_module(module)
+seconds = time.perf_counter() - started
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+database = sys.modules.get("src.database")
+print(json.dumps({
+    "seconds": seconds,
+    "rss_kib": rss // 1024 if sys.platform == "darwin" else rss,
+    "modules": [m for m in %r if m in sys.modules],
+    "engine": getattr(database, "_engine", None) is not None,
+}))
+""" % (HEAVY_MODULES,)
+
+
+def probe(modules: list[str]) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, *modules], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output)
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per role, medians are shown.")
+    args = parser.parse_args()
+
+    for role, modules in ROLES.items():
+        runs = [probe(modules) for _ in range(args.repeat)]
+        seconds = statistics.median(run["seconds"] for run in runs)
+        rss = statistics.median(run["rss_kib"] for run in runs) / 1024
+        loaded = ", ".join(runs[-1]["modules"]) or "-"
+        engine = "  engine built at import" if runs[-1]["engine"] else ""
+        print(f"{role:<34} import {seconds:6.3f}s  RSS {rss:6.1f} MiB  loads: {loaded}{engine}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Time and peak memory of the training pipeline and of BettingEngine's feature
+lookups on a synthetic league at growing sizes, to spot scaling cliffs before
+production data reaches them.
+
+Without --db-url everything runs on arrays: the replay behind
+backfill_match_features, the final fit of train_model, train_model.py's
+walk-forward validation, and get_bet served from a FighterStateStore. With
+--db-url the league is written to that database and the database-bound steps are
+timed as well (load_match_history, backfill_match_features,
+load_training_features, FighterStateStore.load and get_bet on the SQL path). Use an
+empty scratch database the bot has migrated, so the match indexes exist; the
+benchmark refuses one that already has matches.
+
+Peak memory is traced with tracemalloc, which slows the Python-heavy steps down;
+pass --no-memory for clean timings. Pool workers are not traced.
+
+Run from applications/bot: poetry run python -m benchmarks.training --sizes 100000,1000000,10000000
+"""
+
+import gc
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from src.backtest import LIVE_FEATURE_CONFIG
+from src.betting_strategy import BettingEngine
+from src.features import FeatureEngine
+from src.fighter_store import FighterStateStore
+from src.history import TIERS, load_match_history
+from src.synthetic import SyntheticLeague, concat, fighter_name, load_into_database
+from src.training import (
+    WARMUP_MATCHES,
+    TrainingSet,
+    backfill_match_features,
+    fit_weights,
+    load_training_features,
+)
+from src.validation import cross_validate
+
+POTATO = TIERS.index("P")
+
+
+class Profiler:
+    def __init__(self, size: int, trace_memory: bool) -> None:
+        self.size = size
+        self.trace_memory = trace_memory
+
+    def measure(self, label: str, step):
+        gc.collect()
+        if self.trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        result = step()
+        seconds = time.perf_counter() - started
+        peak = ""
+        if self.trace_memory:
+            peak = f"peak {tracemalloc.get_traced_memory()[1] / 1024 / 1024:9.1f} MiB"
+            tracemalloc.stop()
+        print(f"{self.size:>11,}  {label:<34} {seconds:8.2f}s  {peak}")
+        return result
+
+
+def training_set(history, features) -> TrainingSet:
+    """What load_training_features returns once every match past the warm-up has features."""
+    rows = slice(WARMUP_MATCHES, None)
+    return TrainingSet(
+        X=features[rows],
+        y=history.red_won[rows],
+        bet_red=history.bet_red[rows],
+        bet_blue=history.bet_blue[rows],
+        x_tier=history.tier_mask("X")[rows],
+        potato=history.tier_mask("P")[rows],
+        matchmaking=history.format_mask("matchmaking")[rows],
+    )
+
+
+def build_store(league: SyntheticLeague, history) -> FighterStateStore:
+    """FighterStateStore.load without the database: the same upserts and results."""
+    store = FighterStateStore()
+    for row in league.fighter_rows():
+        store.upsert_fighter(row)
+    ids = history.fighter_ids
+    for red, blue, red_won, date in zip(
+        ids[history.red].tolist(), ids[history.blue].tolist(), history.red_won.tolist(), history.date.tolist()
+    ):
+        store.record_result(red, blue, red if red_won else blue, datetime.fromtimestamp(date, tz=timezone.utc))
+    return store
+
+
+def bet_latency(engine: BettingEngine, history, samples: int, seed: int = 1) -> str:
+    """get_bet percentiles over pairings that actually happened, outside Potato tier."""
+    rng = np.random.default_rng(seed)
+    playable = np.flatnonzero(history.tier != POTATO)
+    ids = history.fighter_ids
+    timings = []
+    for i in rng.choice(playable, samples).tolist():
+        red, blue = fighter_name(ids[history.red[i]]), fighter_name(ids[history.blue[i]])
+        started = time.perf_counter_ns()
+        engine.get_bet(red, blue, 1_000_000)
+        timings.append(time.perf_counter_ns() - started)
+    timings.sort()
+    return (
+        f"p50 {timings[len(timings) // 2] / 1000:.1f}us  "
+        f"p99 {timings[int(len(timings) * 0.99)] / 1000:.1f}us"
+    )
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--sizes", default="100000,1000000", help="Comma separated match counts.")
+    parser.add_argument("--fighters", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, help="Validation pool size (default: all cores).")
+    parser.add_argument("--samples", type=int, default=20_000, help="get_bet calls from the store.")
+    parser.add_argument("--sql-samples", type=int, default=500, help="get_bet calls on the SQL path.")
+    parser.add_argument("--db-url", default=None)
+    parser.add_argument("--no-memory", action="store_true")
+    args = parser.parse_args()
+
+    league = SyntheticLeague(args.fighters, args.seed)
+    engine = create_engine(args.db_url) if args.db_url else None
+    chunks = []
+    for size in sorted(int(s) for s in args.sizes.split(",")):
+        profile = Profiler(size, not args.no_memory)
+        new_matches = size - (league.next_match_id - 1)
+
+        if engine is None:
+            chunks.append(profile.measure("generate", lambda: league.history(new_matches)))
+            history = concat(chunks, league.fighter_ids)
+            features = profile.measure(
+                "feature replay", lambda: FeatureEngine(**LIVE_FEATURE_CONFIG).run(history)
+            )
+            data = training_set(history, features)
+            store = profile.measure("FighterStateStore build", lambda: build_store(league, history))
+        else:
+            with engine.begin() as conn:
+                profile.measure("generate + insert", lambda: load_into_database(conn, league, new_matches))
+                # Everything below belongs to the synthetic league, start each size from scratch
+                conn.execute(text("DELETE FROM match_features"))
+                conn.execute(text("DELETE FROM feature_checkpoint"))
+            with engine.begin() as conn:
+                history = profile.measure("load_match_history", lambda: load_match_history(conn))
+                profile.measure("backfill_match_features", lambda: backfill_match_features(conn))
+                data = profile.measure("load_training_features", lambda: load_training_features(conn))
+            with Session(engine) as session:
+                store = profile.measure("FighterStateStore.load", lambda: FighterStateStore.load(session))
+                sql_engine = BettingEngine(session)
+                print(f"{size:>11,}  {'get_bet (SQL)':<34} {bet_latency(sql_engine, history, args.sql_samples)}")
+
+        weights = profile.measure("train_model fit", lambda: fit_weights(data.X, data.y))
+        profile.measure(
+            f"train_model.py {args.folds}-fold validation",
+            lambda: cross_validate(data, None, args.folds, args.workers),
+        )
+        store_engine = BettingEngine(None, weights=weights, store=store)
+        print(f"{size:>11,}  {'get_bet (store)':<34} {bet_latency(store_engine, history, args.samples)}")
+        del store, store_engine, data
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import os
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+from src.database import get_db_url
+from src.snapshot import sync_snapshot
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(
+        description=(
+            "Export the match history to an append-only columnar snapshot that "
+            "backtest.py and risk_sim.py can memory-map with --snapshot."
+        )
+    )
+    arg_parser.add_argument("out", type=Path, help="Snapshot directory (created if missing).")
+    arguments = arg_parser.parse_args()
+
+    if os.environ.get("PRODUCTION") is None:
+        load_dotenv(Path(__file__).parent.parent.parent / ".env")
+
+    started = time.perf_counter()
+    engine = create_engine(get_db_url())
+    with engine.connect() as conn:
+        appended, rebuilt = sync_snapshot(conn, arguments.out)
+    action = "Rebuilt snapshot with" if rebuilt else "Appended"
+    print(f"{action} {appended:,} matches in {time.perf_counter() - started:.1f}s.")
@@ -22,11 +22,38 @@ if __name__ == "__main__":
         "--logs",
         help="Sets a rotating file handler at the given path",
     )
+    arg_parser.add_argument(
+        "--log-json",
+        action="store_true",
+        help="Write the log file as compact NDJSON. Optionally, set LOG_JSON=1.",
+    )
+    arg_parser.add_argument(
+        "--log-max-bytes",
+        type=int,
+        help=(
+            "Rotate the log file by size instead of daily. Optionally, set "
+            "LOG_MAX_BYTES in the environment."
+        ),
+    )
+    arg_parser.add_argument(
+        "--online-learning",
+        action="store_true",
+        help=(
+            "Nudge the model weights after every recorded match and only refit "
+            "fully every 1000 matches. Optionally, set ONLINE_LEARNING=1."
+        ),
+    )
 
     arguments = arg_parser.parse_args()
 
     if arguments.debug:
         os.environ["DEBUG"] = "1"
+    if arguments.log_json:
+        os.environ["LOG_JSON"] = "1"
+    if arguments.log_max_bytes:
+        os.environ["LOG_MAX_BYTES"] = str(arguments.log_max_bytes)
+    if arguments.online_learning:
+        os.environ["ONLINE_LEARNING"] = "1"
 
     log_path: Path | None = None
     if arguments.logs:
@@ -0,0 +1,51 @@
+import os
+from argparse import ArgumentParser
+from pathlib import Path
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from src.database import get_db_url
+from src.registry import activate_model, list_models
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(
+        description="List the registered model versions, or make one of them the active model."
+    )
+    arg_parser.add_argument("--limit", type=int, default=20, help="Versions to list.")
+    arg_parser.add_argument(
+        "--activate",
+        type=int,
+        metavar="VERSION",
+        help="Make this version the active model, e.g. to roll back a promotion.",
+    )
+    arguments = arg_parser.parse_args()
+
+    if os.environ.get("PRODUCTION") is None:
+        load_dotenv(Path(__file__).parent.parent.parent / ".env")
+
+    engine = create_engine(get_db_url())
+    if arguments.activate is not None:
+        with Session(engine) as session:
+            if not activate_model(session, arguments.activate):
+                raise SystemExit(f"No model version {arguments.activate}.")
+        print(f"Model version {arguments.activate} is now active. Restart the bot to load it.")
+
+    with engine.connect() as conn:
+        models = list_models(conn, arguments.limit)
+    print(
+        f"{'version':>7} {'':1} {'registered':<16} {'source':<8} {'rows':>9} "
+        f"{'window':<23} {'log-loss':>8} {'accuracy':>8} {'ROI %':>7}"
+    )
+    for m in models:
+        window = (
+            f"{m.window_start:%Y-%m-%d} - {m.window_end:%Y-%m-%d}"
+            if m.window_start and m.window_end
+            else ""
+        )
+        print(
+            f"{m.id:>7} {'*' if m.active else '':1} {m.timestamp:%Y-%m-%d %H:%M} {m.source or '':<8} "
+            f"{m.trained_rows or 0:>9,} {window:<23} "
+            + (f"{m.log_loss:>8.4f} {m.accuracy:>8.1%} {m.roi:>7.2f}" if m.log_loss is not None else "")
+        )
@@ -0,0 +1,89 @@
+import os
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+from src.database import ELO_K_FACTOR, get_db_url
+from src.elo import DRIFT_PERCENTILES, drift, load_current_ratings, recompute_elo, write_ratings
+from src.snapshot import load_history
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(
+        description=(
+            "Recompute every fighter's Elo and tier Elo from the full match history, "
+            "report how far the stored values drifted and write the new ones back."
+        )
+    )
+    arg_parser.add_argument("--k-factor", type=float, default=ELO_K_FACTOR)
+    arg_parser.add_argument(
+        "--no-tier-reset",
+        action="store_true",
+        help="Carry tier Elo across tier changes instead of restarting it.",
+    )
+    arg_parser.add_argument("--top", type=int, default=10, help="Largest drifts to list.")
+    arg_parser.add_argument("--dry-run", action="store_true", help="Report the drift only.")
+    arg_parser.add_argument(
+        "--snapshot",
+        type=Path,
+        help="Sync the match history into this columnar snapshot and memory-map it.",
+    )
+    arguments = arg_parser.parse_args()
+
+    if os.environ.get("PRODUCTION") is None:
+        load_dotenv(Path(__file__).parent.parent.parent / ".env")
+
+    started = time.perf_counter()
+    engine = create_engine(get_db_url())
+    with engine.connect() as conn:
+        history = load_history(conn, arguments.snapshot)
+    print(f"Loaded {len(history):,} matches in {time.perf_counter() - started:.1f}s.")
+
+    started = time.perf_counter()
+    ratings = recompute_elo(history, arguments.k_factor, not arguments.no_tier_reset)
+    print(
+        f"Recomputed {history.num_fighters:,} fighters in {ratings.waves:,} waves in "
+        f"{time.perf_counter() - started:.1f}s.\n"
+    )
+
+    with engine.connect() as conn:
+        current_elo, current_tier_elo, names = load_current_ratings(conn, ratings.fighter_ids)
+    print(
+        f"{'drift':<9} {'fighters':>9} {'changed':>9} {'mean':>7}"
+        + "".join(f"{'p' + str(p):>7}" for p in DRIFT_PERCENTILES)
+        + f"{'max':>7}"
+    )
+    for label, current, recomputed in (
+        ("elo", current_elo, ratings.elo),
+        ("tier_elo", current_tier_elo, ratings.tier_elo),
+    ):
+        d = drift(current, recomputed)
+        print(
+            f"{label:<9} {d.fighters:>9,} {d.changed:>9,} {d.mean_abs:>7.1f}"
+            + "".join(f"{d.percentiles[p]:>7.0f}" for p in DRIFT_PERCENTILES)
+            + f"{d.max_abs:>7}"
+        )
+
+    known = np.flatnonzero(current_elo >= 0)
+    largest = known[np.argsort(-np.abs(ratings.elo[known] - current_elo[known]), kind="stable")[: arguments.top]]
+    if len(largest):
+        print(f"\n{'fighter':<32} {'elo':>6} {'new':>6} {'tier_elo':>9} {'new':>6}")
+    for i in largest:
+        print(
+            f"{names[i][:32]:<32} {current_elo[i]:>6} {ratings.elo[i]:>6} "
+            f"{current_tier_elo[i]:>9} {ratings.tier_elo[i]:>6}"
+        )
+
+    if arguments.dry_run:
+        print("\nDry run, nothing written.")
+    else:
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            updated = write_ratings(conn, ratings)
+        print(
+            f"\nUpdated {updated:,} fighters in {time.perf_counter() - started:.1f}s. "
+            "Restart the bot to reload its fighter state."
+        )
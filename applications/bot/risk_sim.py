@@ -0,0 +1,100 @@
+import os
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+from src.backtest import BacktestParams, prepare
+from src.database import get_db_url
+from src.registry import load_active_weights
+from src.risk import simulate_bankrolls
+from src.snapshot import load_history
+
+if __name__ == "__main__":
+    defaults = BacktestParams()
+    arg_parser = ArgumentParser(
+        description=(
+            "Resample historical matches into many bankroll paths under the live "
+            "sizing rules and report the ruin probability and percentile curves."
+        )
+    )
+    arg_parser.add_argument("--paths", type=int, default=100_000)
+    arg_parser.add_argument("--steps", type=int, default=1_000, help="Bets per path.")
+    arg_parser.add_argument(
+        "--ruin-fraction",
+        type=float,
+        default=0.1,
+        help="A path is ruined once it drops to this share of the starting balance.",
+    )
+    arg_parser.add_argument("--seed", type=int)
+    arg_parser.add_argument("--rows", type=int, default=10, help="Curve rows to print.")
+    arg_parser.add_argument("--max-bet-cap", type=int, default=defaults.max_bet_cap)
+    arg_parser.add_argument("--x-tier-cap", type=int, default=defaults.x_tier_cap)
+    arg_parser.add_argument(
+        "--effective-balance-cap", type=int, default=defaults.effective_balance_cap
+    )
+    arg_parser.add_argument("--kelly-fraction", type=float, default=defaults.kelly_fraction)
+    arg_parser.add_argument("--confidence-cap", type=float, default=defaults.confidence_cap)
+    arg_parser.add_argument("--starting-balance", type=int, default=defaults.starting_balance)
+    arg_parser.add_argument(
+        "--default-weights",
+        action="store_true",
+        help="Use BettingEngine's built-in weights instead of the active model.",
+    )
+    arg_parser.add_argument(
+        "--snapshot",
+        type=Path,
+        help="Sync the match history into this columnar snapshot and memory-map it.",
+    )
+    arguments = arg_parser.parse_args()
+
+    if os.environ.get("PRODUCTION") is None:
+        load_dotenv(Path(__file__).parent.parent.parent / ".env")
+
+    started = time.perf_counter()
+    engine = create_engine(get_db_url())
+    with engine.connect() as conn:
+        history = load_history(conn, arguments.snapshot)
+        weights = None if arguments.default_weights else load_active_weights(conn)
+    prepared = prepare(history, weights)
+    print(
+        f"Prepared {len(prepared.prob_red):,} matches in "
+        f"{time.perf_counter() - started:.1f}s. Weights: {weights or 'default'}"
+    )
+
+    params = BacktestParams(
+        max_bet_cap=arguments.max_bet_cap,
+        x_tier_cap=arguments.x_tier_cap,
+        effective_balance_cap=arguments.effective_balance_cap,
+        kelly_fraction=arguments.kelly_fraction,
+        confidence_cap=arguments.confidence_cap,
+        starting_balance=arguments.starting_balance,
+    )
+    started = time.perf_counter()
+    report = simulate_bankrolls(
+        prepared,
+        params,
+        paths=arguments.paths,
+        steps=arguments.steps,
+        ruin_fraction=arguments.ruin_fraction,
+        seed=arguments.seed,
+    )
+    print(
+        f"Simulated {report.paths:,} paths x {report.steps:,} bets in "
+        f"{time.perf_counter() - started:.1f}s.\n"
+    )
+    print(
+        f"Ruin probability (balance <= ${report.ruin_threshold:,.0f}): "
+        f"{report.ruin_probability * 100:.2f}%\n"
+    )
+
+    percentiles = list(report.curves)
+    print("step".rjust(8) + "".join(f"p{pct}".rjust(14) for pct in percentiles))
+    stride = max(1, (len(report.checkpoints) - 1) // max(1, arguments.rows))
+    for row in list(range(0, len(report.checkpoints), stride))[: arguments.rows + 1]:
+        print(
+            f"{report.checkpoints[row]:>8}"
+            + "".join(f"{report.curves[pct][row]:>14,.0f}" for pct in percentiles)
+        )
@@ -1,12 +1,99 @@
+import json
 import logging
 import logging.handlers
 import os
+import queue as queue_module
+import signal
 from multiprocessing import Queue
 from pathlib import Path
-from time import sleep
+
+LOG_QUEUE_MAX_SIZE = 10_000
+LOG_BATCH_SIZE = 500
+
+
+class _BatchFlushMixin:
+    """Lets the listener write a whole batch of records before flushing once."""
+
+    deferred = False
+
+    def flush(self) -> None:
+        if not self.deferred:
+            super().flush()  # type: ignore[misc]
+
+
+class BatchStreamHandler(_BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+class BatchTimedRotatingFileHandler(
+    _BatchFlushMixin, logging.handlers.TimedRotatingFileHandler
+):
+    pass
+
+
+class BatchRotatingFileHandler(_BatchFlushMixin, logging.handlers.RotatingFileHandler):
+    pass
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Never blocks the producer. When the queue is full the record is dropped and
+    counted, and the count is reported with the next record that fits.
+    """
+
+    def __init__(self, queue: Queue) -> None:
+        super().__init__(queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if self.dropped:
+                self.queue.put_nowait(self._dropped_record(record))
+                self.dropped = 0
+            self.queue.put_nowait(record)
+        except queue_module.Full:
+            self.dropped += 1
+
+    def _dropped_record(self, record: logging.LogRecord) -> logging.LogRecord:
+        return logging.LogRecord(
+            name=record.name,
+            level=logging.WARNING,
+            pathname=__file__,
+            lineno=0,
+            msg="Log queue full, dropped %s records.",
+            args=(self.dropped,),
+            exc_info=None,
+        )
+
+
+class NdjsonFormatter(logging.Formatter):
+    """One compact JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "process": record.processName,
+            "level": record.levelname,
+            "logger": record.name,
+            "file": f"{record.filename}:{record.lineno}",
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, separators=(",", ":"), ensure_ascii=False)
+
+
+def create_log_queue() -> Queue:
+    return Queue(LOG_QUEUE_MAX_SIZE)
 
 
 def run_listener(queue: Queue, log_path: Path | None) -> None:
+    # Ctrl+C reaches the whole process group, but the listener outlives the other
+    # processes until the watchdog enqueues None, so their last records get written
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
     log_formatter = logging.Formatter(
         "%(asctime)s %(processName)s - %(levelname)s - %(name)s [%(filename)s:%(lineno)s] - %(message)s"
     )
@@ -19,30 +106,66 @@ def run_listener(queue: Queue, log_path: Path | None) -> None:
     root_logger.setLevel(log_level)
 
     # Add a stream handler to the root logger
-    stream_handler = logging.StreamHandler()
+    stream_handler = BatchStreamHandler()
     stream_handler.setLevel(log_level)
     stream_handler.setFormatter(log_formatter)
     root_logger.addHandler(stream_handler)
 
     if log_path:
-        timed_rotating_fh = logging.handlers.TimedRotatingFileHandler(
-            filename=f"{log_path}/saltybot.log",
-            utc=True,
-            backupCount=3,
-            when="midnight",
+        json_output = bool(os.environ.get("LOG_JSON"))
+        max_bytes = int(os.environ.get("LOG_MAX_BYTES") or 0)
+        file_name = "saltybot.ndjson" if json_output else "saltybot.log"
+
+        file_handler: logging.Handler
+        if max_bytes > 0:
+            file_handler = BatchRotatingFileHandler(
+                filename=f"{log_path}/{file_name}",
+                maxBytes=max_bytes,
+                backupCount=3,
+            )
+        else:
+            file_handler = BatchTimedRotatingFileHandler(
+                filename=f"{log_path}/{file_name}",
+                utc=True,
+                backupCount=3,
+                when="midnight",
+            )
+        file_handler.setFormatter(NdjsonFormatter() if json_output else log_formatter)
+        root_logger.addHandler(file_handler)
+        root_logger.info(
+            "Will log to a %s rotating file at: %s",
+            "size" if max_bytes > 0 else "time",
+            (log_path / file_name).resolve(),
         )
-        timed_rotating_fh.setFormatter(log_formatter)
-        root_logger.addHandler(timed_rotating_fh)
-        root_logger.info("Will log to a time rotating file at: %s", log_path.resolve())
 
     root_logger.info("Log level set to: %s", logging.getLevelName(log_level))
 
     while True:
-        while not queue.empty():
-            record = queue.get()
-            logger = logging.getLogger(record.name)
-            logger.handle(record)
-        sleep(1)
+        # Block until something arrives, then drain whatever else is already queued
+        batch = [queue.get()]
+        while len(batch) < LOG_BATCH_SIZE:
+            try:
+                batch.append(queue.get_nowait())
+            except queue_module.Empty:
+                break
+
+        _set_deferred(root_logger, True)
+        try:
+            for record in batch:
+                if record is None:
+                    return
+                logger = logging.getLogger(record.name)
+                logger.handle(record)
+        finally:
+            _set_deferred(root_logger, False)
+            for handler in root_logger.handlers:
+                handler.flush()
+
+
+def _set_deferred(logger: logging.Logger, deferred: bool) -> None:
+    for handler in logger.handlers:
+        if isinstance(handler, _BatchFlushMixin):
+            handler.deferred = deferred
 
 
 def get_watchdog_logger() -> logging.Logger:
@@ -59,7 +182,7 @@ def configure_process_logger(queue: Queue) -> None:
     if handler_registered is True:
         return
 
-    handler = logging.handlers.QueueHandler(queue)
+    handler = DroppingQueueHandler(queue)
     root_logger.addHandler(handler)
     root_logger.setLevel(_get_log_level())
 
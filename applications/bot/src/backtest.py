@@ -0,0 +1,222 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from src.betting_strategy import (
+    CONFIDENCE_CAP,
+    EFFECTIVE_BALANCE_CAP,
+    KELLY_FRACTION,
+    MAX_BET_CAP,
+    MIN_MATCHES,
+    STALE_THRESHOLD_HOURS,
+    X_TIER_CAP,
+    BettingEngine,
+)
+from src.features import COMP_LIVE, FeatureEngine
+from src.history import MatchHistory
+
+STARTING_BALANCE = 1_000_000
+
+
+@dataclass(frozen=True)
+class BacktestParams:
+    max_bet_cap: int = MAX_BET_CAP
+    x_tier_cap: int = X_TIER_CAP
+    effective_balance_cap: int = EFFECTIVE_BALANCE_CAP
+    kelly_fraction: float = KELLY_FRACTION
+    confidence_cap: float = CONFIDENCE_CAP
+    starting_balance: int = STARTING_BALANCE
+
+
+@dataclass
+class BacktestResult:
+    params: BacktestParams
+    bets: int
+    wins: int
+    wagered: int
+    profit: int
+    final_balance: int
+    max_drawdown: float
+
+    @property
+    def win_rate(self) -> float:
+        return (self.wins / self.bets * 100) if self.bets else 0.0
+
+    @property
+    def roi(self) -> float:
+        return (self.profit / self.wagered * 100) if self.wagered else 0.0
+
+    def as_row(self) -> dict:
+        return {
+            **asdict(self.params),
+            "bets": self.bets,
+            "win_rate": round(self.win_rate, 2),
+            "roi": round(self.roi, 2),
+            "profit": self.profit,
+            "final_balance": self.final_balance,
+            "max_drawdown": round(self.max_drawdown * 100, 2),
+        }
+
+
+@dataclass
+class PreparedBacktest:
+    """Everything about the replay that does not depend on the sizing constants."""
+
+    prob_red: np.ndarray
+    red_won: np.ndarray
+    bet_red: np.ndarray
+    bet_blue: np.ndarray
+    x_tier: np.ndarray
+    potato: np.ndarray
+
+
+LIVE_FEATURE_CONFIG = {
+    "min_matches": MIN_MATCHES,
+    "comp_mode": COMP_LIVE,
+    "stale_seconds": STALE_THRESHOLD_HOURS * 3600,
+}
+
+
+def live_features(history: MatchHistory) -> np.ndarray:
+    """Replays history computing features the way BettingEngine.get_bet does."""
+    return FeatureEngine(**LIVE_FEATURE_CONFIG).run(history)
+
+
+def prepare(
+    history: MatchHistory,
+    weights: dict | None = None,
+    features: np.ndarray | None = None,
+    include_tournaments: bool = False,
+) -> PreparedBacktest:
+    if features is None:
+        features = live_features(history)
+
+    # Tournaments run on their own wallet, replaying them into the main balance is wrong
+    rows = np.ones(len(history), dtype=bool)
+    if not include_tournaments:
+        rows = history.format_mask("matchmaking")
+
+    prob_red = BettingEngine(None, weights=weights).score_many(features[rows])
+    return PreparedBacktest(
+        prob_red=prob_red,
+        red_won=history.red_won[rows].astype(bool),
+        bet_red=history.bet_red[rows],
+        bet_blue=history.bet_blue[rows],
+        x_tier=history.tier_mask("X")[rows],
+        potato=history.tier_mask("P")[rows],
+    )
+
+
+@dataclass
+class SizingArrays:
+    """Per-match bet sizing inputs that don't depend on the running balance."""
+
+    scale: np.ndarray  # Share of the (capped) balance to wager
+    caps: np.ndarray  # Hard cap on the wager (X tier / MAX_BET_CAP / P tier)
+    won: np.ndarray  # Whether the side we bet on won
+    payout_ratio: np.ndarray  # Profit per unit wagered when winning
+
+
+def sizing_arrays(prepared: PreparedBacktest, params: BacktestParams) -> SizingArrays:
+    prob_red = np.clip(prepared.prob_red, 1 - params.confidence_cap, params.confidence_cap)
+    # P tier always gets the minimum bet on Red, exactly like get_bet
+    bet_red_side = (prob_red > 0.5) | prepared.potato
+    strength = (np.where(bet_red_side, prob_red, 1 - prob_red) - 0.5) * 2
+    own_pool = np.where(bet_red_side, prepared.bet_red, prepared.bet_blue)
+    other_pool = np.where(bet_red_side, prepared.bet_blue, prepared.bet_red)
+    caps = np.where(prepared.x_tier, min(params.x_tier_cap, params.max_bet_cap), params.max_bet_cap)
+    return SizingArrays(
+        scale=np.where(prepared.potato, 0.0, params.kelly_fraction * strength),
+        caps=np.where(prepared.potato, 1, caps),
+        won=bet_red_side == prepared.red_won,
+        payout_ratio=np.divide(
+            other_pool, own_pool, out=np.zeros(len(own_pool)), where=own_pool > 0
+        ),
+    )
+
+
+def simulate(prepared: PreparedBacktest, params: BacktestParams) -> BacktestResult:
+    """Runs the bankroll through every match with the live sizing rules."""
+    sizing = sizing_arrays(prepared, params)
+
+    balance = params.starting_balance
+    peak = balance
+    max_drawdown = 0.0
+    bets = wins = wagered = 0
+    cap = params.effective_balance_cap
+
+    # Compounding makes the bankroll path inherently sequential; keep the loop tight
+    for scale_i, cap_i, won_i, ratio_i in zip(
+        sizing.scale.tolist(),
+        sizing.caps.tolist(),
+        sizing.won.tolist(),
+        sizing.payout_ratio.tolist(),
+    ):
+        if balance <= 0:
+            break
+        wager = int((balance if balance < cap else cap) * scale_i)
+        wager = 1 if wager < 1 else (cap_i if wager > cap_i else wager)
+        bets += 1
+        wagered += wager
+        if won_i:
+            wins += 1
+            balance += int(wager * ratio_i)
+        else:
+            balance -= wager
+
+        if balance > peak:
+            peak = balance
+        elif peak > 0 and (peak - balance) / peak > max_drawdown:
+            max_drawdown = (peak - balance) / peak
+
+    return BacktestResult(
+        params=params,
+        bets=bets,
+        wins=wins,
+        wagered=wagered,
+        profit=balance - params.starting_balance,
+        final_balance=balance,
+        max_drawdown=max_drawdown,
+    )
+
+
+def parameter_grid(**choices: list) -> list[BacktestParams]:
+    names = list(choices)
+    return [
+        BacktestParams(**dict(zip(names, values)))
+        for values in itertools.product(*(choices[name] for name in names))
+    ]
+
+
+_worker_prepared: PreparedBacktest | None = None
+
+
+def _init_worker(prepared: PreparedBacktest) -> None:
+    global _worker_prepared  # pylint: disable=global-statement
+    _worker_prepared = prepared
+
+
+def _simulate_in_worker(params: BacktestParams) -> BacktestResult:
+    assert _worker_prepared is not None
+    return simulate(_worker_prepared, params)
+
+
+def sweep(
+    prepared: PreparedBacktest,
+    grid: list[BacktestParams],
+    workers: int | None = None,
+) -> list[BacktestResult]:
+    """Simulates every parameter set across a process pool, best ROI first."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(grid) == 1:
+        results = [simulate(prepared, params) for params in grid]
+    else:
+        chunksize = max(1, len(grid) // (workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(prepared,)
+        ) as pool:
+            results = list(pool.map(_simulate_in_worker, grid, chunksize=chunksize))
+    return sorted(results, key=lambda result: result.roi, reverse=True)
@@ -1,5 +1,8 @@
 import math
+from collections import OrderedDict
 from datetime import datetime, timezone
+
+import numpy as np
 from sqlalchemy import text
 
 # --- CONFIGURATION (Your Tuned Values) ---
@@ -8,10 +11,96 @@ X_TIER_CAP = 20000            # Kept strict for safety
 EFFECTIVE_BALANCE_CAP = 5000000 # Wealth preservation active
 MIN_MATCHES = 3               # Minimum sample size for H2H
 STALE_THRESHOLD_HOURS = 24    # Streak expiration
+PAIR_CACHE_SIZE = 4096        # Pairs kept in the feature cache
+CONFIDENCE_CAP = 0.85         # Skepticism clamp on the predicted probability
+KELLY_FRACTION = 0.05         # Base share of the (capped) balance we risk
+
+# Column order of feature matrices passed to score_many / bet_many
+FEATURE_COLUMNS = ("tier_elo", "streak", "h2h", "comp")
+
+class PairFeatureCache:
+    """
+    Bounded LRU of computed pair features, keyed on the unordered fighter pair.
+
+    H2H/comp are stored oriented towards the lower fighter ID, so a rematch with
+    the colours swapped is still a hit. The final probability is only reused when
+    the orientation, Elo/streak diffs and weights it was computed from all match.
+    Entries are dropped as soon as either fighter records a result (see `invalidate`).
+    """
+
+    def __init__(self, maxsize=PAIR_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.by_fighter = {}
+        self.hits = 0
+        self.misses = 0
+        self.prob_hits = 0
+
+    def get_features(self, red_id, blue_id):
+        entry = self.entries.get(self._key(red_id, blue_id))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(self._key(red_id, blue_id))
+        h2h, comp = entry[0], entry[1]
+        return (h2h, comp) if red_id < blue_id else (-h2h, -comp)
+
+    def put_features(self, red_id, blue_id, h2h, comp):
+        key = self._key(red_id, blue_id)
+        if red_id > blue_id: h2h, comp = -h2h, -comp
+        self.entries[key] = [h2h, comp, None, None]
+        self.entries.move_to_end(key)
+        self.by_fighter.setdefault(red_id, set()).add(key)
+        self.by_fighter.setdefault(blue_id, set()).add(key)
+        while len(self.entries) > self.maxsize:
+            self._drop(next(iter(self.entries)))
+
+    def get_probability(self, red_id, blue_id, signature):
+        entry = self.entries.get(self._key(red_id, blue_id))
+        if entry is None or entry[2] != signature: return None
+        self.prob_hits += 1
+        return entry[3]
+
+    def put_probability(self, red_id, blue_id, signature, prob):
+        entry = self.entries.get(self._key(red_id, blue_id))
+        if entry is not None: entry[2], entry[3] = signature, prob
+
+    def invalidate(self, fighter_id):
+        for key in self.by_fighter.pop(fighter_id, ()):
+            self._drop(key)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries), "hits": self.hits, "misses": self.misses,
+            "prob_hits": self.prob_hits, "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+    def _drop(self, key):
+        if self.entries.pop(key, None) is None: return
+        low, high = key
+        for fighter_id in (low, high):
+            keys = self.by_fighter.get(fighter_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys: del self.by_fighter[fighter_id]
+
+    @staticmethod
+    def _key(a, b):
+        return (a, b) if a < b else (b, a)
 
 class BettingEngine:
-    def __init__(self, db_session, weights=None):
+    def __init__(self, db_session, weights=None, store=None, cache=None):
+        """
+        When a FighterStateStore is given every feature is read from memory and the
+        database session is never touched. A PairFeatureCache skips recomputing
+        features (and the probability) for pairs seen recently.
+        """
         self.db = db_session
+        self.store = store
+        self.cache = cache
+        self.last_features = None  # Features and raw probability behind the last get_bet
         self.weights = weights if weights else {
             "intercept": -0.02,
             "tier_elo": 0.0055,
@@ -21,6 +110,8 @@ class BettingEngine:
         }
 
     def get_fighter(self, name):
+        if self.store is not None:
+            return self.store.get(name)
         query = text("SELECT * FROM fighter WHERE name = :name")
         row = self.db.execute(query, {"name": name}).fetchone()
         return row
@@ -42,6 +133,11 @@ class BettingEngine:
 
     def get_h2h_score(self, red_id, blue_id):
         """Returns H2H advantage (-0.5 to 0.5) only if enough matches exist."""
+        if self.store is not None:
+            red_wins, total = self.store.h2h_record(red_id, blue_id)
+            if total < MIN_MATCHES: return 0.0
+            return (red_wins / total) - 0.5
+
         query = text("""SELECT winner FROM match WHERE (fighter_red = :r AND fighter_blue = :b) OR (fighter_red = :b AND fighter_blue = :r)""")
         matches = self.db.execute(query, {"r": red_id, "b": blue_id}).fetchall()
         
@@ -52,6 +148,11 @@ class BettingEngine:
 
     def get_comp_score(self, red_id, blue_id):
         """Returns Common Opponent advantage."""
+        if self.store is not None:
+            common_wins, common_total = self.store.common_record(red_id, blue_id)
+            if common_total < MIN_MATCHES: return 0.0
+            return (common_wins / common_total) - 0.5
+
         # Simplified query for speed
         q_red = text("SELECT fighter_red, fighter_blue, winner FROM match WHERE fighter_red = :id OR fighter_blue = :id LIMIT 100")
         q_blue = text("SELECT fighter_red, fighter_blue, winner FROM match WHERE fighter_red = :id OR fighter_blue = :id LIMIT 100")
@@ -83,6 +184,7 @@ class BettingEngine:
         return (common_wins / common_total) - 0.5
 
     def get_bet(self, red_name, blue_name, balance):
+        self.last_features = None
         red = self.get_fighter(red_name)
         blue = self.get_fighter(blue_name)
 
@@ -94,23 +196,33 @@ class BettingEngine:
         # --- FEATURE CALCULATION ---
         streak_diff = self.get_safe_streak(red) - self.get_safe_streak(blue)
         elo_diff = red.tier_elo - blue.tier_elo
-        h2h_val = self.get_h2h_score(red.id, blue.id)
-        comp_val = self.get_comp_score(red.id, blue.id)
-
-        z = (self.weights.get('intercept', 0.0) + 
-             (self.weights.get('tier_elo', 0.0) * elo_diff) +
-             (self.weights.get('streak', 0.0) * streak_diff) + 
-             (self.weights.get('h2h', 0.0) * h2h_val) +
-             (self.weights.get('comp', 0.0) * comp_val))
-             
-        try: prob_red = 1 / (1 + math.exp(-z))
-        except OverflowError: prob_red = 0.0 if z < 0 else 1.0
+        cached = self.cache.get_features(red.id, blue.id) if self.cache else None
+        if cached:
+            h2h_val, comp_val = cached
+        else:
+            h2h_val = self.get_h2h_score(red.id, blue.id)
+            comp_val = self.get_comp_score(red.id, blue.id)
+            if self.cache: self.cache.put_features(red.id, blue.id, h2h_val, comp_val)
+
+        signature = (red.id, elo_diff, streak_diff, tuple(sorted(self.weights.items())))
+        prob_red = self.cache.get_probability(red.id, blue.id, signature) if self.cache else None
+        if prob_red is None:
+            z = (self.weights.get('intercept', 0.0) + 
+                 (self.weights.get('tier_elo', 0.0) * elo_diff) +
+                 (self.weights.get('streak', 0.0) * streak_diff) + 
+                 (self.weights.get('h2h', 0.0) * h2h_val) +
+                 (self.weights.get('comp', 0.0) * comp_val))
+
+            try: prob_red = 1 / (1 + math.exp(-z))
+            except OverflowError: prob_red = 0.0 if z < 0 else 1.0
+            if self.cache: self.cache.put_probability(red.id, blue.id, signature, prob_red)
+        self.last_features = {"tier_elo": elo_diff, "streak": streak_diff, "h2h": h2h_val, "comp": comp_val, "prob_red": prob_red}
 
         # --- SKEPTICISM ENGINE ---
         
         # 1. Clamp Confidence (Prevent 99% certainty)
-        if prob_red > 0.85: prob_red = 0.85
-        if prob_red < 0.15: prob_red = 0.15
+        if prob_red > CONFIDENCE_CAP: prob_red = CONFIDENCE_CAP
+        if prob_red < 1 - CONFIDENCE_CAP: prob_red = 1 - CONFIDENCE_CAP
 
         if prob_red > 0.5: color = "red"; confidence = prob_red
         else: color = "blue"; confidence = 1 - prob_red
@@ -122,7 +234,7 @@ class BettingEngine:
         # 3. Dynamic Kelly (Risk Management)
         # 5% Base * Strength Factor (0 to 1)
         strength = (confidence - 0.5) * 2
-        wager = int(betting_balance * 0.05 * strength)
+        wager = int(betting_balance * KELLY_FRACTION * strength)
 
         # 4. X-Tier Safety Cap (Gimmick Matches)
         if red.tier == 'X' or blue.tier == 'X': 
@@ -131,4 +243,45 @@ class BettingEngine:
         # 5. Final Sanity Checks
         wager = min(max(1, wager), MAX_BET_CAP)
         
-        return wager, color, confidence
\ No newline at end of file
+        return wager, color, confidence
+
+    def score_many(self, feature_matrix):
+        """
+        Vectorized probability that Red wins for every row of `feature_matrix`.
+
+        Columns follow FEATURE_COLUMNS: elo diff, streak diff, h2h, comp. No
+        clamping is applied, same as the raw probability inside get_bet.
+        """
+        features = np.asarray(feature_matrix, dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS))
+        coefs = np.array([self.weights.get(name, 0.0) for name in FEATURE_COLUMNS])
+        z = self.weights.get('intercept', 0.0) + features @ coefs
+        with np.errstate(over='ignore'):
+            return 1 / (1 + np.exp(-z))
+
+    def bet_many(self, feature_matrix, balance, x_tier=None, potato=None,
+                 max_bet_cap=MAX_BET_CAP, x_tier_cap=X_TIER_CAP,
+                 effective_balance_cap=EFFECTIVE_BALANCE_CAP,
+                 kelly_fraction=KELLY_FRACTION, confidence_cap=CONFIDENCE_CAP):
+        """
+        Vectorized get_bet. `balance` is a scalar or one balance per row, `x_tier`
+        and `potato` are optional boolean masks for rows involving an X or P tier
+        fighter. Returns (wagers, colours, confidences) as arrays, applying the
+        same clamping, X-tier cap and MAX_BET_CAP rules as get_bet.
+        """
+        prob_red = np.clip(self.score_many(feature_matrix), 1 - confidence_cap, confidence_cap)
+        red = prob_red > 0.5
+        confidence = np.where(red, prob_red, 1 - prob_red)
+        colours = np.where(red, "red", "blue")
+
+        betting_balance = np.minimum(balance, effective_balance_cap)
+        strength = (confidence - 0.5) * 2
+        wagers = (betting_balance * kelly_fraction * strength).astype(np.int64)
+        if x_tier is not None:
+            wagers = np.where(x_tier, np.minimum(wagers, x_tier_cap), wagers)
+        wagers = np.clip(wagers, 1, max_bet_cap)
+
+        if potato is not None:
+            wagers = np.where(potato, 1, wagers)
+            colours = np.where(potato, "red", colours)
+            confidence = np.where(potato, 0.5, confidence)
+        return wagers, colours, confidence
@@ -0,0 +1,90 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+FORMAT_VERSION = 1
+IN_FLIGHT_MAX_AGE = 600.0  # Seconds; older match state belongs to a match that is long over
+
+
+def state_path() -> Path:
+    """BOT_STATE_PATH, or a file in the temporary directory that survives process restarts."""
+    return Path(os.environ.get("BOT_STATE_PATH") or Path(tempfile.gettempdir()) / "saltyboy-bot-state.json")
+
+
+@dataclass
+class BotState:
+    """
+    What BotProcess keeps in memory between IRC messages: the match being bet on
+    and the wallet, plus the weights and counters that outlive it.
+    """
+
+    saved_at: float = 0.0  # Unix time
+    match: dict | None = None  # Match.state()
+    match_info: dict | None = None  # SaltyBoy's current_match_info response
+    bet_colour: str | None = None
+    wager: int | None = None
+    balance_snapshot: int | None = None
+    features_id: int | None = None
+    features: dict | None = None
+    pool_red: int = 0
+    pool_blue: int = 0
+    wallet: dict | None = None  # WalletLedger.state()
+    balance: int = 1000
+    matches_tracked: int = 0
+    weights: dict | None = None
+    weights_version: int | None = None
+
+    @property
+    def in_flight(self) -> bool:
+        """Whether the match state is recent enough to belong to the current match."""
+        return time.time() - self.saved_at <= IN_FLIGHT_MAX_AGE
+
+
+def save_state(path: Path, state: BotState, logger: logging.Logger) -> None:
+    """
+    Writes `state` next to `path` and renames it over `path`, so a process killed
+    mid-write leaves the previous snapshot intact. Failures are only logged: a
+    missing snapshot costs a cold start, never a bet.
+    """
+    state.saved_at = time.time()
+    tmp = path.with_name(f"{path.name}.tmp")
+    try:
+        tmp.write_text(json.dumps({"format_version": FORMAT_VERSION, "state": asdict(state)}))
+        os.replace(tmp, path)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning(f"Could not save the bot state to {path}: {e}")
+
+
+def load_state(path: Path, logger: logging.Logger) -> BotState | None:
+    """
+    The last saved state, or None if there is none that can be read. Match and
+    wallet fields are dropped from a snapshot older than IN_FLIGHT_MAX_AGE.
+    """
+    try:
+        snapshot = json.loads(path.read_text())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable bot state {path}: {e}")
+        return None
+    if snapshot.get("format_version") != FORMAT_VERSION:
+        return None
+    try:
+        state = BotState(**snapshot["state"])
+    except (KeyError, TypeError) as e:
+        logger.warning(f"Ignoring malformed bot state {path}: {e}")
+        return None
+
+    if state.in_flight:
+        return state
+    return BotState(
+        saved_at=state.saved_at,
+        balance=state.balance,
+        matches_tracked=state.matches_tracked,
+        weights=state.weights,
+        weights_version=state.weights_version,
+    )
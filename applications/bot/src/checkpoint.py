@@ -0,0 +1,91 @@
+import io
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import text
+
+from src.features import FeatureEngine
+from src.history import MatchHistory, count_matches_up_to, load_match_history, match_date
+
+FORMAT_VERSION = 1
+# The checkpoint is taken this far behind the newest match. Back-filled matches
+# are mostly recent (whatever ran while the bot was away), so they land after
+# the watermark and are replayed in date order instead of invalidating it.
+CHECKPOINT_LAG = timedelta(days=7)
+
+
+@dataclass
+class Replay:
+    history: MatchHistory  # Only the matches replayed in this run
+    features: np.ndarray  # Pre-match features of `history`
+    offset: int  # Matches before `history` (already covered by the checkpoint)
+    resumed: bool
+
+
+def replay_incremental(connection, name: str, **config) -> Replay:
+    """
+    Brings a FeatureEngine up to date with the match table and checkpoints it.
+
+    The checkpoint stores the engine state and a (date, id) watermark taken
+    CHECKPOINT_LAG behind the newest match, so every run replays that last stretch
+    again. It is used only if the number of finished matches up to the watermark
+    is unchanged; matches back-filled (or deleted) further back than the lag make
+    it stale and the whole history is replayed instead.
+    """
+    row = connection.execute(
+        text(
+            "SELECT format_version, last_match_id, last_match_date, matches_processed, state "
+            "FROM feature_checkpoint WHERE name = :name"
+        ),
+        {"name": name},
+    ).fetchone()
+
+    engine, after, fighter_ids = None, None, None
+    if row and row.format_version == FORMAT_VERSION and count_matches_up_to(connection, row.last_match_date, row.last_match_id) == row.matches_processed:
+        arrays = dict(np.load(io.BytesIO(row.state)))
+        fighter_ids = arrays.pop("fighter_ids")
+        engine = FeatureEngine.from_state_arrays(arrays, **config)
+        after = (row.last_match_date, row.last_match_id)
+    resumed = engine is not None
+    if not resumed:
+        engine = FeatureEngine(**config)
+
+    offset = engine.matches_processed
+    history = load_match_history(connection, after=after, fighter_ids=fighter_ids)
+    if not len(history):
+        return Replay(history=history, features=np.empty((0, 4)), offset=offset, resumed=resumed)
+
+    lag_start = history.date[-1] - int(CHECKPOINT_LAG.total_seconds())
+    cut = int(np.searchsorted(history.date, lag_start, side="right"))
+    features = engine.run(history, stop=cut)
+    if cut:
+        _save(connection, name, engine, history, cut)
+    features = np.concatenate([features, engine.run(history, start=cut)])
+    return Replay(history=history, features=features, offset=offset, resumed=resumed)
+
+
+def _save(connection, name: str, engine: FeatureEngine, history: MatchHistory, processed: int) -> None:
+    """Checkpoints the engine positioned after the first `processed` matches of `history`."""
+    last_match_id = int(history.match_id[processed - 1])
+    last_match_date = match_date(connection, last_match_id)
+
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, fighter_ids=history.fighter_ids, **engine.state_arrays())
+    connection.execute(text("DELETE FROM feature_checkpoint WHERE name = :name"), {"name": name})
+    connection.execute(
+        text(
+            "INSERT INTO feature_checkpoint "
+            "(name, format_version, last_match_id, last_match_date, matches_processed, state, created_time) "
+            "VALUES (:name, :format_version, :last_match_id, :last_match_date, :matches_processed, :state, :created_time)"
+        ),
+        {
+            "name": name,
+            "format_version": FORMAT_VERSION,
+            "last_match_id": last_match_id,
+            "last_match_date": last_match_date,
+            "matches_processed": engine.matches_processed,
+            "state": buffer.getvalue(),
+            "created_time": datetime.now(timezone.utc),
+        },
+    )
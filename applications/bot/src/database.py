@@ -1,15 +1,18 @@
+import io
 import logging
 import math
 import os
 import time
+from dataclasses import dataclass
 from datetime import datetime, timezone
 
 import psycopg2
 import psycopg2.extras
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, BigInteger, Float
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, BigInteger, Float, LargeBinary
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
 from src.objects import Match as BotMatchObject, MatchFormat
+from src.wallet import bet_profit
 
 # --- 1. SQLALCHEMY SETUP ---
 
@@ -23,8 +26,40 @@ def get_db_url():
     db_name = os.getenv("POSTGRES_DB", "saltyboy")
     return f"postgresql://{user}:{password}@{host}:{port}/{db_name}"
 
-engine = create_engine(get_db_url())
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_engine = None
+_engine_pid: int | None = None
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+def get_engine():
+    """
+    The process's engine, created on first use rather than at import so processes
+    that never touch SQLAlchemy don't build one, and so it reads the environment
+    after main.py has loaded the .env file. A forked child gets a fresh engine and
+    leaves the parent's pooled connections alone.
+    """
+    global _engine, _engine_pid
+    if _engine is None or _engine_pid != os.getpid():
+        if _engine is not None: _engine.dispose(close=False)
+        _engine, _engine_pid = create_engine(get_db_url()), os.getpid()
+    return _engine
+
+def get_session() -> Session:
+    return SessionLocal(bind=get_engine())
+
+ELO_K_FACTOR = 32
+
+def copy_rows(connection, table: str, columns: list[str], rows) -> None:
+    """Bulk-loads tuples with COPY through the psycopg2 connection behind a SQLAlchemy one."""
+    buffer = io.StringIO()
+    for values in rows:
+        buffer.write("\t".join("\\N" if value is None else str(value) for value in values))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+    finally:
+        cursor.close()
 
 class Match(Base):
     __tablename__ = "match"
@@ -44,6 +79,7 @@ class Match(Base):
     my_wager = Column(BigInteger, nullable=True)
     match_balance = Column(BigInteger, nullable=True)
     expected_payout = Column(BigInteger, nullable=True)
+    my_profit = Column(BigInteger, nullable=True)  # What my_wager made, NULL without a bet
 
 class Fighter(Base):
     __tablename__ = "fighter"
@@ -60,6 +96,7 @@ class Fighter(Base):
     last_match_date = Column(DateTime, nullable=True)
 
 class ModelWeight(Base):
+    """Model registry. The ID is the model version, at most one row is active."""
     __tablename__ = "model_weight"
     id = Column(Integer, primary_key=True, autoincrement=True)
     timestamp = Column(DateTime, default=datetime.now(timezone.utc))
@@ -67,10 +104,139 @@ class ModelWeight(Base):
     tier_elo = Column(Float)
     h2h = Column(Float)
     comp = Column(Float)
-    streak = Column(Float, nullable=True) 
+    streak = Column(Float, nullable=True)
+    active = Column(Boolean, default=False)  # The weights the bot loads at startup
+    source = Column(String, nullable=True)  # "retrain", "online" or "cli"
+    trained_rows = Column(Integer, nullable=True)
+    window_start = Column(DateTime, nullable=True)  # Dates of the first and last training match
+    window_end = Column(DateTime, nullable=True)
+    log_loss = Column(Float, nullable=True)  # Mean out-of-sample walk-forward scores
+    accuracy = Column(Float, nullable=True)
+    roi = Column(Float, nullable=True)
+
+class PerformanceRollup(Base):
+    """Our bets per hour of match time, kept up to date by Database.record_match."""
+    __tablename__ = "performance_rollup"
+    bucket_start = Column(DateTime, primary_key=True)  # date_trunc('hour', match.date)
+    bets = Column(Integer, default=0)
+    wins = Column(Integer, default=0)
+    wagered = Column(BigInteger, default=0)
+    profit = Column(BigInteger, default=0)
+    last_balance = Column(BigInteger, nullable=True)  # match_balance of the hour's latest match that has one
+
+class FighterSync(Base):
+    """Per-fighter watermark of what has been pulled from the SaltyBoy match API."""
+    __tablename__ = "fighter_sync"
+    fighter_id = Column(BigInteger, primary_key=True)
+    last_match_id = Column(BigInteger, nullable=True)
+    synced_count = Column(Integer, default=0)
+    last_synced = Column(DateTime(timezone=True))
+
+class MatchFeatures(Base):
+    """
+    Feature vector a prediction was made from. Bet-time rows are written before the
+    match exists and linked to it once it is recorded; replayed rows cover history.
+    """
+    __tablename__ = "match_features"
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    match_id = Column(BigInteger, nullable=True, unique=True)
+    model_version = Column(Integer, nullable=True)  # model_weight.id, NULL for the built-in weights
+    tier_elo = Column(Float)
+    streak = Column(Float)
+    h2h = Column(Float)
+    comp = Column(Float)
+    prob_red = Column(Float, nullable=True)
+    source = Column(String)  # "bet" or "replay"
+    created_time = Column(DateTime(timezone=True))
+
+class FeatureCheckpoint(Base):
+    """Serialized FeatureEngine state after replaying history up to a (date, id) watermark."""
+    __tablename__ = "feature_checkpoint"
+    name = Column(String, primary_key=True)  # One checkpoint per feature definition
+    format_version = Column(Integer)
+    last_match_id = Column(BigInteger)
+    last_match_date = Column(DateTime)
+    matches_processed = Column(BigInteger)
+    state = Column(LargeBinary)
+    created_time = Column(DateTime(timezone=True))
 
 # --- 2. DATABASE CLASS ---
 
+@dataclass
+class RecordedMatch:
+    match: dict
+    fighters: list[dict]  # Post-match state of the red and blue fighters
+
+
+@dataclass
+class Performance:
+    balance: int
+    bets: int
+    wins: int
+    wagered: int
+    profit: int
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.bets * 100 if self.bets else 0.0
+
+    @property
+    def roi(self) -> float:
+        return self.profit / self.wagered * 100 if self.wagered else 0.0
+
+
+ROLLUP_UPSERT = """
+    INSERT INTO performance_rollup AS r (bucket_start, bets, wins, wagered, profit, last_balance)
+    VALUES (date_trunc('hour', %(date)s::timestamp), %(bets)s, %(wins)s, %(wagered)s, %(profit)s, %(balance)s)
+    ON CONFLICT (bucket_start) DO UPDATE SET
+        bets = r.bets + EXCLUDED.bets,
+        wins = r.wins + EXCLUDED.wins,
+        wagered = r.wagered + EXCLUDED.wagered,
+        profit = r.profit + EXCLUDED.profit,
+        last_balance = COALESCE(EXCLUDED.last_balance, r.last_balance)
+"""
+
+# The one definition of a performance window, shared with the web app. A number
+# is the last N bets (through the partial idx_match_bets index), "day" and "week"
+# sum the hourly rollups since then (rounded down to the hour).
+PERFORMANCE_FUNCTION = """
+    CREATE OR REPLACE FUNCTION performance(bet_window TEXT)
+    RETURNS TABLE (balance BIGINT, bets BIGINT, wins BIGINT, wagered BIGINT, profit BIGINT)
+    LANGUAGE plpgsql STABLE AS $$
+    BEGIN
+        balance := (SELECT r.last_balance FROM performance_rollup r WHERE r.last_balance IS NOT NULL ORDER BY r.bucket_start DESC LIMIT 1);
+        IF bet_window ~ '^0*[1-9][0-9]{0,8}$' THEN
+            SELECT count(*), count(*) FILTER (WHERE recent.my_profit >= 0), COALESCE(sum(recent.my_wager), 0), COALESCE(sum(recent.my_profit), 0)
+            INTO bets, wins, wagered, profit
+            FROM (SELECT m.my_wager, m.my_profit FROM match m WHERE m.my_profit IS NOT NULL ORDER BY m.date DESC LIMIT bet_window::INTEGER) recent;
+        ELSIF bet_window IN ('day', 'week') THEN
+            SELECT COALESCE(sum(r.bets), 0), COALESCE(sum(r.wins), 0), COALESCE(sum(r.wagered), 0), COALESCE(sum(r.profit), 0)
+            INTO bets, wins, wagered, profit
+            FROM performance_rollup r WHERE r.bucket_start >= date_trunc('hour', localtimestamp - ('1 ' || bet_window)::INTERVAL);
+        ELSE
+            RAISE EXCEPTION 'Unknown performance window %, expected a number of bets, day or week', quote_literal(bet_window)
+                USING ERRCODE = 'invalid_parameter_value';
+        END IF;
+        RETURN NEXT;
+    END
+    $$
+"""
+
+ROLLUP_REBUILD = """
+    INSERT INTO performance_rollup (bucket_start, bets, wins, wagered, profit, last_balance)
+    SELECT date_trunc('hour', date),
+           count(my_profit),
+           count(*) FILTER (WHERE my_profit >= 0),
+           COALESCE(sum(my_wager) FILTER (WHERE my_profit IS NOT NULL), 0),
+           COALESCE(sum(my_profit), 0),
+           (array_agg(match_balance ORDER BY date DESC) FILTER (WHERE match_balance IS NOT NULL))[1]
+    FROM match
+    WHERE my_profit IS NOT NULL OR match_balance IS NOT NULL
+    GROUP BY 1
+    ON CONFLICT (bucket_start) DO NOTHING
+"""
+
+
 class Database:
     ACCEPTED_MATCH_FORMATS = [MatchFormat.MATCHMAKING, MatchFormat.TOURNAMENT]
 
@@ -129,6 +295,15 @@ class Database:
             cursor.execute("ALTER TABLE fighter ADD COLUMN IF NOT EXISTS current_streak INTEGER DEFAULT 0")
             cursor.execute("ALTER TABLE fighter ADD COLUMN IF NOT EXISTS last_match_date TIMESTAMP WITH TIME ZONE")
             cursor.execute("ALTER TABLE model_weight ADD COLUMN IF NOT EXISTS streak FLOAT DEFAULT 0.0")
+            cursor.execute("ALTER TABLE model_weight ADD COLUMN IF NOT EXISTS active BOOLEAN DEFAULT FALSE")
+            cursor.execute("ALTER TABLE model_weight ADD COLUMN IF NOT EXISTS source VARCHAR")
+            cursor.execute("ALTER TABLE model_weight ADD COLUMN IF NOT EXISTS trained_rows INTEGER")
+            cursor.execute("ALTER TABLE model_weight ADD COLUMN IF NOT EXISTS window_start TIMESTAMP")
+            cursor.execute("ALTER TABLE model_weight ADD COLUMN IF NOT EXISTS window_end TIMESTAMP")
+            cursor.execute("ALTER TABLE model_weight ADD COLUMN IF NOT EXISTS log_loss FLOAT")
+            cursor.execute("ALTER TABLE model_weight ADD COLUMN IF NOT EXISTS accuracy FLOAT")
+            cursor.execute("ALTER TABLE model_weight ADD COLUMN IF NOT EXISTS roi FLOAT")
+            cursor.execute("ALTER TABLE match ADD COLUMN IF NOT EXISTS my_profit BIGINT")
             
             # 3. THE BIGINT FIX (Safe IDs)
             try:
@@ -152,6 +327,9 @@ class Database:
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_match_fighter_red ON match (fighter_red)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_match_fighter_blue ON match (fighter_blue)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_match_date ON match (date)")
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_model_weight_active ON model_weight (active) WHERE active")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_match_bets ON match (date) WHERE my_profit IS NOT NULL")
+            cursor.execute(PERFORMANCE_FUNCTION)
             
             self.connection.commit()
             self.logger.info("Database migrations & indexes applied successfully.")
@@ -161,72 +339,99 @@ class Database:
         finally:
             cursor.close()
 
+        # 5. Bets recorded before the rollup existed
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM performance_rollup)")
+            empty = not cursor.fetchone()[0]
+            self.connection.commit()
+            if empty:
+                self.logger.info(f"Rebuilt the performance rollup, back-filled the profit of {self.rebuild_performance()} bets.")
+        except Exception as e:
+            self.connection.rollback()
+            self.logger.warning(f"Performance rollup check warning: {e}")
+        finally:
+            cursor.close()
+
+    def rebuild_performance(self) -> int:
+        """
+        Fills in match.my_profit where it is missing and rebuilds performance_rollup
+        from the match table. Returns the bets whose profit was filled in.
+        """
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("""
+                SELECT id, my_bet_on, my_wager, winner = fighter_red, bet_red, bet_blue
+                FROM match
+                WHERE my_wager > 0 AND my_bet_on IS NOT NULL AND winner IS NOT NULL AND my_profit IS NULL
+            """)
+            profits = [
+                (match_id, bet_profit(colour, wager, "Red" if red_won else "Blue", pool_red or 0, pool_blue or 0))
+                for match_id, colour, wager, red_won, pool_red, pool_blue in cursor.fetchall()
+            ]
+            if profits:
+                psycopg2.extras.execute_values(
+                    cursor, "UPDATE match SET my_profit = v.profit FROM (VALUES %s) AS v (id, profit) WHERE match.id = v.id", profits
+                )
+            cursor.execute("DELETE FROM performance_rollup")
+            cursor.execute(ROLLUP_REBUILD)
+            self.connection.commit()
+            return len(profits)
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
     def generate_safe_id(self):
         """Generates a unique ID based on current timestamp (microseconds)."""
         return int(time.time() * 1000000)
 
-    # --- NEW: REPORTING METHOD ---
-    def get_recent_performance(self, limit=100):
-        """Calculates Balance, Win Rate, and ROI for the last N matches."""
+    def get_performance(self, window: str = "100") -> Performance:
+        """
+        Our latest balance and the results of the last `window` bets, or of the
+        last "day" or "week" (see PERFORMANCE_FUNCTION). Raises ValueError for any
+        other window.
+        """
         cursor = self.connection.cursor()
         try:
-            # 1. Get current balance
-            cursor.execute("SELECT match_balance FROM match WHERE match_balance IS NOT NULL ORDER BY date DESC LIMIT 1")
-            row = cursor.fetchone()
-            current_balance = row[0] if row else 0
-
-            # 2. Get last N bets for stats
-            cursor.execute("""
-                SELECT my_wager, my_bet_on, winner, fighter_red, fighter_blue, bet_red, bet_blue 
-                FROM match 
-                WHERE my_wager IS NOT NULL AND winner IS NOT NULL 
-                ORDER BY date DESC LIMIT %s
-            """, (limit,))
-            rows = cursor.fetchall()
-
-            wins = 0
-            total_invested = 0
-            net_profit = 0
-            
-            for r in rows:
-                wager = r[0]
-                my_bet = r[1]
-                winner_id = r[2]
-                red_id, blue_id = r[3], r[4]
-                pool_red, pool_blue = r[5], r[6]
-                
-                if not wager: continue
-                total_invested += wager
-                
-                won = False
-                if my_bet == 'Red' and winner_id == red_id: won = True
-                elif my_bet == 'Blue' and winner_id == blue_id: won = True
-                
-                if won:
-                    wins += 1
-                    profit = 0
-                    if my_bet == 'Red' and pool_red > 0:
-                        profit = wager * (pool_blue / pool_red)
-                    elif my_bet == 'Blue' and pool_blue > 0:
-                        profit = wager * (pool_red / pool_blue)
-                    net_profit += profit
-                else:
-                    net_profit -= wager
-
-            total_bets = len(rows)
-            win_rate = (wins / total_bets * 100) if total_bets > 0 else 0.0
-            roi = (net_profit / total_invested * 100) if total_invested > 0 else 0.0
-            
-            return current_balance, win_rate, roi, total_bets
-
+            cursor.execute("SELECT * FROM performance(%s)", (window,))
+            balance, bets, wins, wagered, profit = cursor.fetchone()
+            self.connection.commit()
+            return Performance(balance or 0, int(bets), int(wins), int(wagered), int(profit))
+        except psycopg2.errors.InvalidParameterValue as e:
+            self.connection.rollback()
+            raise ValueError(e.diag.message_primary) from e
         except Exception as e:
+            self.connection.rollback()
             self.logger.error(f"Failed to calc stats: {e}")
-            return 0, 0.0, 0.0, 0
+            return Performance(0, 0, 0, 0, 0)
+        finally:
+            cursor.close()
+
+    def record_features(self, features: dict, model_version: int | None = None) -> int | None:
+        """Stores the features behind a live prediction, returning the row ID to link later."""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                """
+                INSERT INTO match_features (model_version, tier_elo, streak, h2h, comp, prob_red, source, created_time)
+                VALUES (%s, %s, %s, %s, %s, %s, 'bet', %s)
+                RETURNING id
+                """,
+                (model_version, features["tier_elo"], features["streak"], features["h2h"], features["comp"], features["prob_red"], datetime.now(timezone.utc)),
+            )
+            features_id = cursor.fetchone()[0]
+            self.connection.commit()
+            return features_id
+        except Exception as e:
+            self.connection.rollback()
+            self.logger.error(f"Failed to store match features: {e}")
+            return None
         finally:
             cursor.close()
-    # -----------------------------
 
-    def record_match(self, match: BotMatchObject, my_bet: str = None, my_wager: int = None, match_balance: int = None, expected_payout: int = None) -> None:
+    def record_match(self, match: BotMatchObject, my_bet: str = None, my_wager: int = None, match_balance: int = None, expected_payout: int = None, features_id: int | None = None) -> RecordedMatch | None:
         if match.match_format not in self.ACCEPTED_MATCH_FORMATS: return
         if match.streak_red is None or match.streak_blue is None: return
 
@@ -241,6 +446,9 @@ class Database:
         else: return
 
         safe_id = self.generate_safe_id()
+        my_profit = None
+        if my_bet and my_wager:
+            my_profit = bet_profit(my_bet, my_wager, "Red" if winner == fighter_red["id"] else "Blue", match.bet_red, match.bet_blue)
 
         insert_obj = {
             "id": safe_id,
@@ -258,7 +466,8 @@ class Database:
             "my_bet_on": my_bet,
             "my_wager": my_wager,
             "match_balance": match_balance,
-            "expected_payout": expected_payout
+            "expected_payout": expected_payout,
+            "my_profit": my_profit,
         }
 
         cursor = self.connection.cursor()
@@ -266,18 +475,30 @@ class Database:
             cursor.execute(
                 """
                 INSERT INTO match
-                    (id, date, fighter_red, fighter_blue, winner, bet_red, bet_blue, streak_red, streak_blue, tier, match_format, colour, my_bet_on, my_wager, match_balance, expected_payout)
+                    (id, date, fighter_red, fighter_blue, winner, bet_red, bet_blue, streak_red, streak_blue, tier, match_format, colour, my_bet_on, my_wager, match_balance, expected_payout, my_profit)
                 VALUES
-                    (%(id)s, %(date)s, %(fighter_red)s, %(fighter_blue)s, %(winner)s, %(bet_red)s, %(bet_blue)s, %(streak_red)s, %(streak_blue)s, %(tier)s, %(match_format)s, %(colour)s, %(my_bet_on)s, %(my_wager)s, %(match_balance)s, %(expected_payout)s)
+                    (%(id)s, %(date)s, %(fighter_red)s, %(fighter_blue)s, %(winner)s, %(bet_red)s, %(bet_blue)s, %(streak_red)s, %(streak_blue)s, %(tier)s, %(match_format)s, %(colour)s, %(my_bet_on)s, %(my_wager)s, %(match_balance)s, %(expected_payout)s, %(my_profit)s)
                 """,
                 insert_obj,
             )
+            if my_profit is not None or match_balance is not None:
+                cursor.execute(ROLLUP_UPSERT, {
+                    "date": insert_obj["date"],
+                    "bets": int(my_profit is not None),
+                    "wins": int(my_profit is not None and my_profit >= 0),
+                    "wagered": my_wager if my_profit is not None else 0,
+                    "profit": my_profit or 0,
+                    "balance": match_balance,
+                })
+            if features_id:
+                cursor.execute("UPDATE match_features SET match_id = %s WHERE id = %s", (safe_id, features_id))
             self.connection.commit()
 
             red_won = fighter_red["id"] == winner
-            self._update_fighter(fighter_red, match.tier, match.streak_red, fighter_blue["elo"], fighter_blue["tier_elo"], red_won)
-            self._update_fighter(fighter_blue, match.tier, match.streak_blue, fighter_red["elo"], fighter_red["tier_elo"], not red_won)
+            updated_red = self._update_fighter(fighter_red, match.tier, match.streak_red, fighter_blue["elo"], fighter_blue["tier_elo"], red_won)
+            updated_blue = self._update_fighter(fighter_blue, match.tier, match.streak_blue, fighter_red["elo"], fighter_red["tier_elo"], not red_won)
             self.connection.commit()
+            return RecordedMatch(match=insert_obj, fighters=[updated_red, updated_blue])
         except Exception as e:
             self.connection.rollback()
             raise e
@@ -371,6 +592,10 @@ class Database:
                 """,
                 (match_time, updated_streak, new_streak, match_time, updated_tier, prev_tier, updated_tier_elo, updated_elo, fighter["id"])
             )
+            return {
+                "id": fighter["id"], "name": fighter["name"], "tier": updated_tier, "elo": updated_elo,
+                "tier_elo": updated_tier_elo, "current_streak": new_streak, "last_match_date": match_time,
+            }
         finally:
             cursor.close()
 
@@ -389,4 +614,4 @@ class Database:
         tr_b = math.pow(10, opp_elo / 400)
         es_a = tr_a / (tr_a + tr_b)
         score = 1 if won else 0
-        return int(elo + (32 * (score - es_a)))
\ No newline at end of file
+        return int(elo + (ELO_K_FACTOR * (score - es_a)))
\ No newline at end of file
@@ -0,0 +1,136 @@
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import text
+
+from src.database import ELO_K_FACTOR, copy_rows
+from src.features import STARTING_ELO
+from src.history import MatchHistory
+
+DRIFT_PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class EloRatings:
+    fighter_ids: np.ndarray  # int64, aligned with the history's fighter codes
+    elo: np.ndarray  # int64
+    tier_elo: np.ndarray  # int64
+    waves: int  # Batches of fighter-disjoint matches the replay took
+
+
+@dataclass
+class EloDrift:
+    fighters: int
+    changed: int
+    mean_abs: float
+    percentiles: dict[int, float]
+    max_abs: int
+
+
+def match_waves(history: MatchHistory) -> np.ndarray:
+    """
+    Wave number of every match: one more than the latest wave either fighter has
+    played in. Matches in a wave share no fighter, so each wave can be rated in
+    one vectorised step and every fighter still sees its matches in order.
+    """
+    last = [0] * history.num_fighters
+    waves = np.empty(len(history), dtype=np.int32)
+    for i, (red, blue) in enumerate(zip(history.red.tolist(), history.blue.tolist())):
+        wave = (last[red] if last[red] > last[blue] else last[blue]) + 1
+        last[red] = last[blue] = waves[i] = wave
+    return waves
+
+
+def recompute_elo(history: MatchHistory, k_factor: float = ELO_K_FACTOR, tier_reset: bool = True) -> EloRatings:
+    """
+    Replays every match with Database._update_fighter's rules: both ratings move by
+    the truncated Elo update from the pre-match ratings, and tier Elo restarts at
+    STARTING_ELO whenever a fighter plays in a tier other than its last one (unless
+    `tier_reset` is off). The opponent's stored tier Elo is used as is, like live.
+    """
+    waves = match_waves(history)
+    order = np.argsort(waves, kind="stable")
+    bounds = np.flatnonzero(np.diff(waves[order])) + 1
+
+    elo = np.full(history.num_fighters, STARTING_ELO, dtype=np.int64)
+    tier_elo = np.full(history.num_fighters, STARTING_ELO, dtype=np.int64)
+    tier = np.full(history.num_fighters, -1, dtype=np.int8)
+    for rows in np.split(order, bounds) if len(order) else []:
+        red, blue, match_tier = history.red[rows], history.blue[rows], history.tier[rows]
+        red_won = history.red_won[rows].astype(np.float64)
+
+        elo_red, elo_blue = elo[red], elo[blue]
+        stored_red, stored_blue = tier_elo[red], tier_elo[blue]
+        start_red, start_blue = stored_red, stored_blue
+        if tier_reset:
+            start_red = np.where(tier[red] == match_tier, stored_red, STARTING_ELO)
+            start_blue = np.where(tier[blue] == match_tier, stored_blue, STARTING_ELO)
+
+        elo[red] = _updated(elo_red, elo_blue, red_won, k_factor)
+        elo[blue] = _updated(elo_blue, elo_red, 1 - red_won, k_factor)
+        tier_elo[red] = _updated(start_red, stored_blue, red_won, k_factor)
+        tier_elo[blue] = _updated(start_blue, stored_red, 1 - red_won, k_factor)
+        tier[red] = tier[blue] = match_tier
+    return EloRatings(history.fighter_ids, elo, tier_elo, waves=len(bounds) + (len(order) > 0))
+
+
+def _updated(rating: np.ndarray, opponent: np.ndarray, score: np.ndarray, k_factor: float) -> np.ndarray:
+    # Same float steps as Database._calculate_elo, then int() truncation
+    mine, theirs = np.power(10.0, rating / 400), np.power(10.0, opponent / 400)
+    return np.trunc(rating + k_factor * (score - mine / (mine + theirs))).astype(np.int64)
+
+
+def load_current_ratings(connection, fighter_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """Stored (elo, tier_elo, name) aligned with `fighter_ids`; -1 and "" for missing fighters."""
+    position = {fighter_id: i for i, fighter_id in enumerate(fighter_ids.tolist())}
+    elo = np.full(len(fighter_ids), -1, dtype=np.int64)
+    tier_elo = np.full(len(fighter_ids), -1, dtype=np.int64)
+    names = [""] * len(fighter_ids)
+    for fighter_id, name, stored_elo, stored_tier_elo in connection.execute(
+        text("SELECT id, name, elo, tier_elo FROM fighter")
+    ):
+        i = position.get(fighter_id)
+        if i is not None:
+            elo[i], tier_elo[i], names[i] = stored_elo or 0, stored_tier_elo or 0, name
+    return elo, tier_elo, names
+
+
+def drift(current: np.ndarray, recomputed: np.ndarray) -> EloDrift:
+    """How far the stored ratings are from the recomputed ones, over fighters that exist."""
+    known = current >= 0
+    diff = np.abs(recomputed[known] - current[known])
+    if not len(diff):
+        return EloDrift(0, 0, 0.0, {pct: 0.0 for pct in DRIFT_PERCENTILES}, 0)
+    return EloDrift(
+        fighters=int(known.sum()),
+        changed=int(np.count_nonzero(diff)),
+        mean_abs=float(diff.mean()),
+        percentiles={pct: float(np.percentile(diff, pct)) for pct in DRIFT_PERCENTILES},
+        max_abs=int(diff.max()),
+    )
+
+
+def write_ratings(connection, ratings: EloRatings) -> int:
+    """
+    COPYs the ratings into a temporary table and applies them with a single
+    UPDATE ... FROM, touching only fighters whose values change. Returns rows updated.
+    """
+    connection.execute(
+        text("CREATE TEMPORARY TABLE elo_recompute (id BIGINT PRIMARY KEY, elo INTEGER, tier_elo INTEGER) ON COMMIT DROP")
+    )
+    copy_rows(
+        connection,
+        "elo_recompute",
+        ["id", "elo", "tier_elo"],
+        zip(ratings.fighter_ids.tolist(), ratings.elo.tolist(), ratings.tier_elo.tolist()),
+    )
+    result = connection.execute(
+        text(
+            """
+            UPDATE fighter f SET elo = r.elo, tier_elo = r.tier_elo
+            FROM elo_recompute r
+            WHERE f.id = r.id AND (f.elo, f.tier_elo) IS DISTINCT FROM (r.elo, r.tier_elo)
+            """
+        )
+    )
+    return result.rowcount
@@ -0,0 +1,209 @@
+import numpy as np
+
+from src.history import MatchHistory
+
+K_FACTOR = 32
+STARTING_ELO = 1500
+
+COMP_TRAINING = "training"
+COMP_LIVE = "live"
+
+# Per-opponent record packed into one int: wins << 33 | losses << 1 | won_last
+_WIN = 1 << 33
+_LOSS = 1 << 1
+_COUNT_MASK = (1 << 32) - 1
+
+
+class FeatureEngine:
+    """
+    Single-pass replay of match history producing the model features
+    (elo diff, streak diff, h2h, comp) as they stood before each match.
+
+    All state is counters: per-fighter Elo/streak in flat lists indexed by fighter
+    code, one packed win/total counter per fighter pair and one packed
+    per-opponent record per fighter. Updates are O(1) per match; comp only visits
+    the opponents the two fighters share instead of their full match histories.
+
+    `comp_mode` selects between the training definition (Red's latest result
+    against each common opponent weighed against every one of Blue's matches
+    with it) and the live BettingEngine definition (latest result on both sides).
+    `stale_seconds` mimics the live streak expiry.
+    """
+
+    def __init__(
+        self,
+        min_matches: int = 1,
+        comp_mode: str = COMP_TRAINING,
+        stale_seconds: int | None = None,
+    ) -> None:
+        self.min_matches = min_matches
+        self.comp_mode = comp_mode
+        self.stale_seconds = stale_seconds
+
+        self.tier_elo: list[float] = []
+        self.streak: list[int] = []
+        self.last_date: list[int] = []
+        self.pairs: dict[int, int] = {}
+        self.opponents: list[dict[int, int]] = []
+        self.matches_processed = 0
+
+    def ensure_capacity(self, num_fighters: int) -> None:
+        missing = num_fighters - len(self.tier_elo)
+        if missing > 0:
+            self.tier_elo.extend([float(STARTING_ELO)] * missing)
+            self.streak.extend([0] * missing)
+            self.last_date.extend([0] * missing)
+            self.opponents.extend({} for _ in range(missing))
+
+    def features(self, red: int, blue: int, date: int = 0) -> tuple[float, int, float, float]:
+        streak_red, streak_blue = self.streak[red], self.streak[blue]
+        if self.stale_seconds is not None:
+            if date - self.last_date[red] > self.stale_seconds:
+                streak_red = 0
+            if date - self.last_date[blue] > self.stale_seconds:
+                streak_blue = 0
+
+        return (
+            self.tier_elo[red] - self.tier_elo[blue],
+            streak_red - streak_blue,
+            self.h2h(red, blue),
+            self.comp(red, blue),
+        )
+
+    def h2h(self, red: int, blue: int) -> float:
+        if red < blue:
+            packed = self.pairs.get((red << 32) | blue, 0)
+            total, red_wins = packed >> 32, packed & _COUNT_MASK
+        else:
+            packed = self.pairs.get((blue << 32) | red, 0)
+            total = packed >> 32
+            red_wins = total - (packed & _COUNT_MASK)
+        if total < self.min_matches or total == 0:
+            return 0.0
+        return red_wins / total - 0.5
+
+    def comp(self, red: int, blue: int) -> float:
+        red_opps, blue_opps = self.opponents[red], self.opponents[blue]
+        # Key-view intersection runs in C over the smaller map
+        common = red_opps.keys() & blue_opps.keys()
+        wins, total = 0, 0
+
+        if self.comp_mode == COMP_LIVE:
+            for opp in common:
+                red_last, blue_last = red_opps[opp] & 1, blue_opps[opp] & 1
+                if red_last and not blue_last:
+                    wins += 1
+                    total += 1
+                elif blue_last and not red_last:
+                    total += 1
+        else:
+            for opp in common:
+                red_rec, blue_rec = red_opps[opp], blue_opps[opp]
+                if red_rec & 1:
+                    blue_losses = (blue_rec >> 1) & _COUNT_MASK
+                    wins += blue_losses
+                    total += blue_losses
+                else:
+                    total += blue_rec >> 33
+
+        if total < self.min_matches or total == 0:
+            return 0.0
+        return wins / total - 0.5
+
+    def update(self, red: int, blue: int, red_won: bool, date: int = 0) -> None:
+        tier_elo = self.tier_elo
+        if red_won:
+            change = _elo_change(tier_elo[red], tier_elo[blue])
+            tier_elo[red] += change
+            tier_elo[blue] -= change
+        else:
+            change = _elo_change(tier_elo[blue], tier_elo[red])
+            tier_elo[red] -= change
+            tier_elo[blue] += change
+
+        streak = self.streak
+        if red_won:
+            streak[red] = streak[red] + 1 if streak[red] > 0 else 1
+            streak[blue] = streak[blue] - 1 if streak[blue] < 0 else -1
+        else:
+            streak[red] = streak[red] - 1 if streak[red] < 0 else -1
+            streak[blue] = streak[blue] + 1 if streak[blue] > 0 else 1
+        self.last_date[red] = date
+        self.last_date[blue] = date
+
+        if red < blue:
+            key = (red << 32) | blue
+            self.pairs[key] = self.pairs.get(key, 0) + (1 << 32) + (1 if red_won else 0)
+        else:
+            key = (blue << 32) | red
+            self.pairs[key] = self.pairs.get(key, 0) + (1 << 32) + (0 if red_won else 1)
+
+        red_opps, blue_opps = self.opponents[red], self.opponents[blue]
+        if red_won:
+            red_opps[blue] = (red_opps.get(blue, 0) | 1) + _WIN
+            blue_opps[red] = (blue_opps.get(red, 0) & ~1) + _LOSS
+        else:
+            red_opps[blue] = (red_opps.get(blue, 0) & ~1) + _LOSS
+            blue_opps[red] = (blue_opps.get(red, 0) | 1) + _WIN
+        self.matches_processed += 1
+
+    def state_arrays(self) -> dict[str, np.ndarray]:
+        """Flattens the counters into arrays, see `from_state_arrays`."""
+        counts = [len(opps) for opps in self.opponents]
+        total = sum(counts)
+        return {
+            "tier_elo": np.array(self.tier_elo, dtype=np.float64),
+            "streak": np.array(self.streak, dtype=np.int32),
+            "last_date": np.array(self.last_date, dtype=np.int64),
+            "pair_keys": np.fromiter(self.pairs.keys(), dtype=np.int64, count=len(self.pairs)),
+            "pair_values": np.fromiter(self.pairs.values(), dtype=np.int64, count=len(self.pairs)),
+            "opponent_counts": np.array(counts, dtype=np.int32),
+            "opponent_codes": np.fromiter(
+                (opp for opps in self.opponents for opp in opps), dtype=np.int32, count=total
+            ),
+            "opponent_records": np.fromiter(
+                (rec for opps in self.opponents for rec in opps.values()), dtype=np.int64, count=total
+            ),
+            "matches_processed": np.array(self.matches_processed, dtype=np.int64),
+        }
+
+    @classmethod
+    def from_state_arrays(cls, arrays: dict[str, np.ndarray], **config) -> "FeatureEngine":
+        engine = cls(**config)
+        engine.tier_elo = arrays["tier_elo"].tolist()
+        engine.streak = arrays["streak"].tolist()
+        engine.last_date = arrays["last_date"].tolist()
+        engine.pairs = dict(zip(arrays["pair_keys"].tolist(), arrays["pair_values"].tolist()))
+
+        codes = arrays["opponent_codes"].tolist()
+        records = arrays["opponent_records"].tolist()
+        engine.opponents = []
+        offset = 0
+        for count in arrays["opponent_counts"].tolist():
+            engine.opponents.append(dict(zip(codes[offset:offset + count], records[offset:offset + count])))
+            offset += count
+        engine.matches_processed = int(arrays["matches_processed"])
+        return engine
+
+    def run(self, history: MatchHistory, start: int = 0, stop: int | None = None) -> np.ndarray:
+        """
+        Replays `history[start:stop]`, returning the (n, 4) pre-match feature matrix
+        and leaving the engine positioned after the last match replayed.
+        """
+        self.ensure_capacity(history.num_fighters)
+        reds = history.red[start:stop].tolist()
+        blues = history.blue[start:stop].tolist()
+        outcomes = history.red_won[start:stop].tolist()
+        dates = history.date[start:stop].tolist()
+
+        out = np.empty((len(reds), 4), dtype=np.float64)
+        features, update = self.features, self.update
+        for i, (red, blue, red_won, date) in enumerate(zip(reds, blues, outcomes, dates)):
+            out[i] = features(red, blue, date)
+            update(red, blue, red_won, date)
+        return out
+
+
+def _elo_change(winner_elo: float, loser_elo: float) -> float:
+    expected_win = 1 / (1 + 10 ** ((loser_elo - winner_elo) / 400))
+    return K_FACTOR * (1 - expected_win)
@@ -0,0 +1,253 @@
+import logging
+from collections.abc import Callable
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+PAIR_SHIFT = 64
+COUNT_SHIFT = 32
+LOAD_CHUNK_SIZE = 50_000
+
+
+class FighterState:
+    """
+    Compact in-memory view of a fighter.
+
+    `opponents` maps opponent ID -> signed unix timestamp of their latest match,
+    positive if this fighter won it and negative if it lost.
+    """
+
+    __slots__ = (
+        "id",
+        "name",
+        "tier",
+        "elo",
+        "tier_elo",
+        "current_streak",
+        "last_match_date",
+        "opponents",
+    )
+
+    def __init__(
+        self,
+        id_: int,
+        name: str,
+        tier: str,
+        elo: int,
+        tier_elo: int,
+        current_streak: int,
+        last_match_date: datetime | None,
+    ) -> None:
+        self.id = id_
+        self.name = name
+        self.tier = tier
+        self.elo = elo
+        self.tier_elo = tier_elo
+        self.current_streak = current_streak
+        self.last_match_date = last_match_date
+        self.opponents: dict[int, int] = {}
+
+
+class FighterStateStore:
+    """
+    Every fighter and their per-opponent results, loaded once so BettingEngine can
+    compute its features without querying Postgres.
+
+    H2H records are kept per unordered pair as a single packed int
+    (total << 32 | wins of the lower ID). Common-opponent features use each
+    fighter's latest result against every opponent across their whole history,
+    rather than the arbitrary 100 rows the SQL path samples.
+    """
+
+    def __init__(self) -> None:
+        self.fighters: dict[int, FighterState] = {}
+        self.by_name: dict[str, int] = {}
+        self.pairs: dict[int, int] = {}
+        self.listeners: list[Callable[[int], None]] = []
+
+    def subscribe(self, listener: Callable[[int], None]) -> None:
+        """
+        Registers a callback invoked with the ID of every fighter whose results
+        change. Profile updates (Elo, streak, tier) are not reported: they feed the
+        probability, not the pair features.
+        """
+        self.listeners.append(listener)
+
+    def _touch(self, *fighter_ids: int) -> None:
+        for listener in self.listeners:
+            for fighter_id in fighter_ids:
+                listener(fighter_id)
+
+    @classmethod
+    def load(cls, db_session, logger: logging.Logger | None = None) -> "FighterStateStore":
+        store = cls()
+        connection = db_session.connection().execution_options(stream_results=True)
+
+        fighters = connection.execute(
+            text(
+                "SELECT id, name, tier, elo, tier_elo, current_streak, last_match_date FROM fighter"
+            )
+        )
+        for rows in fighters.partitions(LOAD_CHUNK_SIZE):
+            for row in rows:
+                store.upsert_fighter(row)
+
+        matches = connection.execute(
+            text(
+                "SELECT fighter_red, fighter_blue, winner, date FROM match "
+                "WHERE winner IS NOT NULL ORDER BY date ASC, id ASC"
+            )
+        )
+        total = 0
+        for rows in matches.partitions(LOAD_CHUNK_SIZE):
+            for red_id, blue_id, winner_id, date in rows:
+                store.record_result(red_id, blue_id, winner_id, date)
+            total += len(rows)
+
+        if logger:
+            logger.info(
+                "Loaded fighter state store: %s fighters, %s matches.",
+                f"{len(store.fighters):,}",
+                f"{total:,}",
+            )
+        return store
+
+    # --- Lookups ---
+    def get(self, name: str) -> FighterState | None:
+        fighter_id = self.by_name.get(name)
+        return self.fighters.get(fighter_id) if fighter_id is not None else None
+
+    def h2h_record(self, red_id: int, blue_id: int) -> tuple[int, int]:
+        """Returns (red wins, total matches) between the two fighters."""
+        packed = self.pairs.get(self._pair_key(red_id, blue_id), 0)
+        total, low_wins = packed >> COUNT_SHIFT, packed & ((1 << COUNT_SHIFT) - 1)
+        red_wins = low_wins if red_id < blue_id else total - low_wins
+        return red_wins, total
+
+    def common_record(self, red_id: int, blue_id: int) -> tuple[int, int]:
+        """Returns (red advantages, decisive common opponents) by triangle theory."""
+        red, blue = self.fighters.get(red_id), self.fighters.get(blue_id)
+        if not red or not blue:
+            return 0, 0
+
+        red_opps, blue_opps = red.opponents, blue.opponents
+        swap = len(red_opps) > len(blue_opps)
+        small, large = (blue_opps, red_opps) if swap else (red_opps, blue_opps)
+
+        wins, total = 0, 0
+        for opp_id, small_res in small.items():
+            large_res = large.get(opp_id)
+            if large_res is None or (small_res > 0) == (large_res > 0):
+                continue
+            total += 1
+            red_res = large_res if swap else small_res
+            if red_res > 0:
+                wins += 1
+        return wins, total
+
+    # --- Updates ---
+    def upsert_fighter(self, row) -> FighterState:
+        fighter_id = _field(row, "id")
+        fighter = self.fighters.get(fighter_id)
+        if fighter is None:
+            fighter = FighterState(fighter_id, "", "U", 1500, 1500, 0, None)
+            self.fighters[fighter_id] = fighter
+
+        name = _field(row, "name")
+        if fighter.name != name:
+            if self.by_name.get(fighter.name) == fighter_id:
+                del self.by_name[fighter.name]
+            fighter.name = name
+        self.by_name[name] = fighter_id
+
+        fighter.tier = _field(row, "tier") or fighter.tier
+        fighter.elo = _field(row, "elo") or fighter.elo
+        fighter.tier_elo = _field(row, "tier_elo") or fighter.tier_elo
+        fighter.current_streak = _field(row, "current_streak") or 0
+        fighter.last_match_date = _field(row, "last_match_date")
+        return fighter
+
+    def record_result(
+        self, red_id: int, blue_id: int, winner_id: int, date: datetime | None
+    ) -> None:
+        key = self._pair_key(red_id, blue_id)
+        low_won = winner_id == min(red_id, blue_id)
+        self.pairs[key] = self.pairs.get(key, 0) + (1 << COUNT_SHIFT) + int(low_won)
+
+        stamp = _timestamp(date)
+        red_won = winner_id == red_id
+        self._set_latest(red_id, blue_id, stamp if red_won else -stamp)
+        self._set_latest(blue_id, red_id, -stamp if red_won else stamp)
+        self._touch(red_id, blue_id)
+
+    def remove_result(self, red_id: int, blue_id: int, winner_id: int) -> None:
+        """Forgets a duplicate (e.g. a locally recorded match replaced by backfill)."""
+        key = self._pair_key(red_id, blue_id)
+        packed = self.pairs.get(key, 0)
+        if packed >> COUNT_SHIFT == 0:
+            return
+        low_won = winner_id == min(red_id, blue_id)
+        self.pairs[key] = packed - (1 << COUNT_SHIFT) - int(low_won)
+        self._touch(red_id, blue_id)
+
+    def remap_fighter(self, old_id: int, new_id: int) -> None:
+        """Moves all state from a fighter's old ID to its new one."""
+        old = self.fighters.pop(old_id, None)
+        if old is None:
+            return
+        self._touch(old_id, new_id, *old.opponents)
+        if self.by_name.get(old.name) == old_id:
+            del self.by_name[old.name]
+
+        new = self.fighters.get(new_id)
+        if new is None:
+            old.id = new_id
+            self.fighters[new_id] = new = old
+            self.by_name[new.name] = new_id
+        else:
+            for opp_id, stamp in old.opponents.items():
+                self._set_latest(new_id, opp_id, stamp)
+
+        for opp_id in old.opponents:
+            opponent = self.fighters.get(opp_id)
+            if opponent and old_id in opponent.opponents:
+                self._set_latest(opp_id, new_id, opponent.opponents.pop(old_id))
+
+            packed = self.pairs.pop(self._pair_key(old_id, opp_id), 0)
+            if not packed:
+                continue
+            total, low_wins = packed >> COUNT_SHIFT, packed & ((1 << COUNT_SHIFT) - 1)
+            # Orientation can flip when the fighter moves to the other side of opp_id
+            old_wins = low_wins if old_id < opp_id else total - low_wins
+            new_low_wins = old_wins if new_id < opp_id else total - old_wins
+            key = self._pair_key(new_id, opp_id)
+            self.pairs[key] = self.pairs.get(key, 0) + (total << COUNT_SHIFT) + new_low_wins
+
+    def _set_latest(self, fighter_id: int, opp_id: int, signed_stamp: int) -> None:
+        fighter = self.fighters.get(fighter_id)
+        if fighter is None:
+            fighter = FighterState(fighter_id, "", "U", 1500, 1500, 0, None)
+            self.fighters[fighter_id] = fighter
+        # Backfill can deliver older matches later, only keep the newest result
+        current = fighter.opponents.get(opp_id)
+        if current is None or abs(signed_stamp) >= abs(current):
+            fighter.opponents[opp_id] = signed_stamp
+
+    @staticmethod
+    def _pair_key(a: int, b: int) -> int:
+        return (a << PAIR_SHIFT) | b if a < b else (b << PAIR_SHIFT) | a
+
+
+def _field(row, name: str):
+    try:
+        return getattr(row, name)
+    except AttributeError:
+        return row[name]
+
+
+def _timestamp(date: datetime | None) -> int:
+    if date is None:
+        return 1
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(1, int(date.timestamp()))
@@ -0,0 +1,178 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import text
+
+TIERS = ("X", "S", "A", "B", "P", "U")
+MATCH_FORMATS = ("matchmaking", "tournament")
+LOAD_CHUNK_SIZE = 50_000
+
+HISTORY_QUERY = """
+    SELECT id, fighter_red, fighter_blue, winner, tier, match_format,
+           bet_red, bet_blue, streak_red, streak_blue, date
+    FROM match
+    WHERE winner IS NOT NULL {after}
+    ORDER BY date ASC, id ASC
+"""
+COUNT_QUERY = "SELECT count(*) FROM match WHERE winner IS NOT NULL {after}"
+AFTER_CLAUSE = "AND (date, id) > (:after_date, :after_id)"
+
+HISTORY_DTYPES = {
+    "match_id": np.int64,
+    "red": np.int32,
+    "blue": np.int32,
+    "red_won": np.int8,
+    "tier": np.int8,
+    "match_format": np.int8,
+    "bet_red": np.int64,
+    "bet_blue": np.int64,
+    "streak_red": np.int32,
+    "streak_blue": np.int32,
+    "date": np.int64,
+}
+
+
+@dataclass
+class MatchHistory:
+    """
+    Column-oriented match history in chronological order.
+
+    Fighters are referenced by dense int32 codes (row position in `fighter_ids`)
+    rather than their BIGINT database IDs, so feature engines can index flat arrays.
+    """
+
+    match_id: np.ndarray  # int64
+    red: np.ndarray  # int32 fighter codes
+    blue: np.ndarray  # int32 fighter codes
+    red_won: np.ndarray  # int8
+    tier: np.ndarray  # int8 index into TIERS
+    match_format: np.ndarray  # int8 index into MATCH_FORMATS
+    bet_red: np.ndarray  # int64
+    bet_blue: np.ndarray  # int64
+    streak_red: np.ndarray  # int32
+    streak_blue: np.ndarray  # int32
+    date: np.ndarray  # int64 unix seconds
+    fighter_ids: np.ndarray  # int64, fighter code -> database ID
+
+    def __len__(self) -> int:
+        return len(self.match_id)
+
+    @property
+    def num_fighters(self) -> int:
+        return len(self.fighter_ids)
+
+    def tier_mask(self, tier: str) -> np.ndarray:
+        return self.tier == TIERS.index(tier)
+
+    def format_mask(self, match_format: str) -> np.ndarray:
+        return self.match_format == MATCH_FORMATS.index(match_format)
+
+
+class ColumnBuffer:
+    """
+    Preallocated NumPy columns filled one chunk at a time.
+
+    Sized from a COUNT up front; if rows were inserted between the count and the
+    read, the columns grow once instead of the whole load going through lists.
+    """
+
+    def __init__(self, dtypes: dict[str, type], capacity: int) -> None:
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in dtypes.items()}
+        self.size = 0
+
+    def append(self, **chunk: list) -> None:
+        count = len(next(iter(chunk.values())))
+        needed = self.size + count
+        for name, values in chunk.items():
+            column = self.columns[name]
+            if needed > len(column):
+                grown = np.empty(max(needed, len(column) + len(column) // 4), dtype=column.dtype)
+                grown[: self.size] = column[: self.size]
+                self.columns[name] = column = grown
+            column[self.size : needed] = values
+        self.size = needed
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        return {name: column[: self.size] for name, column in self.columns.items()}
+
+
+def stream_chunks(connection, query: str, params: dict | None = None):
+    """Yields rows in LOAD_CHUNK_SIZE chunks through a named server-side cursor."""
+    result = connection.execution_options(stream_results=True, yield_per=LOAD_CHUNK_SIZE).execute(
+        text(query), params or {}
+    )
+    yield from result.partitions(LOAD_CHUNK_SIZE)
+
+
+def load_match_history(
+    connection,
+    after: tuple[datetime, int] | None = None,
+    fighter_ids: np.ndarray | None = None,
+) -> MatchHistory:
+    """
+    Streams the match table into a MatchHistory.
+
+    `after` is a (date, id) watermark: only later matches are loaded. Passing the
+    `fighter_ids` of an earlier load keeps their codes stable, so state indexed by
+    code (a FeatureEngine checkpoint) can carry on with the new matches.
+
+    Only one chunk of rows is held as Python objects at a time, so peak memory is
+    the final arrays plus a constant.
+    """
+    codes: dict[int, int] = {}
+    if fighter_ids is not None:
+        codes = {fighter_id: code for code, fighter_id in enumerate(fighter_ids.tolist())}
+    tier_codes = {tier: code for code, tier in enumerate(TIERS)}
+    format_codes = {match_format: code for code, match_format in enumerate(MATCH_FORMATS)}
+    unknown_tier = tier_codes["U"]
+
+    clause = AFTER_CLAUSE if after else ""
+    params = {"after_date": after[0], "after_id": after[1]} if after else {}
+    expected = connection.execute(text(COUNT_QUERY.format(after=clause)), params).scalar()
+    buffer = ColumnBuffer(HISTORY_DTYPES, expected)
+
+    for rows in stream_chunks(connection, HISTORY_QUERY.format(after=clause), params):
+        (match_id, red_id, blue_id, winner, tier, match_format,
+         bet_red, bet_blue, streak_red, streak_blue, date) = zip(*rows)
+        buffer.append(
+            match_id=match_id,
+            red=[codes.setdefault(f, len(codes)) for f in red_id],
+            blue=[codes.setdefault(f, len(codes)) for f in blue_id],
+            red_won=[w == r for w, r in zip(winner, red_id)],
+            tier=[tier_codes.get(t, unknown_tier) for t in tier],
+            match_format=[format_codes.get(f, -1) for f in match_format],
+            bet_red=[b or 0 for b in bet_red],
+            bet_blue=[b or 0 for b in bet_blue],
+            streak_red=[v or 0 for v in streak_red],
+            streak_blue=[v or 0 for v in streak_blue],
+            date=[to_unix(d) for d in date],
+        )
+
+    return MatchHistory(
+        **buffer.arrays(),
+        fighter_ids=np.fromiter(codes, dtype=np.int64, count=len(codes)),
+    )
+
+
+def count_matches_up_to(connection, date: datetime, match_id: int) -> int:
+    """Finished matches at or before a (date, id) watermark, to detect back-filled history."""
+    return connection.execute(
+        text("SELECT count(*) FROM match WHERE winner IS NOT NULL AND (date, id) <= (:date, :id)"),
+        {"date": date, "id": match_id},
+    ).scalar()
+
+
+def match_date(connection, match_id: int) -> datetime:
+    """Date of a match exactly as stored, so watermarks built from it compare exactly."""
+    return connection.execute(text("SELECT date FROM match WHERE id = :id"), {"id": match_id}).scalar()
+
+
+def to_unix(date: datetime | None) -> int:
+    """Unix seconds, treating naive timestamps as UTC like the rest of the bot."""
+    if date is None:
+        return 0
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return int(date.timestamp())
+
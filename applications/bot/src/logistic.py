@@ -0,0 +1,63 @@
+import numpy as np
+
+L2 = 1.0  # Same penalty as scikit-learn's LogisticRegression default (C=1)
+TOLERANCE = 1e-10
+MAX_ITERATIONS = 100
+
+
+def fit_logistic(
+    X: np.ndarray, y: np.ndarray, l2: float = L2, tol: float = TOLERANCE, max_iter: int = MAX_ITERATIONS
+) -> tuple[float, np.ndarray]:
+    """
+    L2-regularised logistic regression by Newton's method (IRLS), returning
+    (intercept, coefficients).
+
+    Minimises sum(log-loss) + l2 / 2 * |coef|^2 with the intercept unpenalised,
+    the objective scikit-learn's LogisticRegression(C=1 / l2) solves. With a handful
+    of features the Hessian is tiny, so each step costs two passes over X and the
+    exact optimum is reached in a few steps. The penalty keeps the objective
+    strictly convex; step halving covers the first steps on badly scaled data.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    k = X.shape[1]
+    params = np.zeros(k + 1)  # Intercept first
+    penalty = np.full(k + 1, l2)
+    penalty[0] = 0.0
+
+    loss = _objective(X, y, params, penalty)
+    for _ in range(max_iter):
+        p = _sigmoid(params[0] + X @ params[1:])
+        residual = p - y
+        gradient = np.concatenate(([residual.sum()], X.T @ residual)) + penalty * params
+
+        s = p * (1 - p)
+        weighted = X * s[:, None]
+        hessian = np.empty((k + 1, k + 1))
+        hessian[0, 0] = s.sum()
+        hessian[0, 1:] = hessian[1:, 0] = weighted.sum(axis=0)
+        hessian[1:, 1:] = X.T @ weighted
+        hessian[np.diag_indices(k + 1)] += penalty
+        step = np.linalg.solve(hessian, gradient)
+
+        scale = 1.0
+        while True:
+            candidate = params - scale * step
+            candidate_loss = _objective(X, y, candidate, penalty)
+            if candidate_loss <= loss or scale < 1e-6:
+                break
+            scale /= 2
+        params, loss = candidate, candidate_loss
+        if np.max(np.abs(scale * step)) < tol * (1 + np.max(np.abs(params))):
+            break
+    return float(params[0]), params[1:]
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 0.5 * (1 + np.tanh(0.5 * z))  # Doesn't overflow for large |z|
+
+
+def _objective(X: np.ndarray, y: np.ndarray, params: np.ndarray, penalty: np.ndarray) -> float:
+    z = params[0] + X @ params[1:]
+    # log(1 + e^z) - y * z, computed without overflow
+    return float(np.sum(np.logaddexp(0, z) - y * z) + 0.5 * np.sum(penalty * params**2))
@@ -1,24 +1,185 @@
-import os
+import atexit
 import logging
+import os
+import queue
+import re
+import threading
+import time
+
 import requests
 
 logger = logging.getLogger(__name__)
 
+MAX_QUEUED_ALERTS = 100
+COALESCE_WINDOW = 2.0  # Seconds to wait for more alerts before sending a batch
+DISCORD_MAX_LENGTH = 2000
+REQUEST_TIMEOUT = 5
+
+
+class DiscordNotifier:
+    """
+    Sends Discord webhook alerts from a background thread.
+
+    Callers only ever enqueue. Alerts arriving within the coalesce window are merged
+    into a single message, with repeats of the same alert collapsed into a counter,
+    and Discord's 429 responses are honoured before the next post.
+    """
+
+    def __init__(self, max_queued: int = MAX_QUEUED_ALERTS) -> None:
+        self.max_queued = max_queued
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._dropped_lock = threading.Lock()  # `dropped` is bumped by callers, reset by the sender
+        self._pid: int | None = None
+        self._queue: queue.Queue[str]
+        self._thread: threading.Thread | None = None
+        self._retry_at = 0.0
+
+    def send(self, message: str) -> bool:
+        """Queues an alert. Never blocks, returns False if the alert was dropped."""
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            self._count_dropped()
+            return False
+
+    def flush(self, timeout: float = 2.0) -> None:
+        """Waits (bounded) for queued alerts to go out, used at interpreter exit."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def _ensure_worker(self) -> None:
+        # Worker threads don't survive a fork, each process gets its own sender
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queued)
+            self._thread = threading.Thread(
+                target=self._run, name="discord-notifier", daemon=True
+            )
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            window_end = time.monotonic() + COALESCE_WINDOW
+            while (remaining := window_end - time.monotonic()) > 0:
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                for content in self._coalesce(batch):
+                    self._post(content)
+            except Exception as e:
+                logger.warning(f"Discord notifier error: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _coalesce(self, batch: list[str]) -> list[str]:
+        groups: dict[str, list[str]] = {}
+        for message in batch:
+            groups.setdefault(self._similarity_key(message), []).append(message)
+
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            groups.setdefault("dropped", []).append(
+                f"⚠️ {dropped} alert(s) dropped, the notifier queue was full or rate limited."
+            )
+
+        lines = []
+        for messages in groups.values():
+            line = messages[-1]
+            if len(messages) > 1:
+                line = f"{line} (x{len(messages)})"
+            lines.append(line[:DISCORD_MAX_LENGTH])
+
+        contents, current = [], ""
+        for line in lines:
+            if current and len(current) + len(line) + 1 > DISCORD_MAX_LENGTH:
+                contents.append(current)
+                current = ""
+            current = f"{current}\n{line}" if current else line
+        if current:
+            contents.append(current)
+        return contents
+
+    @staticmethod
+    def _similarity_key(message: str) -> str:
+        # Alerts differing only by numbers (IDs, amounts, timings) are the same alert
+        first_line = message.split("\n", 1)[0]
+        return re.sub(r"\d+", "#", first_line)[:80]
+
+    def _post(self, content: str) -> None:
+        webhook_url = os.getenv("DISCORD_WEBHOOK_URL")
+        if not webhook_url:
+            return
+
+        data = {"content": content, "username": "SodiumTycoon AI"}
+        for _ in range(3):
+            wait = self._retry_at - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+            try:
+                response = requests.post(webhook_url, json=data, timeout=REQUEST_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Discord connection failed: {e}")
+                return
+
+            self._respect_rate_limit(response)
+            if response.status_code == 429:
+                continue
+            if response.status_code != 204:
+                logger.warning(f"Failed to send Discord alert: {response.status_code}")
+            return
+
+        self._count_dropped()
+        logger.warning("Dropped a Discord alert, still rate limited after 3 attempts.")
+
+    def _count_dropped(self) -> None:
+        with self._dropped_lock:
+            self.dropped += 1
+
+    def _respect_rate_limit(self, response: requests.Response) -> None:
+        delay = 0.0
+        if response.status_code == 429:
+            try:
+                delay = float(response.json().get("retry_after", 0))
+            except Exception:
+                delay = float(response.headers.get("Retry-After", 1))
+        elif response.headers.get("X-RateLimit-Remaining") == "0":
+            delay = float(response.headers.get("X-RateLimit-Reset-After", 0))
+        if delay > 0:
+            self._retry_at = time.monotonic() + delay
+
+
+_notifier = DiscordNotifier()
+atexit.register(_notifier.flush)
+
+
+def flush_discord_alerts(timeout: float = 2.0) -> None:
+    """
+    Waits (bounded) for queued alerts to go out. multiprocessing children exit
+    through os._exit and skip atexit, so their shutdown paths call this.
+    """
+    _notifier.flush(timeout)
+
+
 def send_discord_alert(message: str):
-    """Sends a message to the configured Discord Webhook."""
-    webhook_url = os.getenv("DISCORD_WEBHOOK_URL")
-    
-    if not webhook_url:
+    """Queues a message for the configured Discord Webhook. Never blocks."""
+    if not os.getenv("DISCORD_WEBHOOK_URL"):
         return
 
-    data = {
-        "content": message,
-        "username": "SodiumTycoon AI"
-    }
-
-    try:
-        response = requests.post(webhook_url, json=data, timeout=5)
-        if response.status_code != 204:
-            logger.warning(f"Failed to send Discord alert: {response.status_code}")
-    except Exception as e:
-        logger.warning(f"Discord connection failed: {e}")
\ No newline at end of file
+    _notifier.send(message)
@@ -66,6 +66,38 @@ class Match:
 
         self.logger = logger
 
+    def state(self) -> dict:
+        """Plain JSON-able fields, see `from_state`."""
+        return {
+            "status": self.status.value,
+            "tier": self.tier,
+            "fighter_red_name": self.fighter_red_name,
+            "fighter_blue_name": self.fighter_blue_name,
+            "match_format": self.match_format.value,
+            "streak_red": self.streak_red,
+            "streak_blue": self.streak_blue,
+            "bet_red": self.bet_red,
+            "bet_blue": self.bet_blue,
+            "winner": self.winner,
+            "colour": self.colour,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict, logger: logging.Logger) -> "Match":
+        match = cls(
+            OpenBetMessage(
+                state["fighter_red_name"],
+                state["fighter_blue_name"],
+                state["tier"],
+                MatchFormat(state["match_format"]),
+            ),
+            logger,
+        )
+        match.status = MatchStatus(state["status"])
+        for field in ("streak_red", "streak_blue", "bet_red", "bet_blue", "winner", "colour"):
+            setattr(match, field, state[field])
+        return match
+
     def update_locked(self, waifu_message: LockedBetMessage) -> bool:
         if self.status != MatchStatus.OPEN:
             self.logger.warning(
@@ -0,0 +1,51 @@
+import math
+
+from src.betting_strategy import FEATURE_COLUMNS
+
+LEARNING_RATE = 0.01
+SCALE_DECAY = 0.999  # EMA decay of each feature's mean square
+L2 = 1e-4  # Pull towards the warm-start weights, keeps drift in check between refits
+
+# Typical magnitude of each feature. Also a floor for the running estimate, so a
+# feature that is mostly zero (h2h for new pairs) can't blow up its step size.
+DEFAULT_FEATURE_SCALES = {"tier_elo": 100.0, "streak": 5.0, "h2h": 0.25, "comp": 0.25}
+
+
+class OnlineLogistic:
+    """
+    One SGD step of the logistic loss per recorded match, warm-started from a full fit.
+
+    Features differ by orders of magnitude (Elo diffs in the hundreds, h2h within
+    +-0.5), so each step is divided by the feature's running mean square. That is
+    plain SGD on standardized features, mapped back onto the raw weights.
+    """
+
+    def __init__(self, weights: dict, learning_rate: float = LEARNING_RATE) -> None:
+        self.learning_rate = learning_rate
+        self.reset(weights)
+
+    def reset(self, weights: dict) -> None:
+        """Warm start (again) from a full fit."""
+        self.anchor = {name: weights.get(name) or 0.0 for name in ("intercept",) + FEATURE_COLUMNS}
+        self.weights = dict(self.anchor)
+        self.mean_square = {name: DEFAULT_FEATURE_SCALES[name] ** 2 for name in FEATURE_COLUMNS}
+        self.updates = 0
+
+    def predict(self, features: dict) -> float:
+        z = self.weights["intercept"] + sum(self.weights[name] * features[name] for name in FEATURE_COLUMNS)
+        try: return 1 / (1 + math.exp(-z))
+        except OverflowError: return 0.0 if z < 0 else 1.0
+
+    def update(self, features: dict, red_won: bool) -> dict:
+        """Applies one gradient step for an observed outcome and returns the new weights."""
+        error = self.predict(features) - (1.0 if red_won else 0.0)
+        lr = self.learning_rate
+        self.weights["intercept"] -= lr * error
+        for name in FEATURE_COLUMNS:
+            x = features[name]
+            self.mean_square[name] = SCALE_DECAY * self.mean_square[name] + (1 - SCALE_DECAY) * x * x
+            scale_sq = max(self.mean_square[name], DEFAULT_FEATURE_SCALES[name] ** 2)
+            gradient = error * x + L2 * scale_sq * (self.weights[name] - self.anchor[name])
+            self.weights[name] -= lr * gradient / scale_sq
+        self.updates += 1
+        return dict(self.weights)
@@ -0,0 +1,125 @@
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import text, update
+from sqlalchemy.orm import Session
+
+from src.database import ModelWeight
+
+WEIGHT_NAMES = ("intercept", "tier_elo", "streak", "h2h", "comp")
+
+# Rows from before the registry have no active flag, the newest of them stands in
+ACTIVE_QUERY = """
+    SELECT id, intercept, tier_elo, streak, h2h, comp, source, window_end
+    FROM model_weight
+    ORDER BY COALESCE(active, FALSE) DESC, id DESC
+    LIMIT 1
+"""
+LIST_QUERY = """
+    SELECT id, timestamp, COALESCE(active, FALSE) AS active, source, trained_rows,
+           window_start, window_end, log_loss, accuracy, roi
+    FROM model_weight
+    ORDER BY id DESC
+    LIMIT :limit
+"""
+
+
+@dataclass
+class TrainingRun:
+    """What a set of weights was fitted on and how it scored out of sample."""
+
+    trained_rows: int
+    window_start: datetime | None = None
+    window_end: datetime | None = None
+    log_loss: float | None = None
+    accuracy: float | None = None
+    roi: float | None = None
+
+
+@dataclass
+class RegisteredModel:
+    version: int  # model_weight.id
+    weights: dict
+    source: str | None = None
+    window_end: datetime | None = None
+
+    @property
+    def fitted_until(self) -> datetime:
+        """
+        Date of the last match the weights were fitted on. Weights registered
+        without a training window (online updates, rows from before the registry)
+        count as having seen everything.
+        """
+        return self.window_end or datetime.now(timezone.utc)
+
+
+def load_active_model(connection) -> RegisteredModel | None:
+    """The active weights, a single indexed row read. None means use the defaults."""
+    row = connection.execute(text(ACTIVE_QUERY)).fetchone()
+    if not row:
+        return None
+    weights = {name: getattr(row, name) for name in WEIGHT_NAMES}
+    weights["streak"] = weights["streak"] or 0.0
+    return RegisteredModel(version=row.id, weights=weights, source=row.source, window_end=row.window_end)
+
+
+def load_active_weights(connection) -> dict | None:
+    model = load_active_model(connection)
+    return model.weights if model else None
+
+
+def list_models(connection, limit: int = 20) -> list:
+    """The newest registry rows, without the weights."""
+    return connection.execute(text(LIST_QUERY), {"limit": limit}).fetchall()
+
+
+def register_weights(
+    db_session: Session,
+    weights: dict,
+    logger,
+    source: str,
+    run: TrainingRun | None = None,
+    activate: bool = True,
+) -> int | None:
+    """
+    Stores the weights and returns their version. With `activate` they replace the
+    active model in the same transaction; a unique partial index on the flag makes a
+    concurrent promotion fail instead of leaving two active rows.
+    """
+    try:
+        if activate:
+            _deactivate_all(db_session)
+        mw = ModelWeight(
+            timestamp=datetime.now(timezone.utc),
+            intercept=weights["intercept"],
+            tier_elo=weights["tier_elo"],
+            h2h=weights["h2h"],
+            comp=weights["comp"],
+            streak=weights.get("streak", 0.0),
+            active=activate,
+            source=source,
+            **(asdict(run) if run else {}),
+        )
+        db_session.add(mw)
+        db_session.commit()
+        logger.info(f"Registered model version {mw.id} ({source}{', active' if activate else ''}).")
+        return mw.id
+    except Exception as e:
+        db_session.rollback()
+        logger.error(f"Failed to save weights: {e}")
+        return None
+
+
+def activate_model(db_session: Session, version: int) -> bool:
+    """Makes an existing version the active one, e.g. to roll back a promotion."""
+    if db_session.get(ModelWeight, version) is None:
+        return False
+    _deactivate_all(db_session)
+    db_session.execute(update(ModelWeight).where(ModelWeight.id == version).values(active=True))
+    db_session.commit()
+    return True
+
+
+def _deactivate_all(db_session: Session) -> None:
+    # Flushed before the new active row so the unique index never sees two at once
+    db_session.execute(update(ModelWeight).where(ModelWeight.active.is_(True)).values(active=False))
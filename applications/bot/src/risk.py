@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.backtest import BacktestParams, PreparedBacktest, sizing_arrays
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+@dataclass
+class RiskReport:
+    paths: int
+    steps: int
+    ruin_threshold: float
+    ruin_probability: float
+    checkpoints: np.ndarray  # Step index of each row in `curves`
+    curves: dict[int, np.ndarray]  # Percentile -> bankroll at each checkpoint
+    final_balances: np.ndarray
+
+
+def simulate_bankrolls(
+    prepared: PreparedBacktest,
+    params: BacktestParams,
+    paths: int = 100_000,
+    steps: int = 1_000,
+    ruin_fraction: float = 0.1,
+    percentiles: tuple[int, ...] = DEFAULT_PERCENTILES,
+    num_checkpoints: int = 100,
+    seed: int | None = None,
+) -> RiskReport:
+    """
+    Monte Carlo of the bankroll under the live sizing rules.
+
+    Each step draws one historical match per path (probability, pool ratio and
+    outcome stay together) and settles every path at once as array operations.
+    A path is ruined, and stops betting, once it falls to `ruin_fraction` of the
+    starting balance.
+    """
+    sizing = sizing_arrays(prepared, params)
+    if len(sizing.scale) == 0:
+        raise ValueError("No historical matches to resample from.")
+
+    rng = np.random.default_rng(seed)
+    start = float(params.starting_balance)
+    ruin_threshold = start * ruin_fraction
+    cap = float(params.effective_balance_cap)
+
+    balance = np.full(paths, start)
+    alive = np.ones(paths, dtype=bool)
+    checkpoints = np.unique(np.linspace(0, steps, num_checkpoints + 1).astype(np.int64))
+    curves = np.empty((len(checkpoints), len(percentiles)))
+    curves[0] = start
+    next_checkpoint = 1
+
+    for step in range(1, steps + 1):
+        sample = rng.integers(0, len(sizing.scale), paths)
+        wager = np.floor(np.minimum(balance, cap) * sizing.scale[sample])
+        wager = np.clip(wager, 1, sizing.caps[sample])
+        delta = np.where(
+            sizing.won[sample], np.floor(wager * sizing.payout_ratio[sample]), -wager
+        )
+        balance += np.where(alive, delta, 0.0)
+        alive &= balance > ruin_threshold
+
+        if next_checkpoint < len(checkpoints) and step == checkpoints[next_checkpoint]:
+            curves[next_checkpoint] = np.percentile(balance, percentiles)
+            next_checkpoint += 1
+
+    return RiskReport(
+        paths=paths,
+        steps=steps,
+        ruin_threshold=ruin_threshold,
+        ruin_probability=float(1 - alive.mean()),
+        checkpoints=checkpoints,
+        curves={pct: curves[:, i] for i, pct in enumerate(percentiles)},
+        final_balances=balance,
+    )
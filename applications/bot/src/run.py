@@ -1,10 +1,13 @@
 import os
+import signal
+import sys
 import time
 import requests
 from dataclasses import asdict
 from datetime import datetime, timedelta, timezone
 from multiprocessing import Process, Queue
 from pathlib import Path
+from queue import Full
 
 from tenacity import retry, stop_after_attempt, wait_fixed
 from sqlalchemy.orm import Session
@@ -13,11 +16,12 @@ from sqlalchemy.exc import IntegrityError
 
 from src.app_logging import (
     configure_process_logger,
+    create_log_queue,
     get_bot_logger,
     get_watchdog_logger,
     run_listener,
 )
-from src.database import Database, SessionLocal, Match as MatchDB, Fighter, ModelWeight, Base, engine
+from src.database import Database, Match as MatchDB, Fighter, FighterSync, Base, get_engine, get_session
 from src.irc import TwitchBot
 from src.objects import (
     LockedBetMessage,
@@ -27,12 +31,25 @@ from src.objects import (
     OpenBetMessage,
     WinMessage,
 )
-from src.salty_client import SaltyWebClient
-from src.betting_strategy import BettingEngine
-from src.training import train_model
-from src.notifier import send_discord_alert
+from src.salty_client import BetResult, SaltyWebClient
+from src.wallet import WalletLedger, bet_profit
+from src.fighter_store import FighterStateStore
+from src.registry import load_active_model, register_weights
+from src.notifier import flush_discord_alerts, send_discord_alert
+from src.bot_state import BotState, load_state, save_state, state_path
+from src.supervisor import Supervised, supervise
 
 SALTY_BOY_URL = "https://www.salty-boy.com"
+HISTORY_PAGE_SIZE = 100
+HISTORY_SYNC_INTERVAL = timedelta(hours=6)  # Skip fighters synced more recently than this
+RETRAIN_INTERVAL = 100  # Matches between background refits
+ONLINE_REFIT_INTERVAL = 1000  # Full refits are only a safety net with online learning
+ONLINE_SAVE_INTERVAL = 100  # Matches between registering the online weights (inactive)
+HEARTBEAT_TIMEOUT = 120.0  # The bot beats on every pass through the IRC loop
+STARTUP_TIMEOUT = 300.0  # Logging in, loading the fighter store and connecting to IRC come first
+REPORT_WINDOWS = "100,day,week"  # Default for REPORT_WINDOWS: bet counts and/or "day", "week"
+DEFAULT_REPORT_WINDOW = "100"  # Reported when none of REPORT_WINDOWS is valid
+LOG_DRAIN_TIMEOUT = 10.0  # Seconds the log listener gets at shutdown to write out what is queued
 
 # --- HELPER FUNCTIONS ---
 
@@ -40,15 +57,42 @@ SALTY_BOY_URL = "https://www.salty-boy.com"
 def get_current_match_info() -> dict:
     return requests.get(f"{SALTY_BOY_URL}/api/current_match_info", timeout=5).json()
 
-@retry(stop=stop_after_attempt(3), wait=wait_fixed(5))
-def get_fighter_history(fighter_id: int) -> list:
-    try:
-        url = f"{SALTY_BOY_URL}/api/match/?fighter={fighter_id}&page_size=100"
-        resp = requests.get(url, timeout=10)
-        resp.raise_for_status()
-        return resp.json().get("results", [])
-    except Exception:
-        return []
+@retry(stop=stop_after_attempt(3), wait=wait_fixed(5), reraise=True)
+def get_fighter_history_page(fighter_id: int, page: int) -> dict:
+    url = f"{SALTY_BOY_URL}/api/match/"
+    params = {"fighter": fighter_id, "page": page, "page_size": HISTORY_PAGE_SIZE}
+    resp = requests.get(url, params=params, timeout=10)
+    resp.raise_for_status()
+    return resp.json()
+
+def get_fighter_history(fighter_id: int, synced_count: int = 0, last_match_id: int | None = None) -> tuple[list, int, bool]:
+    """
+    Fetches only the matches newer than the fighter's watermark.
+
+    The API orders matches by ID ascending, so everything we have not seen yet lives
+    at or after offset `synced_count`. Pages are walked until a short page is hit.
+    Returns (new_matches, new_synced_count, completed).
+    """
+    page = synced_count // HISTORY_PAGE_SIZE
+    results: list = []
+    while True:
+        try:
+            data = get_fighter_history_page(fighter_id, page)
+        except Exception:
+            return results, synced_count, False
+
+        page_results = data.get("results", [])
+        remote_count = data.get("count", 0)
+        if remote_count < synced_count:
+            # Remote history shrank (merged/deleted fighter), start over from scratch
+            page, synced_count, last_match_id, results = 0, 0, None, []
+            continue
+
+        results.extend(m for m in page_results if last_match_id is None or m["id"] > last_match_id)
+        synced_count = max(synced_count, page * HISTORY_PAGE_SIZE + len(page_results))
+        if len(page_results) < HISTORY_PAGE_SIZE:
+            return results, synced_count, True
+        page += 1
 
 @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
 def get_fighter_details(fighter_id: int) -> dict | None:
@@ -61,7 +105,7 @@ def get_fighter_details(fighter_id: int) -> dict | None:
     except Exception:
         return None
 
-def ensure_fighter_exists(fighter_info: dict, db_session: Session, logger) -> bool:
+def ensure_fighter_exists(fighter_info: dict, db_session: Session, logger, store: FighterStateStore | None = None) -> bool:
     if not fighter_info: return False
     f_id, f_name = fighter_info.get("id"), fighter_info.get("name")
     if not f_id or not f_name: return False
@@ -83,6 +127,7 @@ def ensure_fighter_exists(fighter_info: dict, db_session: Session, logger) -> bo
     try:
         db_session.commit()
         logger.info(f"Created new fighter: {f_name} (ID: {f_id})")
+        if store: store.upsert_fighter(new_fighter)
         return True
     except IntegrityError:
         db_session.rollback()
@@ -92,7 +137,7 @@ def ensure_fighter_exists(fighter_info: dict, db_session: Session, logger) -> bo
         db_session.rollback()
         return False
 
-def sync_fighter_stats(fighter_info: dict, db_session: Session, logger) -> None:
+def sync_fighter_stats(fighter_info: dict, db_session: Session, logger, store: FighterStateStore | None = None) -> None:
     if not fighter_info: return
     f_id, f_name = fighter_info.get("id"), fighter_info.get("name")
     if not f_id or not f_name: return
@@ -107,6 +152,7 @@ def sync_fighter_stats(fighter_info: dict, db_session: Session, logger) -> None:
         if zombie:
             logger.warning(f"ID Mismatch for {f_name}. Migrating DB ID {zombie.id} to API ID {f_id}...")
             try:
+                zombie_id = zombie.id
                 zombie.name = f"{f_name}_MIGRATING_{int(time.time())}"
                 db_session.commit()
                 
@@ -123,10 +169,15 @@ def sync_fighter_stats(fighter_info: dict, db_session: Session, logger) -> None:
                 db_session.execute(text("UPDATE match SET fighter_red = :new WHERE fighter_red = :old"), {"new": f_id, "old": zombie.id})
                 db_session.execute(text("UPDATE match SET fighter_blue = :new WHERE fighter_blue = :old"), {"new": f_id, "old": zombie.id})
                 db_session.execute(text("UPDATE match SET winner = :new WHERE winner = :old"), {"new": f_id, "old": zombie.id})
+                # Checkpointed feature state is keyed by the old ID, replay from scratch
+                db_session.execute(text("DELETE FROM feature_checkpoint"))
                 
                 db_session.delete(zombie)
                 db_session.commit()
                 logger.info(f"Migration successful for {f_name}.")
+                if store:
+                    store.remap_fighter(zombie_id, f_id)
+                    store.upsert_fighter(new_fighter)
                 return 
             except IntegrityError:
                 db_session.rollback()
@@ -148,6 +199,7 @@ def sync_fighter_stats(fighter_info: dict, db_session: Session, logger) -> None:
         try:
             db_session.commit()
             logger.info(f"Imported fighter from API: {f_name}")
+            if store: store.upsert_fighter(new_fighter)
         except IntegrityError:
             db_session.rollback()
     else:
@@ -156,17 +208,30 @@ def sync_fighter_stats(fighter_info: dict, db_session: Session, logger) -> None:
         fighter.tier = api_tier
         fighter.last_updated = datetime.now(timezone.utc)
         logger.info(f"Synced fighter stats: {f_name}")
-        try: db_session.commit()
+        try:
+            db_session.commit()
+            if store: store.upsert_fighter(fighter)
         except: db_session.rollback()
         
-def backfill_matches(fighter_info: dict, db_session: Session, logger, seen_ids: set) -> int:
+def backfill_matches(fighter_info: dict, db_session: Session, logger, seen_ids: set, store: FighterStateStore | None = None) -> int:
     if not fighter_info or not fighter_info.get("id"): return 0
-    
-    history = get_fighter_history(fighter_info["id"])
-    if not history: history = fighter_info.get("matches", [])
+    f_id = fighter_info["id"]
+    now = datetime.now(timezone.utc)
+
+    sync = db_session.get(FighterSync, f_id)
+    if sync and sync.last_synced and sync.last_synced > now - HISTORY_SYNC_INTERVAL:
+        return 0
+
+    prev_count = (sync.synced_count or 0) if sync else 0
+    last_match_id = sync.last_match_id if sync else None
+    history, synced_count, completed = get_fighter_history(f_id, prev_count, last_match_id)
+    from_api = bool(history) or completed
+    if not from_api:
+        history = [m for m in fighter_info.get("matches", []) if last_match_id is None or m["id"] > last_match_id]
 
     new_matches_added = 0
     local_fighter_cache = set() 
+    first_skipped = None  # The watermark must not pass a match we could not store
 
     for match_data in history:
         try:
@@ -179,27 +244,32 @@ def backfill_matches(fighter_info: dict, db_session: Session, logger, seen_ids:
             if not db_session.get(Fighter, r_id) and r_id not in local_fighter_cache:
                 f_data = get_fighter_details(r_id)
                 if f_data:
-                    if ensure_fighter_exists(f_data, db_session, logger):
+                    if ensure_fighter_exists(f_data, db_session, logger, store):
                         local_fighter_cache.add(r_id)
             
             if not db_session.get(Fighter, b_id) and b_id not in local_fighter_cache:
                 f_data = get_fighter_details(b_id)
                 if f_data:
-                    if ensure_fighter_exists(f_data, db_session, logger):
+                    if ensure_fighter_exists(f_data, db_session, logger, store):
                         local_fighter_cache.add(b_id)
 
             if not db_session.get(Fighter, r_id) or not db_session.get(Fighter, b_id):
+                first_skipped = match_id if first_skipped is None else min(first_skipped, match_id)
                 continue
 
             match_date = datetime.fromisoformat(match_data["date"])
             time_window = match_date - timedelta(minutes=60)
             ghosts = db_session.query(MatchDB).filter(MatchDB.fighter_red == r_id, MatchDB.fighter_blue == b_id, MatchDB.date >= time_window).all()
             
-            my_bet, my_wager, match_balance = None, None, None
+            my_bet, my_wager, match_balance, expected_payout, my_profit = None, None, None, None, None
             for g in ghosts:
                 if g.my_bet_on: 
                     my_bet, my_wager, match_balance = g.my_bet_on, g.my_wager, g.match_balance
+                    expected_payout, my_profit = g.expected_payout, g.my_profit
+                # Keep the bet-time features, they now belong to the API's match ID
+                db_session.execute(text("UPDATE match_features SET match_id = :new WHERE match_id = :old AND NOT EXISTS (SELECT 1 FROM match_features WHERE match_id = :new)"), {"new": match_id, "old": g.id})
                 db_session.delete(g)
+                if store: store.remove_result(g.fighter_red, g.fighter_blue, g.winner)
             
             if my_bet: logger.info(f"Consolidated bet '{my_bet}' into ID {match_id}")
 
@@ -209,44 +279,66 @@ def backfill_matches(fighter_info: dict, db_session: Session, logger, seen_ids:
                 date=match_date, streak_red=match_data["streak_red"], streak_blue=match_data["streak_blue"],
                 bet_red=match_data.get("bet_red") or 0, bet_blue=match_data.get("bet_blue") or 0,
                 colour=match_data.get("colour"), 
-                my_bet_on=my_bet, my_wager=my_wager, match_balance=match_balance
+                my_bet_on=my_bet, my_wager=my_wager, match_balance=match_balance,
+                expected_payout=expected_payout, my_profit=my_profit
             )
             db_session.add(new_match)
+            if store: store.record_result(r_id, b_id, match_data["winner"], match_date)
             seen_ids.add(match_id)
             new_matches_added += 1
         except Exception as e:
             logger.error(f"Failed to parse history: {e}")
             continue
-            
-    return new_matches_added
 
-def save_weights_to_db(db_session: Session, weights: dict, logger):
-    try:
-        mw = ModelWeight(
-            timestamp=datetime.now(timezone.utc),
-            intercept=weights['intercept'],
-            tier_elo=weights['tier_elo'],
-            h2h=weights['h2h'],
-            comp=weights['comp'],
-        )
-        db_session.add(mw)
-        db_session.commit()
-        logger.info("Saved new brain weights to database.")
-    except Exception as e:
-        logger.error(f"Failed to save weights: {e}")
+    # Advance the watermark past whatever the API handed us, up to the first match
+    # skipped for a missing fighter so it is fetched again. Only a complete walk
+    # marks the fighter as fresh, so a partial sync is resumed on the next sighting.
+    if from_api:
+        if not sync:
+            sync = FighterSync(fighter_id=f_id)
+            db_session.add(sync)
+        if synced_count < prev_count:
+            last_match_id = None
+        if first_skipped is not None:
+            # Everything new sits at or after the old offset, so restart the walk from there
+            synced_count = min(synced_count, prev_count) if last_match_id else 0
+        stored = [m["id"] for m in history if first_skipped is None or m["id"] < first_skipped]
+        sync.synced_count = synced_count
+        sync.last_match_id = max(stored + ([last_match_id] if last_match_id else []), default=None)
+        if completed:
+            sync.last_synced = now
+
+    return new_matches_added
 
 class ReportProcess(Process):
-    def __init__(self, db_params, queue):
+    def __init__(self, db_params, queue, windows: list[str]):
         super().__init__(daemon=True)
         self.db_params = db_params
         self.queue = queue
+        self.windows = windows  # Bet counts, "day" or "week", see PERFORMANCE_FUNCTION
 
     def run(self):
+        try:
+            self._run()
+        finally:
+            flush_discord_alerts()  # Children skip atexit, see flush_discord_alerts
+
+    def _run(self):
         configure_process_logger(self.queue)
         logger = get_bot_logger()
         logger.info("Reporter process started.")
         
         db = Database(*self.db_params, logger)
+        windows = []
+        for window in self.windows:
+            try:
+                db.get_performance(window)
+                windows.append(window)
+            except ValueError as e:
+                logger.error(f"Leaving it out of the report: {e}")
+        if not windows:
+            windows = [DEFAULT_REPORT_WINDOW]
+            logger.error(f"No valid REPORT_WINDOWS, reporting the last {DEFAULT_REPORT_WINDOW} bets.")
         
         # GMT-3 Timezone (Alagoas)
         BRT = timezone(timedelta(hours=-3))
@@ -258,20 +350,22 @@ class ReportProcess(Process):
                 # Report at 08:xx and 17:xx
                 if now.hour in [8, 17]:
                     if now.hour != last_sent_hour:
-                        balance, wr, roi, total_bets = db.get_recent_performance(limit=100)
-                        bal_str = f"${balance:,}"
-                        emoji = "📈" if roi > 0 else "📉"
+                        balance = db.get_performance(windows[0]).balance
+                        lines = []
+                        for window in windows:
+                            performance = db.get_performance(window)
+                            emoji = "📈" if performance.roi > 0 else "📉"
+                            label = f"Last {window} bets" if window.isdigit() else f"Last {window}"
+                            lines.append(f"{emoji} **{label}:** ROI `{performance.roi:.2f}%` · Win Rate `{performance.win_rate:.1f}%` · {performance.bets} bets")
                         
                         message = (
                             f"📊 **Daily Report ({now.strftime('%H:%M')} GMT-3)**\n"
-                            f"💰 **Balance:** `{bal_str}`\n"
-                            f"{emoji} **ROI (Last 100):** `{roi:.2f}%`\n"
-                            f"🎯 **Win Rate:** `{wr:.1f}%`\n"
-                            f"🎲 **Bets Placed:** {total_bets}"
+                            f"💰 **Balance:** `${balance:,}`\n"
+                            + "\n".join(lines)
                         )
                         
                         send_discord_alert(message)
-                        logger.info(f"Sent scheduled report: ROI {roi:.2f}%")
+                        logger.info(f"Sent scheduled report: {lines}")
                         last_sent_hour = now.hour
                 else:
                     if last_sent_hour != -1:
@@ -283,7 +377,7 @@ class ReportProcess(Process):
                 time.sleep(60)
 
 class BotProcess(Process):
-    def __init__(self, postgres_db, postgres_user, postgres_password, postgres_host, postgres_port, twitch_username, twitch_oauth_token, queue):
+    def __init__(self, postgres_db, postgres_user, postgres_password, postgres_host, postgres_port, twitch_username, twitch_oauth_token, queue, heartbeat=None):
         super().__init__(daemon=True)
         self.postgres_db = postgres_db
         self.postgres_user = postgres_user
@@ -293,8 +387,21 @@ class BotProcess(Process):
         self.twitch_username = twitch_username
         self.twitch_oauth_token = twitch_oauth_token
         self.queue = queue
+        self.heartbeat = heartbeat  # Write end of the watchdog's heartbeat pipe
 
     def run(self) -> None:
+        try:
+            self._run()
+        finally:
+            flush_discord_alerts()  # Children skip atexit, see flush_discord_alerts
+
+    def _run(self) -> None:
+        # NumPy and the training stack are only needed here, the watchdog, the log
+        # listener and the reporter never import them
+        from src.betting_strategy import BettingEngine, PairFeatureCache
+        from src.online import OnlineLogistic
+        from src.trainer import BackgroundTrainer
+
         configure_process_logger(self.queue)
         bot_logger = get_bot_logger()
         bot_logger.info("Bot started")
@@ -302,7 +409,10 @@ class BotProcess(Process):
         send_discord_alert("🤖 **SodiumTycoon AI is ONLINE.** Ready to print.")
 
         database = Database(self.postgres_db, self.postgres_user, self.postgres_password, self.postgres_host, self.postgres_port, bot_logger)
+        state_file = state_path()
+        state = load_state(state_file, bot_logger)
         web_client = SaltyWebClient()
+        wallet = WalletLedger.from_state(state.wallet) if state and state.wallet else WalletLedger()
         if web_client.login():
             bot_logger.info("Headless Betting: ENABLED (Logged in)")
         else:
@@ -311,13 +421,35 @@ class BotProcess(Process):
         irc_bot = TwitchBot(self.twitch_username, self.twitch_oauth_token, bot_logger)
         
         bot_logger.info("Initializing AI Brain...")
-        current_weights = train_model()
-        if current_weights:
-            bot_logger.info(f"Brain updated: {current_weights}")
-            with SessionLocal() as session:
-                save_weights_to_db(session, current_weights, bot_logger)
+        current_weights: dict | None = None
+        current_weights_version: int | None = None
+        current_fitted_until: datetime | None = None  # Last match the weights have seen, None for the defaults
+        with get_session() as session:
+            active_model = load_active_model(session.connection())
+        if active_model:
+            current_weights, current_weights_version = active_model.weights, active_model.version
+            current_fitted_until = active_model.fitted_until
+            bot_logger.info(f"Loaded model version {current_weights_version}: {current_weights}")
         else:
             bot_logger.info("Using default weights.")
+
+        online_model: OnlineLogistic | None = None
+        if state and state.weights and state.weights_version == current_weights_version:
+            current_weights = state.weights  # Includes the online updates made on top of the active model
+        if os.environ.get("ONLINE_LEARNING"):
+            online_model = OnlineLogistic(BettingEngine(None, weights=current_weights).weights)
+            current_fitted_until = datetime.now(timezone.utc)  # Online weights have seen every match
+            bot_logger.info("Online learning: ENABLED")
+
+        # Catch up on matches recorded since the active model was trained, off the hot path.
+        # A warm restart carries on with the previous process's retrain schedule instead.
+        trainer = BackgroundTrainer(bot_logger)
+        if not (state and state.in_flight): trainer.request(current_weights, current_fitted_until)
+
+        with get_session() as session:
+            fighter_store = FighterStateStore.load(session, bot_logger)
+        pair_cache = PairFeatureCache()
+        fighter_store.subscribe(pair_cache.invalidate)
         
         current_balance = 1000 
         matches_tracked = 0
@@ -326,35 +458,79 @@ class BotProcess(Process):
         current_bet_color: str | None = None
         current_wager: int | None = None
         current_balance_snapshot: int | None = None
+        current_features_id: int | None = None
+        current_features: dict | None = None
 
         last_pool_red: int = 0
         last_pool_blue: int = 0
 
+        if state:
+            current_balance, matches_tracked = state.balance, state.matches_tracked
+            current_match = Match.from_state(state.match, bot_logger) if state.match else None
+            saved_match_info, current_bet_color, current_wager = state.match_info, state.bet_colour, state.wager
+            current_balance_snapshot, current_features_id, current_features = state.balance_snapshot, state.features_id, state.features
+            last_pool_red, last_pool_blue = state.pool_red, state.pool_blue
+            if current_match: bot_logger.info(f"Resuming {current_match.fighter_red_name} vs. {current_match.fighter_blue_name} ({current_match.status.value}).")
+
+        def save_snapshot() -> None:
+            save_state(state_file, BotState(
+                match=current_match.state() if current_match else None,
+                match_info=saved_match_info,
+                bet_colour=current_bet_color,
+                wager=current_wager,
+                balance_snapshot=current_balance_snapshot,
+                features_id=current_features_id,
+                features=current_features,
+                pool_red=last_pool_red,
+                pool_blue=last_pool_blue,
+                wallet=wallet.state(),
+                balance=current_balance,
+                matches_tracked=matches_tracked,
+                weights=current_weights,
+                weights_version=current_weights_version,
+            ), bot_logger)
+
         for message in irc_bot.listen():
-            db_session = SessionLocal()
+            db_session = get_session()
             try:
+                trained = trainer.poll()
+                if trained and trained.promoted:
+                    current_weights, current_weights_version = trained.weights, trained.version
+                    current_fitted_until = trained.run.window_end
+                    bot_logger.info(f"Brain updated to version {trained.version} (log-loss {trained.run.log_loss:.4f}): {current_weights}")
+                    if online_model: online_model.reset(current_weights)
+                elif trained:
+                    bot_logger.info(f"Kept version {current_weights_version}, retrained version {trained.version} was not shown to beat it.")
+
                 if message is None:
                     database.update_bot_heartbeat()
+                    self.beat()
                     continue
 
                 if isinstance(message, OpenBetMessage):
+                    bet_deadline = web_client.bet_deadline(time.monotonic())
+                    current_features_id, current_features = None, None
                     bot_logger.info("New match. %s VS. %s. Tier: %s.", message.fighter_red_name, message.fighter_blue_name, message.tier)
                     database.update_current_match(**asdict(message))
 
                     if message.match_format != MatchFormat.EXHIBITION:
                         current_match = Match(message, bot_logger)
+                        if wallet.pending_wager:
+                            # Previous bet never got a result, the prediction is unreliable
+                            wallet.invalidate()
                         try:
                             match_info = get_current_match_info()
                             saved_match_info = match_info
                             if match_info:
-                                sync_fighter_stats(match_info.get("fighter_red_info"), db_session, bot_logger)
-                                sync_fighter_stats(match_info.get("fighter_blue_info"), db_session, bot_logger)
+                                sync_fighter_stats(match_info.get("fighter_red_info"), db_session, bot_logger, fighter_store)
+                                sync_fighter_stats(match_info.get("fighter_blue_info"), db_session, bot_logger, fighter_store)
                             
-                            if web_client.is_logged_in:
+                            if web_client.is_logged_in and wallet.needs_reconcile(message.match_format):
                                 real_balance = web_client.get_wallet_balance()
-                                if real_balance > 0: current_balance = real_balance
+                                if real_balance > 0: wallet.reconcile(real_balance, message.match_format)
+                            if wallet.balance: current_balance = wallet.balance
                             
-                            engine = BettingEngine(db_session, weights=current_weights)
+                            engine = BettingEngine(db_session, weights=current_weights, store=fighter_store, cache=pair_cache)
                             wager, color, confidence = engine.get_bet(message.fighter_red_name, message.fighter_blue_name, current_balance)
                             
                             current_bet_color = color.capitalize()
@@ -364,7 +540,18 @@ class BotProcess(Process):
                             if web_client.is_logged_in:
                                 conf_str = f"{confidence:.1%}"
                                 bot_logger.info(f"Placing bet: ${wager} on {color} (Confidence: {conf_str})")
-                                web_client.place_bet(wager, color)
+                                bet_result = web_client.place_bet(wager, color, deadline=bet_deadline)
+                                if bet_result == BetResult.ACCEPTED:
+                                    wallet.place(wager, color)
+                                else:
+                                    # Nothing was staked, don't attribute this match to us
+                                    current_bet_color, current_wager = None, None
+                                    bot_logger.warning(f"Bet {bet_result.value}. Submission stats: {web_client.stats.summary()}")
+                                if web_client.stats.total % 50 == 0:
+                                    bot_logger.info(f"Bet submission stats: {web_client.stats.summary()}")
+                            if engine.last_features:
+                                current_features = engine.last_features
+                                current_features_id = database.record_features(current_features, current_weights_version)
                         except Exception as e:
                             bot_logger.error(f"Error during betting: {e}")
                             saved_match_info = None
@@ -385,46 +572,50 @@ class BotProcess(Process):
                             
                             if saved_match_info:
                                 bot_logger.info("Back-filling history...")
-                                ensure_fighter_exists(saved_match_info.get("fighter_red_info"), db_session, bot_logger)
-                                ensure_fighter_exists(saved_match_info.get("fighter_blue_info"), db_session, bot_logger)
+                                ensure_fighter_exists(saved_match_info.get("fighter_red_info"), db_session, bot_logger, fighter_store)
+                                ensure_fighter_exists(saved_match_info.get("fighter_blue_info"), db_session, bot_logger, fighter_store)
                                 seen_match_ids = set()
-                                total = backfill_matches(saved_match_info.get("fighter_red_info"), db_session, bot_logger, seen_match_ids)
-                                total += backfill_matches(saved_match_info.get("fighter_blue_info"), db_session, bot_logger, seen_match_ids)
+                                total = backfill_matches(saved_match_info.get("fighter_red_info"), db_session, bot_logger, seen_match_ids, fighter_store)
+                                total += backfill_matches(saved_match_info.get("fighter_blue_info"), db_session, bot_logger, seen_match_ids, fighter_store)
+                                db_session.commit()
                                 if total > 0:
-                                    db_session.commit()
                                     bot_logger.info(f"Back-filled {total} matches.")
 
                     elif isinstance(message, WinMessage):
                         if current_match.update_winner(message):
                             bot_logger.info("Winner: %s.", message.winner_name)
+                            wallet.settle(message.colour, last_pool_red, last_pool_blue)
+                            if web_client.is_logged_in:
+                                web_client.warm_up()
                             
                             if current_wager and current_bet_color:
-                                profit = 0
-                                won = False
-                                if current_bet_color == "Red" and message.colour == "Red": won = True
-                                elif current_bet_color == "Blue" and message.colour == "Blue": won = True
-                                
-                                if won:
-                                    if current_bet_color == "Red" and last_pool_red > 0:
-                                        profit = int(current_wager * (last_pool_blue / last_pool_red))
-                                    elif current_bet_color == "Blue" and last_pool_blue > 0:
-                                        profit = int(current_wager * (last_pool_red / last_pool_blue))
-                                    
-                                    if profit > 100_000:
-                                        send_discord_alert(f"💸 **BIG WIN!** Profit: ${profit:,} ({message.winner_name})")
-
-                            database.record_match(current_match, my_bet=current_bet_color, my_wager=current_wager, match_balance=current_balance_snapshot)
-                            current_bet_color, current_wager = None, None
+                                profit = bet_profit(current_bet_color, current_wager, message.colour, last_pool_red, last_pool_blue)
+                                if profit > 100_000:
+                                    send_discord_alert(f"💸 **BIG WIN!** Profit: ${profit:,} ({message.winner_name})")
+
+                            recorded = database.record_match(current_match, my_bet=current_bet_color, my_wager=current_wager, match_balance=current_balance_snapshot, features_id=current_features_id)
+                            if recorded:
+                                for fighter_state in recorded.fighters: fighter_store.upsert_fighter(fighter_state)
+                                fighter_store.record_result(recorded.match["fighter_red"], recorded.match["fighter_blue"], recorded.match["winner"], recorded.match["date"])
+                                if online_model and current_features:
+                                    current_weights = online_model.update(current_features, recorded.match["winner"] == recorded.match["fighter_red"])
+                                    current_fitted_until = recorded.match["date"]
+                            current_bet_color, current_wager, current_features_id, current_features = None, None, None, None
                             
                             matches_tracked += 1
-                            if matches_tracked >= 100:
-                                bot_logger.info("Re-training AI...")
-                                new_weights = train_model()
-                                if new_weights:
-                                    current_weights = new_weights
-                                    bot_logger.info("Brain updated!")
-                                    save_weights_to_db(db_session, new_weights, bot_logger)
-                                matches_tracked = 0
+                            if matches_tracked >= (ONLINE_REFIT_INTERVAL if online_model else RETRAIN_INTERVAL):
+                                # A refit that is still running keeps the counter, retry next match
+                                if trainer.request(current_weights, current_fitted_until):
+                                    bot_logger.info("Re-training AI in the background...")
+                                    matches_tracked = 0
+                            elif online_model and matches_tracked % ONLINE_SAVE_INTERVAL == 0:
+                                bot_logger.info(f"Online weights after {online_model.updates} updates: {current_weights}")
+                                # Kept for the record only: SGD snapshots skip validation, so they never become
+                                # the active model. The bot carries on with (and snapshots) its in-memory weights.
+                                register_weights(db_session, current_weights, bot_logger, "online", activate=False)
+
+                # Every message above is a state transition, a restarted bot resumes from here
+                save_snapshot()
             except Exception as e:
                 err_msg = f"⚠️ **CRITICAL ERROR**: {str(e)}"
                 send_discord_alert(err_msg)
@@ -435,15 +626,24 @@ class BotProcess(Process):
             finally:
                 db_session.close()
 
+    def beat(self) -> None:
+        if self.heartbeat is None: return
+        try:
+            self.heartbeat.send_bytes(b"")
+        except OSError:
+            pass  # The watchdog is gone, this daemon process goes with it
+
 def run(log_path: Path | None) -> None:
-    queue: Queue = Queue(-1)
-    log_listener = Process(target=run_listener, args=(queue, log_path))
-    log_listener.start()
+    queue: Queue = create_log_queue()
     configure_process_logger(queue)
     watchdog_logger = get_watchdog_logger()
+    log_listener = Supervised("Log listener", lambda _: Process(target=run_listener, args=(queue, log_path)), watchdog_logger)
+    log_listener.start()
     watchdog_logger.info("Running bot watchdog")
     
+    engine = get_engine()
     Base.metadata.create_all(bind=engine)
+    engine.dispose()  # The watchdog doesn't use it again, don't keep a connection open
     
     # DB Parameters passed to subprocesses
     db_params = (
@@ -454,53 +654,32 @@ def run(log_path: Path | None) -> None:
         int(os.environ["POSTGRES_PORT"])
     )
 
-    # 1. Main Bot Process
-    bot_process = new_bot_process(queue, db_params)
-    
-    # 2. Report Scheduler Process
-    report_process = ReportProcess(db_params, queue)
-    report_process.start()
-    watchdog_logger.info("Report Scheduler started.")
-
-    last_restart, last_health = datetime.now(timezone.utc), datetime.now(timezone.utc)
-    database = Database(*db_params, watchdog_logger)
-
-    while True:
-        now = datetime.now(timezone.utc)
-        heartbeat = database.get_bot_heartbeat()
-        restart = False
-        if heartbeat is None and last_health < now - timedelta(minutes=5): restart = True
-        elif not bot_process.is_alive(): restart = True
-        elif heartbeat and heartbeat < now - timedelta(minutes=2): restart = True
-        else: last_health = now
-
-        if restart:
-            if last_restart < now - timedelta(minutes=5):
-                watchdog_logger.info("Restarting bot...")
-                close_bot_process(bot_process)
-                bot_process = new_bot_process(queue, db_params)
-                last_restart = now
-            else:
-                watchdog_logger.info("Refusing rapid restart.")
-        
-        # Keep Report Process Alive
-        if not report_process.is_alive():
-            watchdog_logger.warning("Restarting Report Process...")
-            report_process = ReportProcess(db_params, queue)
-            report_process.start()
-
-        time.sleep(60)
-        if not restart: watchdog_logger.info("Services healthy.")
+    bot = Supervised(
+        "Bot",
+        lambda heartbeat: BotProcess(*db_params, os.environ["TWITCH_USERNAME"], os.environ["TWITCH_OAUTH_TOKEN"], queue, heartbeat),
+        watchdog_logger,
+        heartbeat_timeout=HEARTBEAT_TIMEOUT,
+        startup_timeout=STARTUP_TIMEOUT,
+    )
+    report_windows = os.environ.get("REPORT_WINDOWS", REPORT_WINDOWS).split(",")
+    reporter = Supervised("Report process", lambda _: ReportProcess(db_params, queue, report_windows), watchdog_logger)
 
-def new_bot_process(queue: Queue, db_params) -> BotProcess:
-    bot = BotProcess(*db_params, os.environ["TWITCH_USERNAME"], os.environ["TWITCH_OAUTH_TOKEN"], queue)
-    bot.start()
-    return bot
+    # docker stop sends SIGTERM, which PID 1 would otherwise ignore until SIGKILL
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
 
-def close_bot_process(bot: BotProcess) -> None:
+    # Wakes up on a process exiting or the bot beating, restarts are immediate
+    # unless a process keeps failing
     try:
-        if bot.is_alive(): bot.terminate()
-        time.sleep(10)
-        bot.close()
-    except Exception:
-        pass
\ No newline at end of file
+        supervise([log_listener, bot, reporter])
+    finally:
+        watchdog_logger.info("Watchdog shutting down")
+        bot.stop()
+        reporter.stop()
+        # The listener exits on the sentinel once everything queued before it is written
+        if log_listener.process is not None and log_listener.process.is_alive():
+            try:
+                queue.put(None, timeout=LOG_DRAIN_TIMEOUT)
+                log_listener.process.join(LOG_DRAIN_TIMEOUT)
+            except Full:
+                pass
+        log_listener.stop()
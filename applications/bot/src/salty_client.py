@@ -1,15 +1,66 @@
 import logging
 import os
 import re
+import time
+from dataclasses import dataclass, field
+from enum import Enum, unique
+
 import requests
 from tenacity import retry, stop_after_attempt, wait_fixed
 
 logger = logging.getLogger(__name__)
 
+
+@unique
+class BetResult(Enum):
+    ACCEPTED = "accepted"
+    LATE = "late"
+    FAILED = "failed"
+
+
+@dataclass
+class BetSubmissionStats:
+    accepted: int = 0
+    late: int = 0
+    failed: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+    def record(self, result: BetResult, latency: float | None = None) -> None:
+        if result == BetResult.ACCEPTED:
+            self.accepted += 1
+        elif result == BetResult.LATE:
+            self.late += 1
+        else:
+            self.failed += 1
+        if latency is not None:
+            self.latencies = self.latencies[-99:] + [latency]
+
+    @property
+    def total(self) -> int:
+        return self.accepted + self.late + self.failed
+
+    def summary(self) -> str:
+        avg_ms = (sum(self.latencies) / len(self.latencies) * 1000) if self.latencies else 0.0
+        return (
+            f"accepted={self.accepted} late={self.late} failed={self.failed} "
+            f"avg_latency={avg_ms:.0f}ms"
+        )
+
+
 class SaltyWebClient:
     LOGIN_URL = "https://www.saltybet.com/authenticate?signin=1"
     BET_URL = "https://www.saltybet.com/ajax_place_bet.php"
     INDEX_URL = "https://www.saltybet.com/"
+    STATE_URL = "https://www.saltybet.com/state.json"
+
+    # Bets lock roughly this long after waifu4u announces OPEN. Kept conservative since
+    # the IRC message itself reaches us a few seconds after the site opens betting.
+    BET_WINDOW_SECONDS = 40.0
+    LOCK_SAFETY_MARGIN = 2.0
+    REQUEST_TIMEOUT = 5.0
+    MIN_ATTEMPT_SECONDS = 0.5
+    RETRY_BACKOFF = 0.5
+    MAX_BET_ATTEMPTS = 3
     
     HEADERS = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
@@ -23,6 +74,7 @@ class SaltyWebClient:
         self.email = os.getenv("SALTY_EMAIL")
         self.password = os.getenv("SALTY_PASSWORD")
         self.is_logged_in = False
+        self.stats = BetSubmissionStats()
 
     def login(self):
         """
@@ -40,7 +92,7 @@ class SaltyWebClient:
 
         try:
             # Direct POST (Proven to work)
-            response = self.session.post(self.LOGIN_URL, data=payload)
+            response = self.session.post(self.LOGIN_URL, data=payload, timeout=self.REQUEST_TIMEOUT)
             
             # Check for cookie
             if "PHPSESSID" in self.session.cookies:
@@ -64,7 +116,7 @@ class SaltyWebClient:
                 return 0
 
         try:
-            response = self.session.get(self.INDEX_URL)
+            response = self.session.get(self.INDEX_URL, timeout=self.REQUEST_TIMEOUT)
             if response.status_code == 200:
                 match = re.search(r'<span[^>]*id="balance"[^>]*>([\d,]+)<', response.text)
                 if match:
@@ -80,14 +132,32 @@ class SaltyWebClient:
             logger.error(f"Balance check failed: {e}")
             return 0
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
-    def place_bet(self, wager: int, color: str):
+    @classmethod
+    def bet_deadline(cls, opened_at: float) -> float:
+        """Absolute (monotonic) time after which a bet can no longer beat the lock."""
+        return opened_at + cls.BET_WINDOW_SECONDS - cls.LOCK_SAFETY_MARGIN
+
+    def warm_up(self) -> None:
         """
-        Places a bet.
+        Touches SaltyBet with a tiny request so the pooled TLS connection is open
+        before the next match instead of being re-established on the bet itself.
+        """
+        try:
+            self.session.get(self.STATE_URL, timeout=self.REQUEST_TIMEOUT)
+        except Exception as e:
+            logger.debug(f"Connection warm-up failed: {e}")
+
+    def place_bet(self, wager: int, color: str, deadline: float | None = None) -> BetResult:
+        """
+        Places a bet, retrying only while a retry can still land before `deadline`.
         """
         if not self.is_logged_in:
             if not self.login():
-                return
+                self.stats.record(BetResult.FAILED)
+                return BetResult.FAILED
+
+        if deadline is None:
+            deadline = self.bet_deadline(time.monotonic())
 
         selected_player = "player1" if color.lower() == "red" else "player2"
         payload = {
@@ -95,11 +165,34 @@ class SaltyWebClient:
             "wager": str(wager),
         }
 
-        try:
-            response = self.session.post(self.BET_URL, data=payload)
-            if response.status_code == 200:
-                logger.info(f"BET PLACED: ${wager} on {color.upper()}")
-            else:
-                logger.warning(f"Failed to place bet. Status: {response.status_code}")
-        except Exception as e:
-            logger.error(f"Betting request failed: {e}")
\ No newline at end of file
+        result = BetResult.FAILED
+        for attempt in range(1, self.MAX_BET_ATTEMPTS + 1):
+            remaining = deadline - time.monotonic()
+            if remaining < self.MIN_ATTEMPT_SECONDS:
+                result = BetResult.LATE
+                break
+
+            started = time.monotonic()
+            try:
+                response = self.session.post(
+                    self.BET_URL, data=payload, timeout=min(self.REQUEST_TIMEOUT, remaining)
+                )
+                if response.status_code == 200:
+                    self.stats.record(BetResult.ACCEPTED, time.monotonic() - started)
+                    logger.info(f"BET PLACED: ${wager} on {color.upper()}")
+                    return BetResult.ACCEPTED
+                logger.warning(f"Failed to place bet (attempt {attempt}). Status: {response.status_code}")
+            except Exception as e:
+                logger.error(f"Betting request failed (attempt {attempt}): {e}")
+
+            if attempt == self.MAX_BET_ATTEMPTS:
+                break
+            if deadline - time.monotonic() < self.RETRY_BACKOFF + self.MIN_ATTEMPT_SECONDS:
+                result = BetResult.LATE
+                break
+            time.sleep(self.RETRY_BACKOFF)
+
+        self.stats.record(result)
+        if result == BetResult.LATE:
+            logger.warning(f"Bet of ${wager} on {color.upper()} abandoned, bets are about to lock.")
+        return result
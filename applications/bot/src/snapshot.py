@@ -0,0 +1,113 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from src.history import (
+    HISTORY_DTYPES,
+    MatchHistory,
+    count_matches_up_to,
+    load_match_history,
+    match_date,
+)
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+FIGHTER_IDS_FILE = "fighter_ids.bin"
+
+
+def sync_snapshot(connection, path: Path) -> tuple[int, bool]:
+    """
+    Brings the columnar snapshot at `path` up to date with the match table.
+
+    Each MatchHistory column is a headerless native-endian array in `<column>.bin`
+    and fighter_ids.bin maps fighter codes to database IDs. New matches are appended
+    after a (date, id) watermark. Fighter codes are append-stable, so earlier rows
+    never change. meta.json is replaced atomically last and is the only thing
+    readers trust, so a crash mid-append just leaves bytes that are cut off on the
+    next sync. If older matches were back-filled since, the snapshot is rebuilt.
+
+    Returns (rows appended, whether the snapshot was rebuilt).
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    meta = _read_meta(path)
+    if meta is not None and meta["rows"]:
+        watermark = (datetime.fromisoformat(meta["last_match_date"]), meta["last_match_id"])
+        if count_matches_up_to(connection, *watermark) != meta["rows"]:
+            meta = None
+
+    if meta is None or not meta["rows"]:
+        # No watermark yet (or an empty table last time), load everything there is
+        meta = {"format_version": FORMAT_VERSION, "rows": 0, "fighters": 0}
+        history = load_match_history(connection)
+    else:
+        fighter_ids = np.fromfile(path / FIGHTER_IDS_FILE, dtype=np.int64, count=meta["fighters"])
+        history = load_match_history(connection, after=watermark, fighter_ids=fighter_ids)
+    rebuilt = meta["rows"] == 0
+
+    if len(history) or rebuilt:
+        _append(path / FIGHTER_IDS_FILE, history.fighter_ids[meta["fighters"]:], meta["fighters"], np.int64)
+        for column, dtype in HISTORY_DTYPES.items():
+            _append(path / f"{column}.bin", getattr(history, column), meta["rows"], dtype)
+
+        if len(history):
+            last_match_id = int(history.match_id[-1])
+            meta["last_match_id"] = last_match_id
+            meta["last_match_date"] = match_date(connection, last_match_id).isoformat()
+        meta["rows"] += len(history)
+        meta["fighters"] = history.num_fighters
+        _write_meta(path, meta)
+    return len(history), rebuilt
+
+
+def load_history(connection, snapshot_dir: Path | None = None) -> MatchHistory:
+    """The match history, synced into and mapped from `snapshot_dir` when given."""
+    if snapshot_dir is None:
+        return load_match_history(connection)
+    sync_snapshot(connection, snapshot_dir)
+    return open_snapshot(snapshot_dir)
+
+
+def open_snapshot(path: Path) -> MatchHistory:
+    """Memory-maps the snapshot read-only. Costs milliseconds regardless of size."""
+    meta = _read_meta(path)
+    if meta is None:
+        raise FileNotFoundError(f"No match history snapshot at {path}")
+    columns = {
+        column: _map(path / f"{column}.bin", dtype, meta["rows"])
+        for column, dtype in HISTORY_DTYPES.items()
+    }
+    return MatchHistory(
+        **columns, fighter_ids=_map(path / FIGHTER_IDS_FILE, np.int64, meta["fighters"])
+    )
+
+
+def _map(file: Path, dtype, count: int) -> np.ndarray:
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(file, dtype=dtype, mode="r", shape=(count,))
+
+
+def _append(file: Path, values: np.ndarray, committed: int, dtype) -> None:
+    with open(file, "r+b" if file.exists() else "wb") as handle:
+        handle.truncate(committed * np.dtype(dtype).itemsize)
+        handle.seek(0, os.SEEK_END)
+        np.ascontiguousarray(values, dtype=dtype).tofile(handle)
+
+
+def _read_meta(path: Path) -> dict | None:
+    try:
+        meta = json.loads((path / META_FILE).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if meta.get("format_version") != FORMAT_VERSION or "rows" not in meta:
+        return None
+    return meta
+
+
+def _write_meta(path: Path, meta: dict) -> None:
+    tmp = path / f"{META_FILE}.tmp"
+    tmp.write_text(json.dumps(meta))
+    os.replace(tmp, path / META_FILE)
@@ -0,0 +1,129 @@
+import logging
+import time
+from collections.abc import Callable
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection, wait
+
+TERMINATE_GRACE = 5.0  # Seconds a process gets to exit after SIGTERM before it is killed
+KILL_GRACE = 2.0
+RESTART_BACKOFF = 1.0  # Delay before the second restart in a row, doubled for every further one
+MAX_RESTART_BACKOFF = 300.0
+STABLE_UPTIME = 300.0  # Running this long before failing resets the backoff
+
+
+class Supervised:
+    """
+    A child process the watchdog restarts when it exits or, if it has a heartbeat
+    timeout, when it stops beating. `factory` builds an unstarted process and gets
+    the write end of a heartbeat pipe (None without a timeout); the process sends
+    on it whenever it is healthy.
+
+    A process that fails after running for STABLE_UPTIME is restarted at once;
+    back-to-back failures wait RESTART_BACKOFF, doubling up to MAX_RESTART_BACKOFF.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[Connection | None], Process],
+        logger: logging.Logger,
+        heartbeat_timeout: float | None = None,
+        startup_timeout: float | None = None,
+    ) -> None:
+        self.name = name
+        self.factory = factory
+        self.logger = logger
+        self.heartbeat_timeout = heartbeat_timeout
+        self.startup_timeout = startup_timeout or heartbeat_timeout  # Until the first beat
+        self.process: Process | None = None
+        self.heartbeats: Connection | None = None
+        self.started = 0.0
+        self.last_beat: float | None = None
+        self.failures = 0  # Failures in a row, each within STABLE_UPTIME of its start
+        self.restart_at = 0.0
+
+    def start(self) -> None:
+        writer = None
+        if self.heartbeat_timeout is not None:
+            self.heartbeats, writer = Pipe(duplex=False)
+        self.process = self.factory(writer)
+        self.process.start()
+        if writer is not None:
+            writer.close()  # The child holds the only write end, so its exit reads as EOF
+        self.started, self.last_beat = time.monotonic(), None
+
+    def waitables(self) -> list:
+        if self.process is None:
+            return []
+        return [self.process.sentinel] + ([self.heartbeats] if self.heartbeats else [])
+
+    def check(self, now: float) -> float | None:
+        """
+        Handles whatever happened to the process since the last check. Returns the
+        seconds until it next needs a check without an event, None if only events.
+        """
+        if self.process is None:
+            if now < self.restart_at:
+                return self.restart_at - now
+            self.start()
+            return self.startup_timeout
+
+        self._drain_heartbeats(now)
+        if not self.process.is_alive():
+            self._fail(now, f"exited with code {self.process.exitcode}")
+        elif self.heartbeat_timeout is not None and now >= self._heartbeat_deadline():
+            self._fail(now, "stopped sending heartbeats")
+        else:
+            return self._heartbeat_deadline() - now if self.heartbeat_timeout is not None else None
+        return self.check(time.monotonic())  # Stopping it took a while
+
+    def stop(self) -> None:
+        if self.process is not None:
+            stop_process(self.process)
+            self.process = None
+        if self.heartbeats is not None:
+            self.heartbeats.close()
+            self.heartbeats = None
+
+    def _heartbeat_deadline(self) -> float:
+        if self.last_beat is None:
+            return self.started + self.startup_timeout
+        return self.last_beat + self.heartbeat_timeout
+
+    def _drain_heartbeats(self, now: float) -> None:
+        if self.heartbeats is None:
+            return
+        try:
+            while self.heartbeats.poll():
+                self.heartbeats.recv_bytes()
+                self.last_beat = now
+        except (EOFError, OSError):
+            pass  # The process exited, its sentinel says so too
+
+    def _fail(self, now: float, reason: str) -> None:
+        uptime = now - self.started
+        self.failures = self.failures + 1 if uptime < STABLE_UPTIME else 0
+        delay = 0.0 if not self.failures else min(RESTART_BACKOFF * 2 ** (self.failures - 1), MAX_RESTART_BACKOFF)
+        self.logger.warning(f"{self.name} {reason} after {uptime:.0f}s, restarting in {delay:.0f}s.")
+        self.stop()
+        self.restart_at = time.monotonic() + delay
+
+
+def stop_process(process: Process, grace: float = TERMINATE_GRACE) -> None:
+    """SIGTERM, then SIGKILL if the process is still up after `grace` seconds."""
+    if process.is_alive():
+        process.terminate()
+        process.join(grace)
+    if process.is_alive():
+        process.kill()
+        process.join(KILL_GRACE)
+    if not process.is_alive():
+        process.close()
+
+
+def supervise(processes: list[Supervised]) -> None:
+    """Starts the processes not running yet and sleeps on their sentinels and heartbeats, forever."""
+    while True:
+        now = time.monotonic()
+        timeouts = [timeout for supervised in processes if (timeout := supervised.check(now)) is not None]
+        wait([waitable for supervised in processes for waitable in supervised.waitables()], min(timeouts, default=None))
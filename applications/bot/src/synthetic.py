@@ -0,0 +1,268 @@
+from collections.abc import Iterator
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import text
+
+from src.database import Fighter, Match, copy_rows
+from src.history import HISTORY_DTYPES, MATCH_FORMATS, TIERS, MatchHistory
+
+CHUNK_SIZE = 100_000
+FIRST_FIGHTER_ID = 1_700_000_000_000_000  # Same magnitude as Database.generate_safe_id()
+START_DATE = 1_577_836_800  # 2020-01-01 UTC
+
+# Share of the roster, mean skill and typical total pot per tier
+TIER_SHARE = {"X": 0.02, "S": 0.18, "A": 0.30, "B": 0.33, "P": 0.17}
+TIER_SKILL = {"X": 3.0, "S": 1.5, "A": 0.5, "B": -0.5, "P": -1.5}
+TIER_POT = {"X": 20_000_000, "S": 6_000_000, "A": 2_500_000, "B": 1_200_000, "P": 500_000}
+
+TOURNAMENT_SHARE = 0.1
+TOURNAMENT_POT_MULTIPLIER = 2.0
+SKILL_DRIFT = 0.05  # Skill random walk standard deviation per CHUNK_SIZE matches
+CROWD_SKILL = 0.8  # How much of the skill gap the crowd's money reflects
+CROWD_STREAK = 0.1
+CROWD_NOISE = 0.7
+SECONDS_BETWEEN_MATCHES = (120, 240)
+
+
+def fighter_name(fighter_id: int) -> str:
+    return f"Synthetic {fighter_id - FIRST_FIGHTER_ID}"
+
+
+def default_fighters(num_matches: int) -> int:
+    return int(np.clip(num_matches // 100, 500, 50_000))
+
+
+class SyntheticLeague:
+    """
+    A roster of fighters with a hidden, slowly drifting skill that play matches
+    against others from their tier, as SaltyBet's matchmaking does.
+
+    The stronger fighter wins with logistic probability in the skill gap, streaks
+    follow from the results and the pots are split by a crowd that sees part of the
+    skill gap and chases streaks. Matches are produced in chunks so any number of
+    them (10M and more) can be streamed into Postgres in constant memory; the
+    league remembers streaks and the clock between calls.
+    """
+
+    def __init__(self, num_fighters: int, seed: int = 0) -> None:
+        self.rng = np.random.default_rng(seed)
+        tiers = [tier for tier in TIER_SHARE]
+        shares = np.array([TIER_SHARE[tier] for tier in tiers])
+        tier_of = self.rng.choice(len(tiers), size=num_fighters, p=shares / shares.sum())
+
+        self.fighter_ids = FIRST_FIGHTER_ID + np.arange(num_fighters, dtype=np.int64)
+        self.tier = np.array([TIERS.index(tiers[t]) for t in tier_of], dtype=np.int8)
+        self.skill = np.array([TIER_SKILL[tiers[t]] for t in tier_of]) + self.rng.normal(0, 1, num_fighters)
+        self.streak = np.zeros(num_fighters, dtype=np.int32)  # Streak after each fighter's last match
+        self.best_streak = np.zeros(num_fighters, dtype=np.int32)
+        self.last_date = np.zeros(num_fighters, dtype=np.int64)
+
+        # Tiers with a single fighter can't host a match
+        self.members = {
+            code: np.flatnonzero(self.tier == code)
+            for code in np.unique(self.tier)
+            if np.count_nonzero(self.tier == code) > 1
+        }
+        self.tier_weights = np.array([len(m) for m in self.members.values()], dtype=np.float64)
+        self.tier_weights /= self.tier_weights.sum()
+        self.pot = np.array([TIER_POT.get(TIERS[code], 1_000_000) for code in range(len(TIERS))])
+
+        self.next_match_id = 1
+        self.clock = START_DATE
+
+    @property
+    def num_fighters(self) -> int:
+        return len(self.fighter_ids)
+
+    def chunks(self, num_matches: int, chunk_size: int = CHUNK_SIZE) -> Iterator[MatchHistory]:
+        """Plays `num_matches` more matches, yielding them in chronological chunks."""
+        remaining = num_matches
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            yield self._play(size)
+            remaining -= size
+
+    def history(self, num_matches: int) -> MatchHistory:
+        """Plays `num_matches` more matches straight into one MatchHistory."""
+        return concat(list(self.chunks(num_matches)), self.fighter_ids)
+
+    def _play(self, n: int) -> MatchHistory:
+        rng = self.rng
+        self.skill += rng.normal(0, SKILL_DRIFT * np.sqrt(n / CHUNK_SIZE), self.num_fighters)
+
+        tier_codes = np.array(list(self.members), dtype=np.int8)
+        tier = tier_codes[rng.choice(len(tier_codes), size=n, p=self.tier_weights)]
+        red = np.empty(n, dtype=np.int32)
+        blue = np.empty(n, dtype=np.int32)
+        for code, members in self.members.items():
+            rows = np.flatnonzero(tier == code)
+            first = rng.integers(0, len(members), len(rows))
+            second = (first + rng.integers(1, len(members), len(rows))) % len(members)
+            red[rows], blue[rows] = members[first], members[second]
+
+        gap = self.skill[red] - self.skill[blue]
+        red_won = (rng.random(n) < 1 / (1 + np.exp(-gap))).astype(np.int8)
+        date = self.clock + np.cumsum(rng.integers(*SECONDS_BETWEEN_MATCHES, n))
+        streak_red, streak_blue = self._advance_streaks(red, blue, red_won, date)
+
+        tournament = rng.random(n) < TOURNAMENT_SHARE
+        pot = self.pot[tier] * rng.lognormal(-0.32, 0.8, n)  # Mean-one noise
+        pot *= np.where(tournament, TOURNAMENT_POT_MULTIPLIER, 1.0)
+        hype = CROWD_SKILL * gap + CROWD_STREAK * np.clip(streak_red - streak_blue, -10, 10)
+        red_share = np.clip(1 / (1 + np.exp(-(hype + rng.normal(0, CROWD_NOISE, n)))), 0.02, 0.98)
+        bet_red = np.maximum(1, pot * red_share).astype(np.int64)
+        bet_blue = np.maximum(1, pot - bet_red).astype(np.int64)
+
+        chunk = MatchHistory(
+            match_id=self.next_match_id + np.arange(n, dtype=np.int64),
+            red=red,
+            blue=blue,
+            red_won=red_won,
+            tier=tier,
+            match_format=np.where(tournament, MATCH_FORMATS.index("tournament"), 0).astype(np.int8),
+            bet_red=bet_red,
+            bet_blue=bet_blue,
+            streak_red=streak_red,
+            streak_blue=streak_blue,
+            date=date.astype(np.int64),
+            fighter_ids=self.fighter_ids,
+        )
+        self.next_match_id += n
+        self.clock = int(date[-1])
+        return chunk
+
+    def _advance_streaks(self, red, blue, red_won, date) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Streaks going into each match (positive for wins, negative for losses),
+        carrying on from `self.streak`, which is left at the streaks after the chunk.
+
+        Appearances are grouped by fighter in match order; a streak is the position
+        inside a run of equal results, plus the carried streak for a fighter's first
+        run when it has the same sign.
+        """
+        n = len(red)
+        fighter = np.concatenate([red, blue])
+        won = np.concatenate([red_won == 1, red_won == 0])
+        order = np.lexsort((np.tile(np.arange(n), 2), fighter))
+        fighter, won = fighter[order], won[order]
+
+        index = np.arange(2 * n)
+        new_fighter = np.ones(2 * n, dtype=bool)
+        new_fighter[1:] = fighter[1:] != fighter[:-1]
+        run_start = new_fighter.copy()
+        run_start[1:] |= won[1:] != won[:-1]
+        run_first = np.maximum.accumulate(np.where(run_start, index, 0))
+        fighter_first = np.maximum.accumulate(np.where(new_fighter, index, 0))
+
+        carried = self.streak[fighter]
+        continues = (run_first == fighter_first) & np.where(won, carried > 0, carried < 0)
+        length = index - run_first + 1 + np.where(continues, np.abs(carried), 0)
+        after = np.where(won, length, -length).astype(np.int32)
+
+        before = np.empty_like(after)
+        before[1:] = after[:-1]
+        before[new_fighter] = carried[new_fighter]
+
+        last = np.ones(2 * n, dtype=bool)
+        last[:-1] = new_fighter[1:]
+        self.streak[fighter[last]] = after[last]
+        np.maximum.at(self.best_streak, fighter, after)
+        self.last_date[fighter[last]] = np.tile(date, 2)[order][last]
+
+        going_in = np.empty_like(before)
+        going_in[order] = before
+        return going_in[:n], going_in[n:]
+
+    def fighter_rows(self) -> list[dict]:
+        """The fighter table as the league stands now."""
+        now = datetime.now(timezone.utc)
+        elo = np.rint(1500 + 150 * self.skill).astype(int).tolist()
+        tier_elo = np.rint(1500 + 150 * (self.skill - [TIER_SKILL.get(TIERS[t], 0) for t in self.tier])).astype(int)
+        return [
+            {
+                "id": fighter_id,
+                "name": fighter_name(fighter_id),
+                "tier": TIERS[tier],
+                "elo": elo[code],
+                "tier_elo": int(tier_elo[code]),
+                "best_streak": best,
+                "created_time": now,
+                "last_updated": now,
+                "prev_tier": TIERS[tier],
+                "current_streak": streak,
+                "last_match_date": _datetime(last) if last else None,
+            }
+            for code, (fighter_id, tier, best, streak, last) in enumerate(
+                zip(
+                    self.fighter_ids.tolist(),
+                    self.tier.tolist(),
+                    self.best_streak.tolist(),
+                    self.streak.tolist(),
+                    self.last_date.tolist(),
+                )
+            )
+        ]
+
+
+def concat(chunks: list[MatchHistory], fighter_ids: np.ndarray) -> MatchHistory:
+    columns = {
+        column: np.concatenate([getattr(chunk, column) for chunk in chunks])
+        if chunks
+        else np.empty(0, dtype=dtype)
+        for column, dtype in HISTORY_DTYPES.items()
+    }
+    return MatchHistory(**columns, fighter_ids=fighter_ids)
+
+
+def load_into_database(connection, league: SyntheticLeague, num_matches: int, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Plays `num_matches` more matches into the match table (with COPY on Postgres)
+    and then writes the roster to the fighter table. Returns matches inserted.
+
+    Meant for an empty scratch database: it refuses to touch one with matches, and
+    fighter rows are replaced by the league's current state.
+    """
+    if league.next_match_id == 1 and connection.execute(text("SELECT count(*) FROM match")).scalar():
+        raise ValueError("The match table is not empty, synthetic data only goes into a scratch database.")
+
+    inserted = 0
+    for chunk in league.chunks(num_matches, chunk_size):
+        _insert_matches(connection, chunk)
+        inserted += len(chunk)
+
+    connection.execute(Fighter.__table__.delete().where(Fighter.id.in_(league.fighter_ids.tolist())))
+    connection.execute(Fighter.__table__.insert(), league.fighter_rows())
+    return inserted
+
+
+def _insert_matches(connection, chunk: MatchHistory) -> None:
+    ids = chunk.fighter_ids
+    red, blue = ids[chunk.red], ids[chunk.blue]
+    columns = {
+        "id": chunk.match_id,
+        "fighter_red": red,
+        "fighter_blue": blue,
+        "winner": np.where(chunk.red_won == 1, red, blue),
+        "match_format": np.array(MATCH_FORMATS)[chunk.match_format],
+        "tier": np.array(TIERS)[chunk.tier],
+        "date": np.datetime_as_string(chunk.date.astype("datetime64[s]"), unit="s"),
+        "streak_red": chunk.streak_red,
+        "streak_blue": chunk.streak_blue,
+        "bet_red": chunk.bet_red,
+        "bet_blue": chunk.bet_blue,
+        "colour": np.where(chunk.red_won == 1, "Red", "Blue"),
+    }
+    if connection.dialect.name != "postgresql":
+        dates = [_datetime(d) for d in chunk.date.tolist()]
+        rows = [dict(zip(columns, values)) for values in zip(*(c.tolist() for c in columns.values()))]
+        for row, date in zip(rows, dates):
+            row["date"] = date
+        connection.execute(Match.__table__.insert(), rows)
+        return
+
+    copy_rows(connection, "match", list(columns), zip(*(column.tolist() for column in columns.values())))
+
+
+def _datetime(unix_seconds: int) -> datetime:
+    return datetime.fromtimestamp(unix_seconds, tz=timezone.utc).replace(tzinfo=None)
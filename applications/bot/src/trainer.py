@@ -0,0 +1,112 @@
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from queue import Empty, Queue
+
+from src.database import get_engine, get_session
+from src.registry import TrainingRun, register_weights
+from src.training import (
+    MIN_TRAINING_ROWS,
+    TrainingSet,
+    backfill_match_features,
+    fit_weights,
+    load_training_features,
+)
+from src.validation import FoldResult, beats_current, candidate_score, cross_validate
+
+BACKGROUND_FOLDS = 3
+
+
+@dataclass
+class TrainingResult:
+    version: int | None  # None when the weights could not be registered
+    weights: dict
+    run: TrainingRun
+    promoted: bool
+
+
+def training_run(data: TrainingSet, results: list[FoldResult]) -> TrainingRun:
+    score = candidate_score(results)
+    return TrainingRun(
+        trained_rows=len(data),
+        window_start=data.window_start,
+        window_end=data.window_end,
+        log_loss=score.log_loss,
+        accuracy=score.accuracy,
+        roi=score.roi,
+    )
+
+
+def train_and_register(
+    current_weights: dict | None,
+    logger,
+    fitted_until: datetime | None = None,
+    folds: int = BACKGROUND_FOLDS,
+) -> TrainingResult | None:
+    """
+    Replays and loads the stored features, validates a candidate walk-forward against
+    `current_weights` (fitted on matches up to `fitted_until`), fits it on every row
+    and registers it. The candidate only becomes the active model when it beats the
+    current weights on the rows neither has seen; without such rows the current
+    weights stay active.
+    """
+    with get_engine().begin() as conn:
+        added = backfill_match_features(conn)
+        data = load_training_features(conn)
+    if added:
+        logger.info(f"Stored replayed features for {added} matches.")
+    if len(data) < MIN_TRAINING_ROWS:
+        logger.info(f"Not enough data to train ({len(data)} feature rows).")
+        return None
+
+    results = cross_validate(data, current_weights, folds, workers=1, current_fitted_until=fitted_until)
+    run = training_run(data, results)
+    weights = fit_weights(data.X, data.y)
+    promoted = bool(beats_current(results))
+    with get_session() as session:
+        version = register_weights(session, weights, logger, "retrain", run, activate=promoted)
+    return TrainingResult(version, weights, run, promoted and version is not None)
+
+
+class BackgroundTrainer:
+    """
+    Runs train_and_register on a worker thread so the IRC loop never waits on a
+    retrain. The bot process is a daemon and can't start child processes, hence a
+    thread and a single-process cross-validation. Results are collected with poll().
+    """
+
+    def __init__(self, logger) -> None:
+        self.logger = logger
+        self._results: Queue = Queue()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def busy(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def request(self, current_weights: dict | None, fitted_until: datetime | None = None) -> bool:
+        """Starts a retrain unless one is still running. Returns whether it started."""
+        if self.busy:
+            return False
+        snapshot = dict(current_weights) if current_weights else None
+        self._thread = threading.Thread(
+            target=self._run, args=(snapshot, fitted_until), name="trainer", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def poll(self) -> TrainingResult | None:
+        """The result of a finished retrain, if there is one waiting."""
+        try:
+            return self._results.get_nowait()
+        except Empty:
+            return None
+
+    def _run(self, current_weights: dict | None, fitted_until: datetime | None) -> None:
+        try:
+            result = train_and_register(current_weights, self.logger, fitted_until)
+        except Exception as e:
+            self.logger.error(f"Background training failed: {e}")
+            return
+        if result:
+            self._results.put(result)
@@ -1,21 +1,72 @@
 import os
-from collections import defaultdict
-import pandas as pd
-from sklearn.linear_model import LogisticRegression
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import numpy as np
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
 
+from src.backtest import LIVE_FEATURE_CONFIG, PreparedBacktest
+from src.betting_strategy import FEATURE_COLUMNS
+from src.checkpoint import replay_incremental
+from src.history import ColumnBuffer, stream_chunks, to_unix
+from src.logistic import fit_logistic
+
 load_dotenv()
-K_FACTOR = 32
-STARTING_ELO = 1500
-MIN_MATCHES_FOR_STATS = 1
 WARMUP_MATCHES = 1000
+MIN_TRAINING_ROWS = 50
+LIVE_CHECKPOINT = "live"
+
+# match_id is unique and replay skips linked matches, so bet-time rows always win
+FEATURES_QUERY = """
+    SELECT f.tier_elo, f.streak, f.h2h, f.comp,
+           CASE WHEN m.winner = m.fighter_red THEN 1 ELSE 0 END AS win,
+           m.bet_red, m.bet_blue, m.tier, m.match_format, m.date
+    FROM match_features f
+    JOIN match m ON m.id = f.match_id
+    WHERE m.winner IS NOT NULL
+    ORDER BY m.date ASC, m.id ASC
+"""
+FEATURES_SUMMARY_QUERY = "SELECT count(*), min(m.date), max(m.date) FROM match_features f JOIN match m ON m.id = f.match_id WHERE m.winner IS NOT NULL"
+FEATURE_DTYPES = {
+    "tier_elo": np.float64, "streak": np.float64, "h2h": np.float64, "comp": np.float64, "win": np.int8,
+    "bet_red": np.int64, "bet_blue": np.int64, "x_tier": np.bool_, "potato": np.bool_, "matchmaking": np.bool_,
+    "date": np.int64,
+}
+
+@dataclass
+class TrainingSet:
+    """Stored feature rows in match order, with what a bankroll replay of them needs."""
+    X: np.ndarray  # (n, 4) in FEATURE_COLUMNS order
+    y: np.ndarray  # 1 when Red won
+    bet_red: np.ndarray
+    bet_blue: np.ndarray
+    x_tier: np.ndarray
+    potato: np.ndarray
+    matchmaking: np.ndarray
+    window_start: datetime | None = None  # Dates of the first and last match
+    window_end: datetime | None = None
+    date: np.ndarray | None = None  # Unix seconds of every row's match
+
+    def __len__(self):
+        return len(self.y)
+
+    def rows_until(self, when: datetime | None) -> int:
+        """How many leading rows are dated at or before `when`, 0 for None."""
+        if when is None: return 0
+        if self.date is None: return len(self)
+        return int(np.searchsorted(self.date, to_unix(when), side="right"))
 
-class FighterTracker:
-    def __init__(self):
-        self.tier_elo = STARTING_ELO
-        self.match_history = []
-        self.current_streak = 0  # Simulation tracker
+    def prepared(self, prob_red: np.ndarray, rows: slice) -> PreparedBacktest:
+        """Backtest input for the matchmaking matches in `rows` given predictions for them."""
+        keep = self.matchmaking[rows]
+        return PreparedBacktest(
+            prob_red=prob_red[keep],
+            red_won=self.y[rows][keep].astype(bool),
+            bet_red=self.bet_red[rows][keep],
+            bet_blue=self.bet_blue[rows][keep],
+            x_tier=self.x_tier[rows][keep],
+            potato=self.potato[rows][keep],
+        )
 
 def get_db_engine():
     user = os.getenv("POSTGRES_USER", "postgres")
@@ -26,103 +77,62 @@ def get_db_engine():
     url = f"postgresql://{user}:{password}@{host}:{port}/{db_name}"
     return create_engine(url)
 
-def calculate_elo_change(winner_elo, loser_elo):
-    expected_win = 1 / (1 + 10 ** ((loser_elo - winner_elo) / 400))
-    return K_FACTOR * (1 - expected_win)
-
-def get_h2h_win_rate(fighters, fighter_id, opponent_id):
-    history = fighters[fighter_id].match_history
-    wins = 0
-    total = 0
-    for m in history:
-        if m["opponent"] == opponent_id:
-            total += 1
-            if m["result"] == "win": wins += 1
-    if total < MIN_MATCHES_FOR_STATS: return 0.5
-    return wins / total
-
-def get_comp_win_rate(fighters, red_id, blue_id):
-    red_hist = fighters[red_id].match_history
-    blue_hist = fighters[blue_id].match_history
-    red_opps = {m["opponent"]: m["result"] for m in red_hist}
-    wins = 0
-    total = 0
-    for m in blue_hist:
-        opp_id = m["opponent"]
-        blue_res = m["result"]
-        if opp_id in red_opps:
-            red_res = red_opps[opp_id]
-            if red_res == "win" and blue_res == "loss":
-                wins += 1; total += 1
-            elif red_res == "loss" and blue_res == "win":
-                total += 1
-    if total < MIN_MATCHES_FOR_STATS: return 0.5
-    return wins / total
-
-def train_model():
-    print("Training AI Model on current database...")
-    try:
-        engine = get_db_engine()
-        with engine.connect() as conn:
-            count = conn.execute(text("SELECT count(*) FROM match")).scalar()
-            if count < (WARMUP_MATCHES + 50):
-                print(f"Not enough data to train ({count} matches).")
-                return None
-            query = "SELECT fighter_red, fighter_blue, winner, streak_red, streak_blue FROM match ORDER BY date ASC, id ASC"
-            df_matches = pd.read_sql(text(query), conn)
-
-        fighters = defaultdict(FighterTracker)
-        training_data = []
-        match_counter = 0
-
-        for _, match in df_matches.iterrows():
-            match_counter += 1
-            r, b, w = match["fighter_red"], match["fighter_blue"], match["winner"]
-            
-            # Use SIMULATED streaks for training consistency
-            r_streak = fighters[r].current_streak
-            b_streak = fighters[b].current_streak
-            
-            elo_diff = fighters[r].tier_elo - fighters[b].tier_elo
-            streak_diff = r_streak - b_streak
-            h2h = get_h2h_win_rate(fighters, r, b) - 0.5
-            comp = get_comp_win_rate(fighters, r, b) - 0.5
-            target = 1 if w == r else 0
+def backfill_match_features(conn) -> int:
+    """
+    Replays the match table with the live feature definitions and stores a row for
+    every match (past the warm-up) that has no features yet. Returns rows added.
 
-            if match_counter > WARMUP_MATCHES:
-                training_data.append([elo_diff, streak_diff, h2h, comp, target])
+    The replay resumes from the feature checkpoint, so only the last CHECKPOINT_LAG
+    of history is processed again unless older matches were back-filled since.
+    """
+    replay = replay_incremental(conn, LIVE_CHECKPOINT, **LIVE_FEATURE_CONFIG)
+    skip = max(0, WARMUP_MATCHES - replay.offset)
+    if len(replay.history) <= skip: return 0
+    known = {row[0] for row in conn.execute(text("SELECT match_id FROM match_features WHERE match_id IS NOT NULL"))}
 
-            change = calculate_elo_change(fighters[r].tier_elo if target else fighters[b].tier_elo, fighters[b].tier_elo if target else fighters[r].tier_elo)
-            if target:
-                fighters[r].tier_elo += change
-                fighters[b].tier_elo -= change
-                fighters[r].match_history.append({"opponent": b, "result": "win"})
-                fighters[b].match_history.append({"opponent": r, "result": "loss"})
-                # Streak Logic
-                fighters[r].current_streak = (fighters[r].current_streak + 1) if fighters[r].current_streak > 0 else 1
-                fighters[b].current_streak = (fighters[b].current_streak - 1) if fighters[b].current_streak < 0 else -1
-            else:
-                fighters[r].tier_elo -= change
-                fighters[b].tier_elo += change
-                fighters[r].match_history.append({"opponent": b, "result": "loss"})
-                fighters[b].match_history.append({"opponent": r, "result": "win"})
-                # Streak Logic
-                fighters[r].current_streak = (fighters[r].current_streak - 1) if fighters[r].current_streak < 0 else -1
-                fighters[b].current_streak = (fighters[b].current_streak + 1) if fighters[b].current_streak > 0 else 1
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"match_id": match_id, "tier_elo": f[0], "streak": f[1], "h2h": f[2], "comp": f[3], "created_time": now}
+        for match_id, f in zip(replay.history.match_id[skip:].tolist(), replay.features[skip:].tolist())
+        if match_id not in known
+    ]
+    if rows:
+        conn.execute(
+            text("""
+                INSERT INTO match_features (match_id, tier_elo, streak, h2h, comp, source, created_time)
+                VALUES (:match_id, :tier_elo, :streak, :h2h, :comp, 'replay', :created_time)
+            """),
+            rows,
+        )
+    return len(rows)
 
-        df = pd.DataFrame(training_data, columns=["elo", "streak", "h2h", "comp", "win"])
-        model = LogisticRegression(fit_intercept=True)
-        model.fit(df[["elo", "streak", "h2h", "comp"]], df["win"])
+def load_training_features(conn) -> TrainingSet:
+    """Streams the stored features, in match order, into compact arrays."""
+    count, window_start, window_end = conn.execute(text(FEATURES_SUMMARY_QUERY)).one()
+    buffer = ColumnBuffer(FEATURE_DTYPES, count)
+    for rows in stream_chunks(conn, FEATURES_QUERY):
+        tier_elo, streak, h2h, comp, win, bet_red, bet_blue, tier, match_format, date = zip(*rows)
+        buffer.append(
+            tier_elo=tier_elo, streak=streak, h2h=h2h, comp=comp, win=win,
+            bet_red=[b or 0 for b in bet_red], bet_blue=[b or 0 for b in bet_blue],
+            x_tier=[t == "X" for t in tier], potato=[t == "P" for t in tier],
+            matchmaking=[f == "matchmaking" for f in match_format],
+            date=[to_unix(d) for d in date],
+        )
+    columns = buffer.arrays()
+    return TrainingSet(
+        X=np.column_stack([columns[name] for name in FEATURE_COLUMNS]),
+        y=columns["win"],
+        bet_red=columns["bet_red"],
+        bet_blue=columns["bet_blue"],
+        x_tier=columns["x_tier"],
+        potato=columns["potato"],
+        matchmaking=columns["matchmaking"],
+        window_start=window_start,
+        window_end=window_end,
+        date=columns["date"],
+    )
 
-        weights = {
-            "intercept": float(model.intercept_[0]),
-            "tier_elo": float(model.coef_[0][0]),
-            "streak": float(model.coef_[0][1]),
-            "h2h": float(model.coef_[0][2]),
-            "comp": float(model.coef_[0][3])
-        }
-        print(f"Training Complete. New Weights: {weights}")
-        return weights
-    except Exception as e:
-        print(f"Training failed: {e}")
-        return None
\ No newline at end of file
+def fit_weights(X, y) -> dict:
+    intercept, coefs = fit_logistic(X, y)
+    return {"intercept": intercept, **{name: float(coef) for name, coef in zip(FEATURE_COLUMNS, coefs)}}
@@ -0,0 +1,139 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+
+from src.backtest import BacktestParams, simulate
+from src.betting_strategy import BettingEngine
+from src.training import TrainingSet, fit_weights
+
+LOG_LOSS_EPSILON = 1e-15
+
+
+@dataclass
+class FoldScore:
+    log_loss: float
+    accuracy: float
+    roi: float
+    bets: int
+
+
+@dataclass
+class FoldResult:
+    fold: int
+    train_rows: int
+    test_rows: int
+    candidate: FoldScore  # Fitted on everything before the fold
+    # The weights in use today were fitted on the older rows, so they are only
+    # scored on the fold rows after their training window, next to the candidate.
+    # None when the whole fold is inside that window.
+    current: FoldScore | None
+    candidate_unseen: FoldScore | None
+    unseen_rows: int
+
+
+def walk_forward_splits(rows: int, folds: int, min_train_fraction: float = 0.5) -> list[tuple[int, int]]:
+    """
+    Expanding-window (train_end, test_end) pairs: each fold trains on every row
+    before `train_end` and is tested on the block right after it.
+    """
+    first_test = int(rows * min_train_fraction)
+    edges = np.linspace(first_test, rows, folds + 1).astype(int)
+    return [(int(start), int(end)) for start, end in zip(edges[:-1], edges[1:]) if end > start]
+
+
+def score(data: TrainingSet, prob_red: np.ndarray, rows: slice, params: BacktestParams) -> FoldScore:
+    y = data.y[rows]
+    p = np.clip(prob_red, LOG_LOSS_EPSILON, 1 - LOG_LOSS_EPSILON)
+    result = simulate(data.prepared(prob_red, rows), params)
+    return FoldScore(
+        log_loss=float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p))),
+        accuracy=float(np.mean((prob_red > 0.5) == (y == 1))),
+        roi=result.roi,
+        bets=result.bets,
+    )
+
+
+_worker_data: TrainingSet | None = None
+_worker_current: dict | None = None
+_worker_unseen_from = 0
+
+
+def _init_worker(data: TrainingSet, current_weights: dict | None, unseen_from: int) -> None:
+    global _worker_data, _worker_current, _worker_unseen_from  # pylint: disable=global-statement
+    _worker_data, _worker_current, _worker_unseen_from = data, current_weights, unseen_from
+
+
+def _run_fold(fold: int, train_end: int, test_end: int) -> FoldResult:
+    assert _worker_data is not None
+    data, rows, params = _worker_data, slice(train_end, test_end), BacktestParams()
+    weights = fit_weights(data.X[:train_end], data.y[:train_end])
+    candidate = BettingEngine(None, weights=weights).score_many(data.X[rows])
+
+    unseen = slice(max(train_end, _worker_unseen_from), test_end)
+    current_score = candidate_unseen = None
+    if unseen.stop > unseen.start:
+        current = BettingEngine(None, weights=_worker_current).score_many(data.X[unseen])
+        current_score = score(data, current, unseen, params)
+        candidate_unseen = score(data, candidate[unseen.start - train_end:], unseen, params)
+    return FoldResult(
+        fold=fold,
+        train_rows=train_end,
+        test_rows=test_end - train_end,
+        candidate=score(data, candidate, rows, params),
+        current=current_score,
+        candidate_unseen=candidate_unseen,
+        unseen_rows=max(0, unseen.stop - unseen.start),
+    )
+
+
+def cross_validate(
+    data: TrainingSet,
+    current_weights: dict | None,
+    folds: int = 5,
+    workers: int | None = None,
+    current_fitted_until: datetime | None = None,
+) -> list[FoldResult]:
+    """
+    Runs the walk-forward folds, in parallel across a process pool.
+    `current_fitted_until` is the last match date the current weights were fitted
+    on, None if they were not fitted on any of `data` (the built-in defaults).
+    """
+    splits = walk_forward_splits(len(data), folds)
+    workers = min(workers or os.cpu_count() or 1, len(splits))
+    unseen_from = data.rows_until(current_fitted_until)
+    if workers <= 1:
+        _init_worker(data, current_weights, unseen_from)
+        return [_run_fold(i, *split) for i, split in enumerate(splits)]
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(data, current_weights, unseen_from)
+    ) as pool:
+        futures = [pool.submit(_run_fold, i, *split) for i, split in enumerate(splits)]
+        return [future.result() for future in futures]
+
+
+def beats_current(results: list[FoldResult]) -> bool | None:
+    """
+    Promotion rule: lower log-loss than the current weights on the rows neither
+    was fitted on, averaged per row. None when every validated row is inside the
+    current weights' training window and there is nothing fair to compare.
+    """
+    compared = [result for result in results if result.current is not None]
+    if not compared:
+        return None
+    rows = [result.unseen_rows for result in compared]
+    candidate = np.average([result.candidate_unseen.log_loss for result in compared], weights=rows)
+    current = np.average([result.current.log_loss for result in compared], weights=rows)
+    return bool(candidate < current)
+
+
+def candidate_score(results: list[FoldResult]) -> FoldScore:
+    """The candidate's out-of-sample scores averaged over the folds, for the registry."""
+    return FoldScore(
+        log_loss=float(np.mean([result.candidate.log_loss for result in results])),
+        accuracy=float(np.mean([result.candidate.accuracy for result in results])),
+        roi=float(np.mean([result.candidate.roi for result in results])),
+        bets=sum(result.candidate.bets for result in results),
+    )
@@ -0,0 +1,129 @@
+import logging
+
+from src.objects import MatchFormat
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_EVERY = 25  # Matches between scheduled balance scrapes
+DRIFT_TOLERANCE = 0.01  # Relative drift (1%) we accept before re-syncing eagerly
+
+
+def bet_profit(colour: str, wager: int, winning_colour: str, pool_red: int, pool_blue: int) -> int:
+    """
+    What a wager on `colour` made once the match was won by `winning_colour`: the
+    wager's share of the other pool (0 if its own pool is empty), or -wager.
+    """
+    colour = colour.capitalize()
+    if winning_colour.capitalize() != colour:
+        return -wager
+    own_pool = pool_red if colour == "Red" else pool_blue
+    other_pool = pool_blue if colour == "Red" else pool_red
+    return int(wager * (other_pool / own_pool)) if own_pool > 0 else 0
+
+
+class WalletLedger:
+    """
+    Predicts the SaltyBet balance locally from our own wagers and the locked pools.
+
+    Scraping the index page is only needed when the ledger has no balance yet, the
+    scheduled reconcile is due, the previous reconcile showed drift, or the betting
+    mode switched (tournaments run on a separate balance).
+    """
+
+    def __init__(
+        self,
+        reconcile_every: int = RECONCILE_EVERY,
+        drift_tolerance: float = DRIFT_TOLERANCE,
+    ) -> None:
+        self.reconcile_every = reconcile_every
+        self.drift_tolerance = drift_tolerance
+
+        self.balance: int | None = None
+        self.match_format: MatchFormat | None = None
+        self.matches_since_reconcile = 0
+        self.dirty = True
+
+        self.pending_wager: int | None = None
+        self.pending_colour: str | None = None
+
+    def state(self) -> dict:
+        """The ledger as plain JSON-able fields, see `from_state`."""
+        return {
+            "balance": self.balance,
+            "match_format": self.match_format.value if self.match_format else None,
+            "matches_since_reconcile": self.matches_since_reconcile,
+            "dirty": self.dirty,
+            "pending_wager": self.pending_wager,
+            "pending_colour": self.pending_colour,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "WalletLedger":
+        wallet = cls()
+        wallet.balance = state["balance"]
+        wallet.match_format = MatchFormat(state["match_format"]) if state["match_format"] else None
+        wallet.matches_since_reconcile = state["matches_since_reconcile"]
+        wallet.dirty = state["dirty"]
+        wallet.pending_wager = state["pending_wager"]
+        wallet.pending_colour = state["pending_colour"]
+        return wallet
+
+    def needs_reconcile(self, match_format: MatchFormat) -> bool:
+        if self.balance is None or self.dirty:
+            return True
+        if self.match_format != match_format:
+            return True
+        return self.matches_since_reconcile >= self.reconcile_every
+
+    def reconcile(self, scraped_balance: int, match_format: MatchFormat) -> int:
+        """Adopts the scraped balance. Returns the drift of the prediction."""
+        drift = 0
+        same_wallet = self.match_format == match_format
+        if self.balance is not None and same_wallet:
+            drift = scraped_balance - self.balance
+            if abs(drift) > max(1, scraped_balance) * self.drift_tolerance:
+                logger.warning(
+                    "Wallet ledger drifted by $%s (predicted $%s, actual $%s).",
+                    f"{drift:,}",
+                    f"{self.balance:,}",
+                    f"{scraped_balance:,}",
+                )
+                # Keep reconciling every match until prediction and wallet agree
+                self.balance = scraped_balance
+                self.matches_since_reconcile = 0
+                self.dirty = True
+                return drift
+
+        self.balance = scraped_balance
+        self.match_format = match_format
+        self.matches_since_reconcile = 0
+        self.dirty = False
+        return drift
+
+    def place(self, wager: int, colour: str) -> None:
+        self.pending_wager = wager
+        self.pending_colour = colour.capitalize()
+
+    def settle(self, winning_colour: str, pool_red: int, pool_blue: int) -> int | None:
+        """Applies the outcome of the pending wager. Returns the new predicted balance."""
+        wager, colour = self.pending_wager, self.pending_colour
+        self.pending_wager, self.pending_colour = None, None
+        self.matches_since_reconcile += 1
+        if self.balance is None or not wager or not colour:
+            return self.balance
+
+        own_pool = pool_red if colour == "Red" else pool_blue
+        if winning_colour.capitalize() == colour and own_pool <= 0:
+            self.dirty = True
+        else:
+            self.balance += bet_profit(colour, wager, winning_colour, pool_red, pool_blue)
+
+        if self.balance <= 0:
+            # Bailout kicks in on the site, we can't predict it
+            self.dirty = True
+        return self.balance
+
+    def invalidate(self) -> None:
+        """Forces a scrape before the next bet (failed bet, lost match, ...)."""
+        self.pending_wager, self.pending_colour = None, None
+        self.dirty = True
@@ -0,0 +1,42 @@
+import os
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+from src.database import Base, get_db_url
+from src.synthetic import SyntheticLeague, default_fighters, load_into_database
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(
+        description=(
+            "Fill an empty scratch database with synthetic fighters and matches, to "
+            "rehearse training and the bot's queries at volumes production hasn't reached."
+        )
+    )
+    arg_parser.add_argument("--matches", type=int, default=1_000_000)
+    arg_parser.add_argument("--fighters", type=int, help="Roster size (default: scales with --matches).")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--db-url", help="Target database (default: the POSTGRES_* settings).")
+    arguments = arg_parser.parse_args()
+
+    if os.environ.get("PRODUCTION") is None:
+        load_dotenv(Path(__file__).parent.parent.parent / ".env")
+
+    engine = create_engine(arguments.db_url or get_db_url())
+    Base.metadata.create_all(bind=engine)
+    league = SyntheticLeague(arguments.fighters or default_fighters(arguments.matches), arguments.seed)
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        try:
+            inserted = load_into_database(conn, league, arguments.matches)
+        except ValueError as e:
+            raise SystemExit(str(e)) from e
+    seconds = time.perf_counter() - started
+    print(
+        f"Inserted {inserted:,} matches between {league.num_fighters:,} fighters in "
+        f"{seconds:.1f}s ({inserted / seconds:,.0f} matches/s)."
+    )
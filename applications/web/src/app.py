@@ -2,16 +2,18 @@ import os
 from pathlib import Path
 
 import psycopg2
-from flask import render_template
+from flask import render_template, request
 from flask.helpers import send_file
 from flask.json import jsonify
 from flask_openapi3 import Info, OpenAPI, Tag
 from sqlalchemy import create_engine, text
 
 from src.biz import (
+    PerformanceUnavailable,
     get_current_match_info,
     get_fighter_by_id,
     get_match_by_id,
+    get_performance,
     list_fighters,
     list_matches,
 )
@@ -59,6 +61,15 @@ public_path = Path(__file__).parent.parent
 
 @app.route("/", methods=["GET"])
 def dashboard():
+    # Metrics come from the performance rollup: ?window=100 (bets, the default), day or week
+    window = request.args.get("window", "100")
+    try:
+        performance = get_performance(pg_pool, window)
+    except PerformanceUnavailable as e:
+        return str(e), 503
+    if performance is None:
+        return f"Unknown window {window!r}, use a number of bets, day or week", 400
+
     engine = get_db_connection()
     with engine.connect() as conn:
         total = conn.execute(text("SELECT count(*) FROM match")).scalar()
@@ -70,7 +81,7 @@ def dashboard():
                    m.my_bet_on as bot_bet,
                    m.my_wager as wager,
                    m.match_balance as balance,
-                   m.bet_red, m.bet_blue,
+                   COALESCE(m.my_profit, 0) as profit,
                    r.name as red_name, 
                    b.name as blue_name, 
                    w.name as winner_name
@@ -82,70 +93,7 @@ def dashboard():
         """)
         raw_matches = conn.execute(query).fetchall()
         
-        # Process matches
-        processed_matches = []
-        for m in raw_matches:
-            match_data = dict(m._mapping)
-            match_data['profit'] = 0
-            
-            if match_data['bot_bet'] and match_data['wager']:
-                won = False
-                if match_data['bot_bet'] == 'Red' and m.winner == m.fighter_red: won = True
-                elif match_data['bot_bet'] == 'Blue' and m.winner == m.fighter_blue: won = True
-                
-                if won:
-                    # Pure Estimate Logic
-                    wager = match_data['wager']
-                    if m.winner == m.fighter_red and m.bet_red:
-                        match_data['profit'] = int(wager * (m.bet_blue / m.bet_red))
-                    elif m.winner == m.fighter_blue and m.bet_blue:
-                        match_data['profit'] = int(wager * (m.bet_red / m.bet_blue))
-                else:
-                    match_data['profit'] = -match_data['wager']
-            
-            processed_matches.append(match_data)
-
-        current_balance = 0
-        if processed_matches and processed_matches[0]['balance']:
-            current_balance = processed_matches[0]['balance']
-
-        # 2. Metrics (Last 100)
-        roi_query = text("""
-            SELECT m.my_wager, m.my_bet_on, m.winner, m.fighter_red, m.fighter_blue, m.bet_red, m.bet_blue
-            FROM match m
-            WHERE m.my_wager IS NOT NULL AND m.winner IS NOT NULL
-            ORDER BY m.date DESC LIMIT 100
-        """)
-        roi_rows = conn.execute(roi_query).fetchall()
-
-        net_profit = 0
-        total_invested = 0
-        wins = 0
-        total_bets = 0
-
-        for row in roi_rows:
-            wager = row.my_wager
-            if not wager: continue
-            total_bets += 1
-            total_invested += wager
-            
-            won = False
-            if row.my_bet_on == 'Red' and row.winner == row.fighter_red: won = True
-            elif row.my_bet_on == 'Blue' and row.winner == row.fighter_blue: won = True
-            
-            if won:
-                wins += 1
-                profit = 0
-                if row.winner == row.fighter_red and row.bet_red:
-                    profit = wager * (row.bet_blue / row.bet_red)
-                elif row.winner == row.fighter_blue and row.bet_blue:
-                    profit = wager * (row.bet_red / row.bet_blue)
-                net_profit += profit
-            else:
-                net_profit -= wager
-        
-        roi = (net_profit / total_invested * 100) if total_invested > 0 else 0
-        accuracy = round((wins / total_bets * 100), 1) if total_bets > 0 else 0
+        processed_matches = [dict(m._mapping) for m in raw_matches]
 
         # 3. Weights
         try:
@@ -161,10 +109,11 @@ def dashboard():
     return render_template("dashboard.html", 
         total_matches=total,
         matches=processed_matches,
-        accuracy=accuracy,
-        roi=roi,
+        accuracy=round(performance.win_rate, 1),
+        roi=performance.roi,
+        window=window,
         weights=weights,
-        current_balance=current_balance
+        current_balance=performance.balance
     )
 
 @app.route("/favicon.ico", methods=["GET"])
@@ -1,5 +1,6 @@
 from typing import Callable, TypeVar
 
+from psycopg2 import errors
 from psycopg2.extras import DictCursor
 from psycopg2.pool import ThreadedConnectionPool
 
@@ -9,6 +10,7 @@ from src.database import (
     db_get_fighter_by_id,
     db_get_match_by_id,
     db_get_match_count,
+    db_get_performance,
     db_list_fighters,
     db_list_matches,
 )
@@ -21,6 +23,7 @@ from src.schemas import (
     ListMatchQuery,
     ListMatchResponse,
     MatchModel,
+    PerformanceModel,
 )
 
 RT = TypeVar("RT")
@@ -110,3 +113,38 @@ def get_fighter_details(cursor, name: str) -> ExtendedFighterModel | None:
     return ExtendedFighterModel(
         **fighter, matches=[MatchModel(**x) for x in cursor.fetchall()]
     )
+
+
+# === Performance ===
+class PerformanceUnavailable(Exception):
+    """The bot hasn't created the performance rollup in this database yet."""
+
+
+@pg_cursor
+def get_performance(cursor, window: str) -> PerformanceModel | None:
+    """
+    Performance over `window`: a number of bets ("100"), "day" or "week". None if
+    the window is invalid, PerformanceUnavailable until the bot has migrated.
+    """
+    try:
+        row = db_get_performance(cursor, window)
+    except errors.InvalidParameterValue:
+        cursor.connection.rollback()
+        return None
+    except (errors.UndefinedFunction, errors.UndefinedTable) as e:
+        cursor.connection.rollback()
+        raise PerformanceUnavailable(
+            "No performance data yet, the bot creates it when it first starts."
+        ) from e
+
+    bets, wins, wagered, profit = (int(row[key]) for key in ("bets", "wins", "wagered", "profit"))
+    return PerformanceModel(
+        window=window,
+        balance=row["balance"] or 0,
+        bets=bets,
+        wins=wins,
+        wagered=wagered,
+        profit=profit,
+        win_rate=wins / bets * 100 if bets else 0.0,
+        roi=profit / wagered * 100 if wagered else 0.0,
+    )
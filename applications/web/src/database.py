@@ -311,3 +311,13 @@ def db_list_matches(
 def db_get_current_match(cursor) -> DictRow | None:
     cursor.execute("SELECT * FROM current_match LIMIT 1")
     return cursor.fetchone()
+
+
+# === Performance ===
+def db_get_performance(cursor, window: str) -> DictRow:
+    """
+    Balance, bets, wins, wagered and profit over `window`, from the performance()
+    function the bot's migrations create, so both apps read the same definition.
+    """
+    cursor.execute("SELECT * FROM performance(%(window)s)", {"window": window})
+    return cursor.fetchone()
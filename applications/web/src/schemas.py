@@ -249,3 +249,15 @@ class CurrentMatchInfoResponse(CurrentMatchMatchModel):
     fighter_red_info: Optional[ExtendedFighterModel] = Field(
         default=None, description="Detailed information about the Red fighter."
     )
+
+
+# === Performance ===
+class PerformanceModel(BaseModel):
+    window: str = Field(description="Last N bets, or the last day/week of matches.")
+    balance: int = Field(description="Latest recorded balance.")
+    bets: int = Field(description="Bets placed in the window.")
+    wins: int = Field(description="Bets won in the window.")
+    wagered: int = Field(description="Total wagered in the window.")
+    profit: int = Field(description="Net profit in the window.")
+    win_rate: float = Field(description="Percentage of bets won.")
+    roi: float = Field(description="Net profit as a percentage of the total wagered.")